@@ -0,0 +1,265 @@
+"""
+On disk COPY encoded datasets. Clients with the same columns load byte-identical rows,
+and repeat runs skip generation. Keys include the timestamp anchor, today's midnight
+by default, so the next day's runs generate a new dataset instead of replaying windows
+the queries' `now()` has moved past; delete old keys to reclaim space.
+"""
+
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+import numpy as np
+
+from db_perf.ingest import (
+    COPY_BINARY_HEADER,
+    COPY_BINARY_TRAILER,
+    CopyPayload,
+    Row,
+    encode_copy_binary,
+    encode_copy_text,
+    naive_utc,
+)
+from db_perf.models.load import IngestStrategy, LoadOptions
+from db_perf.models.table import Table
+from db_perf.pipeline import chunk_bounds
+
+# the cache stores COPY streams, the execute strategies generate their rows as before
+CACHED_STRATEGIES = (IngestStrategy.COPY_TEXT, IngestStrategy.COPY_BINARY)
+TIMESTAMP_COLUMN = "event_timestamp"  # kept per row so chunks know their time range
+
+_OFFSET = np.dtype("<i8")
+_TIMESTAMP = np.dtype("<M8[us]")
+
+
+def dataset_key(table: Table, options: LoadOptions) -> str:
+    """
+    Identifies a dataset by what its rows depend on: event source, seed, workload
+    shape, timestamp anchor, the table's column types and the COPY format. Not by the table name or
+    row count, so clients sharing columns share one dataset, grown as tiers need.
+    """
+    signature = json.dumps(
+        {
+            "source": options.source.value,
+            "seed": options.seed,
+            "shape": (
+                None
+                if options.shape is None
+                else json.loads(json.dumps(asdict(options.shape), default=str))
+            ),
+            "anchor": options.anchor.isoformat(),
+            "columns": [[c.name, c.pg_type] for c in table.columns],
+            "format": options.strategy.value,
+        },
+        sort_keys=True,
+    )
+    digest = hashlib.sha1(signature.encode()).hexdigest()[:12]
+    return f"{options.source.value}_{options.seed}_{options.strategy.value}_{digest}"
+
+
+@dataclass
+class CachedChunk:
+    payload: CopyPayload
+    first: Optional[datetime]  # event_timestamp range of its rows
+    last: Optional[datetime]
+
+
+class DatasetCache:
+    """
+    Rows of one dataset, COPY encoded once and kept in `directory` across runs.
+    Files are only appended to and a row becomes visible once the manifest counts
+    it, so an interrupted fill is cut back on the next one. Chunks are slices of
+    the memory-mapped file, streamed to COPY without building the payload.
+
+    - `<key>.copy`: the COPY rows, without the binary header and trailer
+    - `<key>.offsets`: int64 end offset of every row in the data file
+    - `<key>.timestamps`: datetime64[us] `event_timestamp` of every row
+    - `<key>.json`: the manifest, rows and when they were generated
+    """
+
+    def __init__(
+        self, directory: Path, key: str, table: Table, strategy: IngestStrategy
+    ):
+        if strategy not in CACHED_STRATEGIES:
+            raise ValueError(
+                f"Datasets are cached as COPY streams, not for {strategy.value}"
+            )
+        self.directory = Path(directory)
+        self.key = key
+        self.table = table
+        self.strategy = strategy
+        self._mapped_rows = 0
+        self._data: Optional[mmap.mmap] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._timestamps: Optional[np.ndarray] = None
+
+    def __getstate__(self):
+        # mappings stay in the process that made them, load workers map the files again
+        return {
+            "directory": self.directory,
+            "key": self.key,
+            "table": self.table,
+            "strategy": self.strategy,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(
+            state["directory"], state["key"], state["table"], state["strategy"]
+        )
+
+    def _path(self, suffix: str) -> Path:
+        return self.directory / f"{self.key}.{suffix}"
+
+    @property
+    def rows(self) -> int:
+        try:
+            return json.loads(self._path("json").read_text())["rows"]
+        except FileNotFoundError:
+            return 0
+
+    def covers(self, start: int, count: int) -> bool:
+        return start + count <= max(self._mapped_rows, self.rows)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self._path("lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _truncate(self, rows: int):
+        """Drops what an interrupted fill wrote past the manifest"""
+        end = 0
+        if rows:
+            offsets = np.fromfile(self._path("offsets"), dtype=_OFFSET, count=rows)
+            end = int(offsets[-1])
+        for suffix, size in (
+            ("copy", end),
+            ("offsets", rows * _OFFSET.itemsize),
+            ("timestamps", rows * _TIMESTAMP.itemsize),
+        ):
+            with open(self._path(suffix), "ab") as f:
+                f.truncate(size)
+
+    def _encode(self, rows: Iterable[Row]) -> Iterator[bytes]:
+        if self.strategy == IngestStrategy.COPY_BINARY:
+            return encode_copy_binary(self.table, rows, header=False, trailer=False)
+        return encode_copy_text(self.table, rows)
+
+    def ensure(
+        self, rows: int, generate: Callable[[int, int], Iterable[Row]], chunk_size: int
+    ) -> int:
+        """
+        Generates and appends rows until the dataset holds `rows`, returns how many
+        were generated. `generate(start, count)` must depend on row positions only.
+        """
+        with self._locked():
+            cached = self.rows
+            if cached >= rows:
+                return 0
+            started = time.perf_counter()
+            self._truncate(cached)
+            column = (
+                self.table.column_names.index(TIMESTAMP_COLUMN)
+                if TIMESTAMP_COLUMN in self.table.column_names
+                else None
+            )
+            with (
+                open(self._path("copy"), "ab") as data,
+                open(self._path("offsets"), "ab") as offsets,
+                open(self._path("timestamps"), "ab") as timestamps,
+            ):
+                end = data.tell()
+                for chunk_start, chunk_rows in chunk_bounds(
+                    cached, rows - cached, chunk_size
+                ):
+                    chunk = list(generate(chunk_start, chunk_rows))
+                    encoded = list(self._encode(chunk))
+                    data.write(b"".join(encoded))
+                    ends = end + np.cumsum([len(row) for row in encoded], dtype=_OFFSET)
+                    ends.astype(_OFFSET).tofile(offsets)
+                    end = int(ends[-1])
+                    np.array(
+                        [
+                            (
+                                None
+                                if column is None or row[column] is None
+                                else naive_utc(row[column])
+                            )
+                            for row in chunk
+                        ],
+                        dtype=_TIMESTAMP,
+                    ).tofile(timestamps)
+            manifest = self._path("json.tmp")
+            manifest.write_text(
+                json.dumps(
+                    {
+                        "rows": rows,
+                        "table": self.table.name,
+                        "updated_at": datetime.now().isoformat(),
+                    }
+                )
+            )
+            os.replace(manifest, self._path("json"))
+        print(
+            f"dataset cache {self.key}: generated rows {cached} to {rows} "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return rows - cached
+
+    def _map(self, rows: int):
+        if self._mapped_rows >= rows:
+            return
+        self.close()
+        cached = self.rows
+        if cached < rows:
+            raise ValueError(
+                f"dataset cache {self.key} holds {cached} rows, not {rows}"
+            )
+        with open(self._path("copy"), "rb") as data:
+            self._data = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = np.memmap(
+            self._path("offsets"), dtype=_OFFSET, mode="r", shape=(cached,)
+        )
+        self._timestamps = np.memmap(
+            self._path("timestamps"), dtype=_TIMESTAMP, mode="r", shape=(cached,)
+        )
+        self._mapped_rows = cached
+
+    def read(self, start: int, count: int) -> CachedChunk:
+        """Rows [start, start + count) as a COPY payload over the mapped file"""
+        self._map(start + count)
+        begin = int(self._offsets[start - 1]) if start else 0
+        end = int(self._offsets[start + count - 1]) if count else begin
+        parts = [memoryview(self._data)[begin:end]]
+        if self.strategy == IngestStrategy.COPY_BINARY:
+            parts = [COPY_BINARY_HEADER, *parts, COPY_BINARY_TRAILER]
+        timestamps = self._timestamps[start : start + count]
+        timestamps = timestamps[~np.isnat(timestamps)]
+        if not len(timestamps):
+            return CachedChunk(CopyPayload(parts), None, None)
+        return CachedChunk(
+            CopyPayload(parts), timestamps.min().item(), timestamps.max().item()
+        )
+
+    def close(self):
+        """Unmaps the files, chunks read before must have been sent"""
+        self._offsets = self._timestamps = None
+        if self._data is not None:
+            try:
+                self._data.close()
+            except BufferError:
+                pass  # a chunk still references it, it is unmapped once collected
+            self._data = None
+        self._mapped_rows = 0
@@ -0,0 +1,271 @@
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from db_perf.models.query import Query
+from db_perf.models.timing import TimingSummary
+from db_perf.pool import ConnectionPool
+
+ALL_QUERIES = "all"
+
+_errors_lock = threading.Lock()
+
+
+@dataclass
+class ConcurrencyOptions:
+    sessions: List[int] = field(default_factory=lambda: [1, 2, 4, 8, 16])
+    duration_s: Optional[float] = 10.0  # per concurrency level
+    requests_per_session: Optional[int] = None  # stops a session early when set
+    think_time_s: float = 0.0  # pause between requests of one session
+    seed: int = 0
+
+    def __post_init__(self):
+        if self.duration_s is None and self.requests_per_session is None:
+            raise ValueError(
+                "duration_s or requests_per_session must be set, sessions would never stop"
+            )
+
+
+@dataclass
+class ConcurrencyResult:
+    sessions: int
+    query: str
+    requests: int
+    errors: int
+    duration_s: float
+    latency: TimingSummary  # client observed latency (execute + fetch) in ms
+
+    @property
+    def throughput_qps(self) -> float:
+        return self.requests / self.duration_s if self.duration_s else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        latency = self.latency
+        return {
+            "sessions": self.sessions,
+            "query": self.query,
+            "requests": self.requests,
+            "errors": self.errors,
+            "throughput_qps": self.throughput_qps,
+            "p50_ms": latency.median,
+            "p95_ms": latency.p95,
+            "p99_ms": latency.p99,
+            "mean_ms": latency.mean,
+        }
+
+
+class SessionThread(threading.Thread):
+    """A session thread keeping the exception it failed with for the main thread"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.error: Optional[BaseException] = None
+
+    def run(self):
+        try:
+            super().run()
+        except BaseException as e:
+            self.error = e
+
+
+def join_sessions(threads: List[SessionThread]):
+    """
+    Joins every session, then raises the error of the first one that failed, not
+    the `BrokenBarrierError` of those it released by aborting the start barrier
+    """
+    for thread in threads:
+        thread.join()
+    errors = [thread.error for thread in threads if thread.error is not None]
+    for error in errors:
+        if not isinstance(error, threading.BrokenBarrierError):
+            raise error
+    if errors:
+        raise errors[0]
+
+
+def start_sessions(start: threading.Barrier, threads: List[SessionThread]):
+    """Waits until every session holds its connection, or raises why one could not"""
+    try:
+        start.wait()
+    except threading.BrokenBarrierError:
+        join_sessions(threads)
+        raise
+
+
+def in_mix(queries: List[Query]) -> List[Query]:
+    """The queries sessions draw from, zero weight ones are benchmarked alone only"""
+    return [query for query in queries if query.weight > 0]
+
+
+def run_session(
+    pool: ConnectionPool,
+    queries: List[Query],
+    options: ConcurrencyOptions,
+    session_id: int,
+    start: threading.Barrier,
+    deadline: List[float],
+    latencies: Dict[str, List[float]],
+    errors: Dict[str, int],
+    timeline: Optional[List[Tuple[float, str, float]]] = None,
+):
+    """
+    One reader session: waits on `start`, then sends queries from the weighted mix
+    until `deadline[0]` or its request budget, recording latencies and errors per
+    query (and in `timeline` when given). Shared with the mixed workload readers.
+    """
+    rng = random.Random(f"{options.seed}:{session_id}")
+    weights = [query.weight for query in queries]
+    try:
+        with pool.connection() as conn:
+            conn.autocommit = True
+            cur = conn.cursor()
+            try:
+                start.wait()
+                requests = 0
+                while time.perf_counter() < deadline[0]:
+                    if (
+                        options.requests_per_session is not None
+                        and requests >= options.requests_per_session
+                    ):
+                        break
+                    query = rng.choices(queries, weights=weights)[0]
+                    started = time.perf_counter()
+                    try:
+                        cur.execute(query.query)
+                        cur.fetchall()
+                        finished = time.perf_counter()
+                        latencies[query.name].append((finished - started) * 1000)
+                        if timeline is not None:
+                            # (finished at, query, ms) to bucket latencies over time
+                            timeline.append(
+                                (finished, query.name, (finished - started) * 1000)
+                            )
+                    except Exception as e:
+                        print(f"Error executing {query.name}: {e}")
+                        with _errors_lock:
+                            errors[query.name] += 1
+                    requests += 1
+                    if options.think_time_s:
+                        time.sleep(options.think_time_s)
+            finally:
+                cur.close()
+    except Exception:
+        start.abort()  # releases the other sessions instead of leaving them waiting
+        raise
+
+
+def run_concurrency_level(
+    pool: ConnectionPool,
+    queries: List[Query],
+    sessions: int,
+    options: ConcurrencyOptions,
+) -> List[ConcurrencyResult]:
+    """
+    Runs `sessions` threads, each on its own pooled connection, drawing queries from
+    the weighted mix until the duration elapses or every session sent its requests.
+    """
+    queries = in_mix(queries)
+    pool.ensure_capacity(sessions)
+    latencies = {query.name: [] for query in queries}
+    errors = {query.name: 0 for query in queries}
+    start = threading.Barrier(sessions + 1)
+    deadline = [float("inf")]
+
+    threads = [
+        SessionThread(
+            target=run_session,
+            args=(pool, queries, options, i, start, deadline, latencies, errors),
+            name=f"load-session-{i}",
+        )
+        for i in range(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+
+    start_sessions(start, threads)  # sessions hold their connections, start the clock
+    started = time.perf_counter()
+    if options.duration_s is not None:
+        deadline[0] = started + options.duration_s
+    join_sessions(threads)
+    elapsed = time.perf_counter() - started
+
+    results = [
+        ConcurrencyResult(
+            sessions=sessions,
+            query=name,
+            requests=len(samples),
+            errors=errors[name],
+            duration_s=elapsed,
+            latency=TimingSummary(samples=samples),
+        )
+        for name, samples in latencies.items()
+    ]
+    all_samples = [sample for samples in latencies.values() for sample in samples]
+    results.append(
+        ConcurrencyResult(
+            sessions=sessions,
+            query=ALL_QUERIES,
+            requests=len(all_samples),
+            errors=sum(errors.values()),
+            duration_s=elapsed,
+            latency=TimingSummary(samples=all_samples),
+        )
+    )
+    return results
+
+
+def run_concurrency_benchmark(
+    pool: ConnectionPool, queries: List[Query], options: ConcurrencyOptions
+) -> List[ConcurrencyResult]:
+    results = []
+    for sessions in options.sessions:
+        print(f"Running concurrent load with {sessions} session(s)...")
+        level = run_concurrency_level(pool, queries, sessions, options)
+        total = level[-1]
+        print(
+            f" {sessions} session(s): {total.throughput_qps:.1f} queries/s, "
+            f"p95 {total.latency.p95:.2f}ms, {total.errors} error(s)"
+        )
+        results.extend(level)
+    return results
+
+
+def to_dataframe(results: List[ConcurrencyResult]) -> pd.DataFrame:
+    return pd.DataFrame([result.to_dict() for result in results])
+
+
+def plot_saturation(df: pd.DataFrame, path: str = "db_concurrency_plot.png"):
+    """Throughput and p95 latency of the whole mix against the number of sessions"""
+    fig, (throughput, latency) = plt.subplots(1, 2, figsize=(14, 6))
+    for (records, client), group in df[df["query"] == ALL_QUERIES].groupby(
+        ["records", "client"]
+    ):
+        group_sorted = group.sort_values("sessions")
+        label = f"{client} - {records} records"
+        throughput.plot(
+            group_sorted["sessions"],
+            group_sorted["throughput_qps"],
+            marker="o",
+            label=label,
+        )
+        latency.plot(
+            group_sorted["sessions"], group_sorted["p95_ms"], marker="o", label=label
+        )
+
+    throughput.set_title("Throughput vs. Concurrent Sessions")
+    throughput.set_xlabel("Sessions")
+    throughput.set_ylabel("Queries/s")
+    latency.set_title("p95 Latency vs. Concurrent Sessions")
+    latency.set_xlabel("Sessions")
+    latency.set_ylabel("p95 latency (ms)")
+    for axis in (throughput, latency):
+        axis.grid(True)
+        axis.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
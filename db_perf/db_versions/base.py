@@ -1,45 +1,268 @@
+import hashlib
+import math
+import random
+import subprocess
+import time
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import replace
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import psycopg2
+from factory.random import reseed_random
 from psycopg2.extensions import connection
 
+from db_perf.cache import CACHED_STRATEGIES, CachedChunk, DatasetCache, dataset_key
+from db_perf.encoder import EventEncoder, EventField
+from db_perf.factories.columnar import ColumnarEventFactory, EventBatch
 from db_perf.factories.event import EventFactory
+from db_perf.factories.server import ServerEventSynthesizer, SynthesisChunk
+from db_perf.factories.shape import WorkloadShaper
+from db_perf.ingest import Row, prepare_rows, send_rows, write_rows
+from db_perf.ingest_metrics import (
+    enable_statement_stats,
+    payload_size,
+    read_counters,
+    wal_bytes_between,
+)
 from db_perf.migrator import DatabaseMigrator
-from db_perf.models.events import Event
+from db_perf.models.benchmark import BenchmarkOptions
+from db_perf.models.events import Event, PipelineTags
+from db_perf.models.load import ChunkStats, EventSource, LoadOptions, LoadReport
+from db_perf.models.pool import PoolOptions
+from db_perf.models.query import Query
+from db_perf.models.settings import SettingsProfile
+from db_perf.models.table import Table
+from db_perf.models.timing import TimingSummary
+from db_perf.pipeline import chunk_bounds, prefetch
+from db_perf.pool import ConnectionPool
+from db_perf.snapshot import DatabaseSnapshot, TemplateMode
+
+
+def _load_worker(client: "BaseClient", bounds: List[Tuple[int, int]]) -> ChunkStats:
+    return client._load_chunks(bounds)
 
 
 class BaseClient(metaclass=ABCMeta):
 
-    def __init__(self, database_url: str) -> None:
+    def __init__(
+        self,
+        database_url: str,
+        load_options: Optional[LoadOptions] = None,
+        templates: TemplateMode = TemplateMode.NONE,
+        benchmark_options: Optional[BenchmarkOptions] = None,
+        pool_options: Optional[PoolOptions] = None,
+    ) -> None:
 
         self.database_url = database_url
+        self.load_options = load_options or LoadOptions()
+        self.templates = templates
+        self.benchmark_options = benchmark_options or BenchmarkOptions()
+        self.snapshot = DatabaseSnapshot(database_url)
+        self._columnar_factory: Optional[ColumnarEventFactory] = None
+        self._shaper: Optional[WorkloadShaper] = None
+        self._encoder: Optional[EventEncoder] = None
+        self._dataset_cache: Optional[DatasetCache] = None
+        self._synthesizer: Optional[ServerEventSynthesizer] = None
         self.schema_basedir = Path(__file__).resolve().parent.parent.parent / "schemas"
         print("getting schema_basedir", self.schema_basedir)
 
         self.migrator = self._create_migrator()
-        self.conn = self.connect_to_db()
+        # connections are opened on first use, the database may not exist yet
+        self.pool = ConnectionPool(database_url, pool_options)
 
-    def connect_to_db(self) -> connection:
-        try:
-            conn = psycopg2.connect(self.database_url)
-            return conn
-        except Exception as e:
-            print(f"Error connecting to database: {e}")
-            raise e
+    def _wait_for_db(self):
+        """Borrows a connection, retrying while the server restarts"""
+        deadline = time.monotonic() + self.benchmark_options.reconnect_timeout_s
+        while True:
+            try:
+                with self.pool.connection():
+                    return
+            except psycopg2.OperationalError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.5)
 
     def execute_query(self, query: str):
         try:
-            conn = self.connect_to_db()
-            cur = conn.cursor()
-            cur.execute(query)
-            conn.commit()  # If it's a query that modifies the database (e.g., INSERT, UPDATE)
-            cur.close()
+            with self.pool.connection() as conn:
+                cur = conn.cursor()
+                cur.execute(query)
+                conn.commit()  # If it's a query that modifies the database (e.g., INSERT, UPDATE)
+                cur.close()
         except Exception as e:
             print(f"Error executing query: {e}")
             # raise e
 
+    def template_tag(self, number_of_records: Optional[int] = None) -> str:
+        """Identifies a frozen database by client, schema and, once loaded, dataset"""
+        schema = hashlib.sha1()
+        for path in sorted(self._get_correct_schema_path().glob("*.sql")):
+            # edited migrations change the schema as much as new ones
+            schema.update(path.name.encode() + b"\0" + path.read_bytes() + b"\0")
+        tag = f"{self.name()}_{schema.hexdigest()[:8]}"
+        if number_of_records is None:
+            return tag
+        options = self.load_options
+        tag = f"{tag}_{options.source.value}_{options.seed}_{number_of_records}"
+        # the anchor places the timestamps, restored rows have to match the queries
+        dataset = repr((options.shape, options.anchor.isoformat()))
+        return tag + "_" + hashlib.sha1(dataset.encode()).hexdigest()[:8]
+
+    def restore_template(self, number_of_records: Optional[int] = None) -> bool:
+        tag = self.template_tag(number_of_records)
+        if not self.snapshot.exists(tag):
+            return False
+        self.pool.reset()
+        self.snapshot.restore(tag)
+        return True
+
+    def freeze_template(self, number_of_records: Optional[int] = None):
+        self.pool.reset()
+        self.snapshot.freeze(self.template_tag(number_of_records))
+
+    def setup(self):
+        """Migrates the client database"""
+        # clients share the database, another client's teardown may have dropped it
+        # under the pooled connections
+        self.pool.reset()
+        if self.templates == TemplateMode.NONE:
+            print("Running migrations ...")
+            self.migrator.run_migrations()
+            return
+
+        if not self.restore_template():
+            self.snapshot.reset()
+            print("Running migrations ...")
+            self.migrator.run_migrations()
+            self.freeze_template()
+
+    def load_tier(
+        self, total_records: int, loaded_records: int = 0
+    ) -> Optional[LoadReport]:
+        """
+        Grows the dataset from `loaded_records` to `total_records` rows and analyzes it.
+        In dataset template mode a tier frozen by an earlier run is restored instead,
+        in which case nothing is inserted and None is returned.
+        """
+        if self.templates == TemplateMode.DATASET and self.restore_template(
+            total_records
+        ):
+            return None
+
+        report = self.load(total_records - loaded_records, start=loaded_records)
+        self.analyze()
+        if self.templates == TemplateMode.DATASET:
+            self.freeze_template(total_records)
+        return report
+
+    def analyze(self):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"ANALYZE {self._get_table().name}")
+            conn.commit()
+            cursor.close()
+
+    def teardown(self):
+        """Closes the client connections and drops the database"""
+        print(f"Cleaning up after bench mark for {self.name()}")
+        self.pool.reset()
+        if self.templates == TemplateMode.NONE:
+            self.migrator.rollback_migrations()
+        else:
+            self.snapshot.reset()
+
+    def insert_rows(self, rows: Iterable[Row]):
+        """Writes already encoded rows into the client table using the configured ingest strategy"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            write_rows(
+                cursor,
+                self._get_table(),
+                rows,
+                self.load_options.strategy,
+                page_size=self.load_options.page_size,
+            )
+            conn.commit()
+            cursor.close()
+
+    def prepare_chunk(self, rows: Iterable[Row]) -> Any:
+        """Encodes one chunk of rows for `send_chunk`, may run on a background thread"""
+        return prepare_rows(self._get_table(), rows, self.load_options.strategy)
+
+    def payload_bytes(self, payload: Any) -> int:
+        """Size of a `prepare_chunk` payload on the wire"""
+        if isinstance(payload, SynthesisChunk):
+            return payload.size()
+        return payload_size(payload, self.load_options.strategy)
+
+    def send_chunk(
+        self, payload: Any, conn: Optional[connection] = None, commit: bool = True
+    ):
+        """Sends one chunk from `prepare_chunk`, by default on a pooled connection, and commits it"""
+        if conn is None:
+            with self.pool.connection() as conn:
+                self.send_chunk(payload, conn, commit)
+            return
+        cursor = conn.cursor()
+        if isinstance(payload, SynthesisChunk):
+            cursor.execute(payload.sql, payload.params)
+        else:
+            send_rows(
+                cursor,
+                self._get_table(),
+                payload,
+                self.load_options.strategy,
+                page_size=self.load_options.page_size,
+            )
+        if commit:
+            conn.commit()
+        cursor.close()
+
+    def prepare_load(self, start: int, count: int):
+        """
+        Setup rows [start, start + count) will need, e.g. partitions, done before
+        they are sent and timed. Chunks still check for what is not known ahead.
+        """
+
+    def prepare_send(self, payloads: List[Any]) -> List[Any]:
+        """
+        Does once, in its own transaction, the setup `send_chunk` would commit for
+        each payload, e.g. creating partitions, so uncommitted payloads sent back to
+        back time only their rows. Returns the payloads to send instead.
+        """
+        return payloads
+
+    def last_row_id(self) -> int:
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {self._get_table().name}")
+            last_id = cursor.fetchone()[0]
+            conn.commit()
+            cursor.close()
+        return last_id
+
+    def delete_rows_after(self, row_id: int):
+        """Removes rows inserted after `row_id`, restoring the loaded dataset and its statistics"""
+        table = self._get_table().name
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"DELETE FROM {table} WHERE id > %s", (row_id,))
+            conn.commit()
+            cursor.close()
+        self.vacuum()
+
+    def vacuum(self):
+        """Clears dead rows left by deletes and rolled back inserts, and analyzes"""
+        with self.pool.connection() as conn:
+            # VACUUM cannot run in a transaction, reset on return
+            conn.autocommit = True
+            cursor = conn.cursor()
+            cursor.execute(f"VACUUM (ANALYZE) {self._get_table().name}")
+            cursor.close()
+
     def _create_migrator(self):
         migrations_folder = self._get_correct_schema_path()
         migrator = DatabaseMigrator(self.database_url, migrations_folder)
@@ -51,6 +274,22 @@ class BaseClient(metaclass=ABCMeta):
     @abstractmethod
     def _get_correct_schema_path(self) -> Path: ...
 
+    @abstractmethod
+    def _get_table(self) -> Table: ...
+
+    @abstractmethod
+    def queries(self) -> List[Query]: ...
+
+    @abstractmethod
+    def _event_to_row(self, event: Event) -> Row: ...
+
+    def _event_fields(self) -> Optional[Dict[str, EventField]]:
+        """
+        Where each table column comes from in an `Event`, for the compiled encoder and
+        server synthesis. None encodes `_event_to_row` rows and cannot synthesize.
+        """
+        return None
+
     @abstractmethod
     def batch_inserts(self, events: List[Event]): ...
 
@@ -58,16 +297,305 @@ class BaseClient(metaclass=ABCMeta):
     def generate_insert_payload(num_of_events: int) -> List[Event]:
         return [EventFactory() for _ in range(num_of_events)]
 
-    @abstractmethod
-    def benchmark_queries(self) -> Dict[str, float]:
-        """Returns the average execution time for each query
-        :returns: Dict [string, float] => { query_1: avg_time, ... }
+    def _get_shaper(self) -> Optional[WorkloadShaper]:
+        if self._shaper is None and self.load_options.shape is not None:
+            shape = self.load_options.shape
+            if shape.anchor is None:
+                shape = replace(shape, anchor=self.load_options.anchor)
+            self._shaper = WorkloadShaper(shape, self.load_options.seed)
+        return self._shaper
+
+    def _get_columnar_factory(self) -> ColumnarEventFactory:
+        if self._columnar_factory is None:
+            self._columnar_factory = ColumnarEventFactory(
+                seed=self.load_options.seed,
+                anchor=self.load_options.anchor,
+                shaper=self._get_shaper(),
+            )
+        return self._columnar_factory
+
+    def generate_columnar_payload(self, num_of_events: int) -> EventBatch:
+        return self._get_columnar_factory().generate(0, num_of_events)
+
+    def _get_encoder(self) -> Optional[EventEncoder]:
+        if not self.load_options.compiled_encoder or self._event_fields() is None:
+            return None
+        if self._encoder is None:
+            self._encoder = EventEncoder(self._get_table(), self._event_fields())
+        return self._encoder
+
+    def prepare_events(self, events: List[Event]) -> Any:
+        """Encodes events for `send_chunk` with the compiled encoder"""
+        return self._get_encoder().encode(events, self.load_options.strategy)
+
+    def _get_synthesizer(self) -> ServerEventSynthesizer:
+        if self._synthesizer is None:
+            self._synthesizer = ServerEventSynthesizer(
+                seed=self.load_options.seed,
+                anchor=self.load_options.anchor,
+                shaper=self._get_shaper(),
+            )
+        return self._synthesizer
+
+    def prepare_synthesis(self, start: int, count: int) -> Any:
+        """The statement synthesizing rows [start, start + count) for `send_chunk`"""
+        return self._get_synthesizer().chunk(
+            self._get_table(), self._event_fields(), start, count
+        )
+
+    def generate_rows(self, start: int, count: int) -> Iterator[Row]:
         """
+        Generates rows [start, start + count) of the dataset from the configured source.
+        Server synthesized datasets fall back to the columnar generator for the rows
+        needed client side, e.g. by the ingest tuner.
+        """
+        if self.load_options.source in (EventSource.COLUMNAR, EventSource.SERVER):
+            return self._get_columnar_factory().generate(start, count).rows()
+        return (self._event_to_row(e) for e in self.generate_events(start, count))
 
-    @abstractmethod
-    def run_benchmark(self, number_of_records: int) -> Dict[str, Dict[str, float]]:
+    def generate_events(self, start: int, count: int) -> List[Event]:
+        """Generates events [start, start + count) of the dataset with `EventFactory`"""
+        # best effort only: without a shape uuid4 run ids and `datetime.now` timestamps
+        # stay random, with one the per row attributes (e.g. instance cost) still are
+        chunk_seed = f"{self.load_options.seed}:{start}"
+        reseed_random(chunk_seed)
+        random.seed(chunk_seed)
+        shaper = self._get_shaper()
+        if shaper is None:
+            return self.generate_insert_payload(count)
+        shaped = shaper.columns(start, count)
+        return [
+            EventFactory(
+                run_id=run_id,
+                run_name=run_name,
+                pipeline_name=pipeline_name,
+                timestamp=timestamp,
+                tags=PipelineTags(env=env, owner=owner),
+            )
+            for run_id, run_name, pipeline_name, timestamp, env, owner in zip(
+                shaped.run_id,
+                shaped.run_name,
+                shaped.pipeline_name,
+                shaped.event_timestamp.tolist(),
+                shaped.env,
+                shaped.owner,
+            )
+        ]
+
+    def _get_dataset_cache(self) -> Optional[DatasetCache]:
+        options = self.load_options
+        if (
+            options.cache_dir is None
+            or options.strategy not in CACHED_STRATEGIES
+            or options.source == EventSource.SERVER
+        ):
+            return None
+        if self._dataset_cache is None:
+            self._dataset_cache = DatasetCache(
+                Path(options.cache_dir),
+                dataset_key(self._get_table(), options),
+                self._get_table(),
+                options.strategy,
+            )
+        return self._dataset_cache
+
+    def prepare_cached(self, chunk: CachedChunk) -> Any:
+        """Turns a chunk read from the dataset cache into a `send_chunk` payload"""
+        return chunk.payload
+
+    def encode_chunk(self, start: int, count: int) -> Any:
+        """Generates rows [start, start + count) and encodes them for `send_chunk`"""
+        if self.load_options.source == EventSource.SERVER:
+            return self.prepare_synthesis(start, count)
+        cache = self._get_dataset_cache()
+        if cache is not None and cache.covers(start, count):
+            return self.prepare_cached(cache.read(start, count))
+        if (
+            self.load_options.source == EventSource.FACTORY
+            and self._get_encoder() is not None
+        ):
+            return self.prepare_events(self.generate_events(start, count))
+        return self.prepare_chunk(self.generate_rows(start, count))
+
+    def iter_encoded_chunks(
+        self, bounds: Sequence[Tuple[int, int]], stats: Optional[ChunkStats] = None
+    ) -> Iterator[Tuple[int, Any]]:
+        """
+        Yields (rows, payload) per (chunk_start, chunk_rows) bound, ready for `send_chunk`,
+        adding the encoding time and payload size to `stats` when given
+        """
+        for chunk_start, chunk_rows in bounds:
+            started = time.perf_counter()
+            payload = self.encode_chunk(chunk_start, chunk_rows)
+            if stats is not None:
+                stats.encode_seconds += time.perf_counter() - started
+                stats.payload_bytes += self.payload_bytes(payload)
+            yield chunk_rows, payload
+
+    def _load_chunks(self, bounds: Sequence[Tuple[int, int]]) -> ChunkStats:
+        stats = ChunkStats()
+        chunks = self.iter_encoded_chunks(bounds, stats)
+        with self.pool.connection() as conn:
+            for chunk_rows, payload in prefetch(chunks, self.load_options.prefetch):
+                started = time.perf_counter()
+                self.send_chunk(payload, conn)
+                stats.send_seconds += time.perf_counter() - started
+                stats.rows += chunk_rows
+        return stats
+
+    def _server_counters(self, statement_stats: bool):
+        with self.pool.connection() as conn:
+            return read_counters(conn, self._get_table().name, statement_stats)
+
+    def load(self, number_of_records: int, start: int = 0) -> LoadReport:
+        """
+        Streams `number_of_records` generated events into the database chunk by chunk.
+        Chunks are generated and encoded on a background thread while the previous one
+        is inserted, so memory stays bounded by `chunk_size * (prefetch + 2)` rows.
+
+        With `workers > 1` chunks are dealt round-robin to a process pool, each worker
+        streaming into its own connection. Rows are keyed by their position in the
+        dataset, so the data does not depend on the number of workers.
+        """
+        bounds = list(
+            chunk_bounds(start, number_of_records, self.load_options.chunk_size)
+        )
+        workers = max(1, min(self.load_options.workers, len(bounds)))
+        cache = self._get_dataset_cache()
+        if cache is not None:
+            # generated once, outside the timed load, every later load streams the files
+            cache.ensure(
+                start + number_of_records,
+                self.generate_rows,
+                self.load_options.chunk_size,
+            )
+        self.prepare_load(start, number_of_records)
+        with self.pool.connection() as conn:
+            statement_stats = enable_statement_stats(conn)
+        before = self._server_counters(statement_stats)
+
+        started = time.perf_counter()
+        if workers == 1:
+            stats = self._load_chunks(bounds)
+        else:
+            # built once here so every worker shares the same pools and time anchor
+            if self.load_options.source == EventSource.COLUMNAR:
+                self._get_columnar_factory()
+            elif self.load_options.source == EventSource.SERVER:
+                self._get_synthesizer()
+            else:
+                self._get_shaper()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                stats = sum(
+                    pool.map(
+                        _load_worker,
+                        [self] * workers,
+                        [bounds[w::workers] for w in range(workers)],
+                    ),
+                    ChunkStats(),
+                )
+        seconds = time.perf_counter() - started
+
+        after = self._server_counters(statement_stats)
+        with self.pool.connection() as conn:
+            wal_bytes = wal_bytes_between(conn, before.wal_lsn, after.wal_lsn)
+        report = LoadReport(
+            rows=stats.rows,
+            seconds=seconds,
+            workers=workers,
+            payload_bytes=stats.payload_bytes,
+            encode_seconds=stats.encode_seconds,
+            send_seconds=stats.send_seconds,
+            wal_bytes=wal_bytes,
+            heap_bytes=after.heap_bytes - before.heap_bytes,
+            index_bytes=after.index_bytes - before.index_bytes,
+            toast_bytes=after.toast_bytes - before.toast_bytes,
+            database_bytes=after.database_bytes - before.database_bytes,
+        )
+        if statement_stats:
+            report.server_seconds = (after.exec_ms - before.exec_ms) / 1000
+        print(
+            f"loaded {report.rows} rows into {self.name()} in {report.seconds:.2f}s "
+            f"with {report.workers} worker(s) ({report.rows_per_s:,.0f} rows/s, "
+            f"{report.mb_per_s:.1f}MB/s, {report.wal_bytes / 2**20:.1f}MiB WAL)"
+        )
+        server = (
+            ""
+            if math.isnan(report.server_seconds)
+            else (f" (server {report.server_seconds:.2f}s)")
+        )
+        print(
+            f" encode {report.encode_seconds:.2f}s, send {report.send_seconds:.2f}s{server}, "
+            f"heap +{report.heap_bytes / 2**20:.1f}MiB, "
+            f"indexes +{report.index_bytes / 2**20:.1f}MiB, "
+            f"TOAST +{report.toast_bytes / 2**20:.1f}MiB"
+        )
+        return report
+
+    def _explain(self, conn: connection, query: Query) -> List[dict]:
+        cur = conn.cursor()
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, SETTINGS, FORMAT JSON) {query.query}")
+        result = cur.fetchone()[0]  # EXPLAIN result as JSON
+        conn.commit()
+        cur.close()
+        return result
+
+    @contextmanager
+    def _session_settings(self, conn: connection, profile: Optional[SettingsProfile]):
+        """Applies the profile's settings to a borrowed connection until the block exits"""
+        if profile is None or not profile.settings:
+            yield
+            return
+        cur = conn.cursor()
+        for name, value in profile.settings.items():
+            cur.execute("SELECT set_config(%s, %s, false)", (name, value))
+        conn.commit()
+        try:
+            yield
+        finally:
+            if not conn.closed:
+                conn.rollback()
+                cur.execute("RESET ALL")
+                conn.commit()
+            cur.close()
+
+    def _empty_caches(self):
+        # the pool is emptied either way, so the next borrow is a fresh backend
+        self.pool.reset()
+        command = self.benchmark_options.cold_cache_command
+        if command:
+            subprocess.run(command, shell=True, check=True)
+        self._wait_for_db()
+
+    def measure_query(
+        self, query: Query, profile: Optional[SettingsProfile] = None
+    ) -> TimingSummary:
+        """
+        Times a query cold (after emptying caches), then warm after the warmup runs,
+        under the session settings of `profile` when given
         """
-        Handles client migration, benchmark run and cleanup
+        options = self.benchmark_options
 
-        :returns: Dict[str, Dict[str, float]]: dictionary of client_name to benchmark results
+        cold_samples = []
+        for _ in range(options.cold_repetitions):
+            self._empty_caches()
+            with self.pool.connection() as conn, self._session_settings(conn, profile):
+                cold_samples.append(self._explain(conn, query)[0]["Execution Time"])
+
+        samples, plan = [], None
+        with self.pool.connection() as conn, self._session_settings(conn, profile):
+            for _ in range(options.warmup):
+                self._explain(conn, query)
+
+            for _ in range(options.repetitions):
+                plan = self._explain(conn, query)
+                samples.append(plan[0]["Execution Time"])
+        return TimingSummary(samples=samples, cold_samples=cold_samples, plan=plan)
+
+    @abstractmethod
+    def benchmark_queries(
+        self, profile: Optional[SettingsProfile] = None
+    ) -> Dict[str, TimingSummary]:
+        """Returns the execution time distribution of each query, under `profile` when given
+        :returns: Dict [string, TimingSummary] => { query_1: timings, ... }
         """
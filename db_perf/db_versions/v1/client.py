@@ -1,27 +1,143 @@
-import json
+import time
 from pathlib import Path
-from typing import Dict, List
-
-from psycopg2.extras import Json
+from typing import Dict, List, Optional
 
 from db_perf.db_versions.base import BaseClient
 from db_perf.db_versions.v1.queries import (
     AVG_PIPELINE_DURATION_6MONTHS,
+    AVG_PIPELINE_DURATION_6MONTHS_PARAMETERIZED,
+    AVG_PIPELINE_DURATION_6MONTHS_RUN_MONTHS,
+    COST_ATTRIBUTION_PARAMETERIZED,
     COST_ATTRIBUTION_QUERY,
+    STATUS_PIPELINE_RUNS_THIS_MONTH_PARAMETERIZED,
     STATUS_PIPELINE_RUNS_THIS_MONTH_QUERY,
+    STATUS_PIPELINE_RUNS_THIS_MONTH_SINGLE_SCAN,
 )
+from db_perf.encoder import EventField
+from db_perf.ingest import adapt_row, insert_sql
 from db_perf.models.events import Event
-from db_perf.models.query import Query
+from db_perf.models.query import Query, QueryParameter
+from db_perf.models.settings import SettingsProfile
+from db_perf.models.table import Column, Table
+from db_perf.models.timing import TimingSummary
+
+# dashboard parameters, drawn from the values of the loaded events
+MONTH = QueryParameter(
+    "month",
+    "timestamp",
+    "SELECT DISTINCT DATE_TRUNC('month', event_timestamp) FROM batch_jobs_logs "
+    "WHERE event_timestamp IS NOT NULL",
+)
+NOW = QueryParameter(
+    "now", "timestamp", "SELECT MAX(event_timestamp) FROM batch_jobs_logs"
+)
+PIPELINE_NAME = QueryParameter(
+    "pipeline_name",
+    "text",
+    "SELECT DISTINCT pipeline_name FROM batch_jobs_logs "
+    "WHERE pipeline_name IS NOT NULL",
+)
+# one tag per filter, e.g. {"env": "prod"}, from the tags of the first 10000 events
+TAGS = QueryParameter(
+    "tags",
+    "jsonb",
+    "SELECT DISTINCT jsonb_build_object(t.key, t.value)::text "
+    "FROM (SELECT tags FROM batch_jobs_logs WHERE jsonb_typeof(tags) = 'object' "
+    "ORDER BY id LIMIT 10000) b, jsonb_each(b.tags) t",
+)
 
 QUERIES = [
-    Query(name="cost_attribution_query", query=COST_ATTRIBUTION_QUERY),
-    Query(name="avg_pipeline_duration_6months", query=AVG_PIPELINE_DURATION_6MONTHS),
+    Query(
+        name="cost_attribution_query",
+        query=COST_ATTRIBUTION_QUERY,
+        parameterized=COST_ATTRIBUTION_PARAMETERIZED,
+        parameters=[MONTH, TAGS, NOW],
+    ),
+    Query(
+        name="avg_pipeline_duration_6months",
+        query=AVG_PIPELINE_DURATION_6MONTHS,
+        variants={"run_months": AVG_PIPELINE_DURATION_6MONTHS_RUN_MONTHS},
+        parameterized=AVG_PIPELINE_DURATION_6MONTHS_PARAMETERIZED,
+        parameters=[NOW, PIPELINE_NAME],
+    ),
     Query(
         name="status_pipeline_runs_this_month_query",
         query=STATUS_PIPELINE_RUNS_THIS_MONTH_QUERY,
+        variants={"single_scan": STATUS_PIPELINE_RUNS_THIS_MONTH_SINGLE_SCAN},
+        parameterized=STATUS_PIPELINE_RUNS_THIS_MONTH_PARAMETERIZED,
+        parameters=[MONTH, TAGS, NOW],
     ),
 ]
 
+BATCH_JOBS_LOGS = Table(
+    name="batch_jobs_logs",
+    columns=(
+        Column("data", "jsonb"),
+        Column("job_id", "text"),
+        Column("run_name", "text"),
+        Column("run_id", "text"),
+        Column("pipeline_name", "text"),
+        Column("nextflow_session_uuid", "text"),
+        Column("job_ids", "text[]"),
+        Column("tags", "jsonb"),
+        Column("event_timestamp", "timestamp"),
+        Column("ec2_cost_per_hour", "float8"),
+        Column("cpu_usage", "float8"),
+        Column("mem_used", "float8"),
+        Column("processed_dataset", "int4"),
+    ),
+)
+
+
+# where the compiled encoder reads each column from, mirroring `event_to_row`
+BATCH_JOBS_LOGS_FIELDS = {
+    "data": EventField(""),
+    "job_id": EventField(default="default"),
+    "run_name": EventField("run_name"),
+    "run_id": EventField("run_id"),
+    "pipeline_name": EventField("pipeline_name"),
+    # `EventAttributes` has no session_uuid, jobs_ids or process_dataset_stats, so
+    # `event_to_row` always falls back to its defaults for these
+    "nextflow_session_uuid": EventField(default=None),
+    "job_ids": EventField(default=[]),
+    "tags": EventField("tags"),
+    "event_timestamp": EventField("timestamp"),
+    "ec2_cost_per_hour": EventField("attributes.system_properties.ec2_cost_per_hour"),
+    "cpu_usage": EventField("attributes.system_metric.system_cpu_utilization"),
+    "mem_used": EventField("attributes.system_metric.system_memory_used"),
+    "processed_dataset": EventField(default=None),
+}
+
+
+def event_to_row(event: Event) -> tuple:
+    """Extracts the `batch_jobs_logs` column values of an event, in table column order"""
+    attributes = event.attributes
+    system_metric = (
+        attributes.system_metric if attributes and attributes.system_metric else None
+    )
+    system_props = (
+        attributes.system_properties
+        if attributes and attributes.system_properties
+        else None
+    )
+    process_dataset = getattr(attributes, "process_dataset_stats", None)
+
+    return (
+        event.model_dump(mode="json"),
+        "default",  # fallback job_id
+        event.run_name,
+        event.run_id,
+        event.pipeline_name,
+        getattr(attributes, "session_uuid", None),
+        getattr(attributes, "jobs_ids", []),
+        event.tags.model_dump(mode="json") if event.tags else None,
+        event.timestamp,
+        getattr(system_props, "ec2_cost_per_hour", None),
+        getattr(system_metric, "system_cpu_utilization", None),
+        getattr(system_metric, "system_memory_used", None),
+        getattr(process_dataset, "total", None),
+    )
+
 
 class DbClient(BaseClient):
     def name(self) -> str:
@@ -30,131 +146,51 @@ class DbClient(BaseClient):
     def _get_correct_schema_path(self) -> Path:
         return self.schema_basedir / "v1/migrations"
 
-    def insert_event(self, event: Event):
-        cursor = self.conn.cursor()
-        data_json = Json(event.model_dump(mode="json"), dumps=json.dumps)
-
-        attributes = event.attributes
-        system_metric = (
-            attributes.system_metric
-            if attributes and attributes.system_metric
-            else None
-        )
-        system_props = (
-            attributes.system_properties
-            if attributes and attributes.system_properties
-            else None
-        )
-        process_dataset = getattr(attributes, "process_dataset_stats", None)
-
-        cursor.execute(
-            """
-            INSERT INTO batch_jobs_logs (
-                data, job_id, run_name, run_id, pipeline_name, nextflow_session_uuid, job_ids,
-                tags, event_timestamp, ec2_cost_per_hour, cpu_usage, mem_used, processed_dataset
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            (
-                data_json,
-                "default",  # fallback job_id
-                event.run_name,
-                event.run_id,
-                event.pipeline_name,
-                getattr(attributes, "session_uuid", None),
-                getattr(attributes, "jobs_ids", []),
-                Json(event.tags.model_dump(mode="json")) if event.tags else None,
-                event.timestamp,
-                getattr(system_props, "ec2_cost_per_hour", None),
-                getattr(system_metric, "system_cpu_utilization", None),
-                getattr(system_metric, "system_memory_used", None),
-                getattr(process_dataset, "total", None),
-            ),
-        )
-        self.conn.commit()
-        cursor.close()
+    def _get_table(self) -> Table:
+        return BATCH_JOBS_LOGS
 
-    def batch_inserts(self, events: List[Event]):
-        print("calling batch inserts....")
-        cursor = self.conn.cursor()
-
-        records = []
-        for event in events:
-            attributes = event.attributes
-            system_metric = (
-                attributes.system_metric
-                if attributes and attributes.system_metric
-                else None
-            )
-            system_props = (
-                attributes.system_properties
-                if attributes and attributes.system_properties
-                else None
-            )
-            process_dataset = getattr(attributes, "process_dataset_stats", None)
-
-            record = (
-                Json(event.model_dump(mode="json"), dumps=json.dumps),
-                "default",
-                event.run_name,
-                event.run_id,
-                event.pipeline_name,
-                getattr(attributes, "session_uuid", None),
-                getattr(attributes, "jobs_ids", []),
-                Json(event.tags.model_dump(mode="json")) if event.tags else None,
-                event.timestamp,
-                getattr(system_props, "ec2_cost_per_hour", None),
-                getattr(system_metric, "system_cpu_utilization", None),
-                getattr(system_metric, "system_memory_used", None),
-                getattr(process_dataset, "total", None),
-            )
-            records.append(record)
-
-        cursor.executemany(
-            """
-                INSERT INTO batch_jobs_logs (
-                    data, job_id, run_name, run_id, pipeline_name, nextflow_session_uuid, job_ids,
-                    tags, event_timestamp, ec2_cost_per_hour, cpu_usage, mem_used, processed_dataset
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-            records,
-        )
-
-        self.conn.commit()
-        cursor.close()
-
-    def benchmark_queries(self) -> Dict[str, float]:
-        results = {}
-        for query in QUERIES:
-            label = f"query_{query.name}"
-            print(f"Running query benchmark on {label}")
+    def queries(self) -> List[Query]:
+        return QUERIES
 
-            explain_query = f"EXPLAIN (ANALYZE, FORMAT JSON) {query.query}"
+    def _event_to_row(self, event: Event) -> tuple:
+        return event_to_row(event)
 
-            cur = self.conn.cursor()
-            cur.execute(explain_query)
-            result = cur.fetchone()
-            if not result:
-                return {}
+    def _event_fields(self) -> Dict[str, EventField]:
+        return BATCH_JOBS_LOGS_FIELDS
 
-            print(" result ..", result)
+    def insert_event(self, event: Event):
+        table = self._get_table()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            row = adapt_row(table, self._event_to_row(event))
+            cursor.execute(insert_sql(table), row)
+            conn.commit()
+            cursor.close()
 
-            result = result[0]  # EXPLAIN result as JSON
-            cur.close()
-            execution_time_ms = result[0]["Execution Time"]
+    def batch_inserts(self, events: List[Event]):
+        print(f"calling batch inserts with {self.load_options.strategy.value}....")
+        started = time.perf_counter()
+        if self._get_encoder() is not None:
+            self.send_chunk(self.prepare_events(events))
+        else:
+            self.insert_rows(self._event_to_row(event) for event in events)
+        elapsed = time.perf_counter() - started
+        print(f"inserted {len(events)} rows in {elapsed:.2f}s")
+
+    def benchmark_queries(
+        self, profile: Optional[SettingsProfile] = None
+    ) -> Dict[str, TimingSummary]:
+        results = {}
+        for query in self.queries():
+            label = f"query_{query.name}"
+            suffix = f" with {profile.name} settings" if profile is not None else ""
+            print(f"Running query benchmark on {label}{suffix}")
 
-            results[label] = execution_time_ms
-        self.conn.close()
-        return results
+            timings = self.measure_query(query, profile)
+            print(
+                f" {label}: median {timings.median:.2f}ms, p95 {timings.p95:.2f}ms, "
+                f"cold {timings.cold:.2f}ms over {timings.n} runs"
+            )
 
-    def run_benchmark(self, number_of_records: int) -> Dict[str, Dict[str, float]]:
-
-        print(f"Running insert benchmark on {self.name()}")
-        payload = self.generate_insert_payload(number_of_records)
-        print("Running migrations ...")
-        self.migrator.run_migrations()
-        self.batch_inserts(payload)
-        print(f"benchmarking Queries for {self.name()}")
-        results = {self.name(): self.benchmark_queries()}
-        print(f"Cleaning up after bench mark for {self.name()}")
-        self.migrator.rollback_migrations()
+            results[label] = timings
         return results
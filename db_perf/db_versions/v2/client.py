@@ -0,0 +1,182 @@
+"""
+Monthly range partitioning of the v1 table. The v1 queries run unchanged, and
+`avg_pipeline_duration_6months_pruned` bounds the 6 months query to the months it
+reports so the planner prunes older partitions. Runs starting before that window
+lose their earlier events, so it is reported on its own rather than compared with v1.
+"""
+
+from dataclasses import dataclass, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+from psycopg2.extensions import connection
+
+from db_perf.cache import CachedChunk
+from db_perf.db_versions.v1 import DbClient as DbClientV1
+from db_perf.db_versions.v2.queries import (
+    AVG_PIPELINE_DURATION_6MONTHS,
+    AVG_PIPELINE_DURATION_6MONTHS_PRUNED,
+    COST_ATTRIBUTION_QUERY,
+    STATUS_PIPELINE_RUNS_THIS_MONTH_QUERY,
+)
+from db_perf.ingest import Row, naive_utc
+from db_perf.models.events import Event
+from db_perf.models.load import EventSource
+from db_perf.models.query import Query
+
+QUERIES = [
+    Query(name="cost_attribution_query", query=COST_ATTRIBUTION_QUERY),
+    Query(name="avg_pipeline_duration_6months", query=AVG_PIPELINE_DURATION_6MONTHS),
+    # not in the dashboard mix, no v1 counterpart: read it next to the query above
+    Query(
+        name="avg_pipeline_duration_6months_pruned",
+        query=AVG_PIPELINE_DURATION_6MONTHS_PRUNED,
+        weight=0.0,
+    ),
+    Query(
+        name="status_pipeline_runs_this_month_query",
+        query=STATUS_PIPELINE_RUNS_THIS_MONTH_QUERY,
+    ),
+]
+
+
+@dataclass
+class PartitionedChunk:
+    """An encoded chunk with the event_timestamp range its partitions must cover"""
+
+    payload: Any
+    first: Optional[datetime]
+    last: Optional[datetime]
+
+
+class DbClient(DbClientV1):
+    """
+    Same table and ingest path as v1, with `batch_jobs_logs` range partitioned by
+    month on `event_timestamp`. Partitions are created ahead of the rows that need
+    them, on a connection of their own, and the months known to be covered are
+    remembered so chunks in them skip the call. Rows outside of every partition
+    land in the default partition.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._months: Set[Tuple[int, int]] = set()  # (year, month) with a partition
+
+    def name(self) -> str:
+        return "db_client_v2"
+
+    def _get_correct_schema_path(self) -> Path:
+        return self.schema_basedir / "v2/migrations"
+
+    def queries(self) -> List[Query]:
+        return QUERIES
+
+    def _timestamp_range(
+        self, rows: List[Row]
+    ) -> Tuple[Optional[datetime], Optional[datetime]]:
+        index = self._get_table().column_names.index("event_timestamp")
+        timestamps = [naive_utc(row[index]) for row in rows if row[index] is not None]
+        if not timestamps:
+            return None, None
+        return min(timestamps), max(timestamps)
+
+    def ensure_partitions(self, first: datetime, last: datetime):
+        """
+        Creates the monthly partitions covering [first, last] in their own
+        transaction, on a pooled connection so the caller's transaction is left open
+        """
+        months, year, month = set(), first.year, first.month
+        while (year, month) <= (last.year, last.month):
+            months.add((year, month))
+            year, month = year + month // 12, month % 12 + 1
+        if months <= self._months:
+            return
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT ensure_batch_jobs_logs_partitions(%s, %s)", (first, last)
+            )
+            conn.commit()
+            cursor.close()
+        self._months |= months
+
+    def _rows_time_range(
+        self, start: int, count: int
+    ) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Bounds of the timestamps of rows [start, start + count) when known ahead"""
+        if self.load_options.source == EventSource.SERVER:
+            return self._get_synthesizer().time_range(start, count)
+        cache = self._get_dataset_cache()
+        if cache is not None and cache.covers(start, count):
+            chunk = cache.read(start, count)
+            return chunk.first, chunk.last
+        return None, None
+
+    def prepare_load(self, start: int, count: int):
+        first, last = self._rows_time_range(start, count)
+        if first is not None:
+            self.ensure_partitions(first, last)
+
+    def prepare_chunk(self, rows: Iterable[Row]) -> PartitionedChunk:
+        rows = list(rows)
+        first, last = self._timestamp_range(rows)
+        return PartitionedChunk(super().prepare_chunk(rows), first, last)
+
+    def prepare_events(self, events: List[Event]) -> PartitionedChunk:
+        timestamps = [naive_utc(event.timestamp) for event in events]
+        first, last = (min(timestamps), max(timestamps)) if timestamps else (None, None)
+        return PartitionedChunk(super().prepare_events(events), first, last)
+
+    def prepare_cached(self, chunk: CachedChunk) -> PartitionedChunk:
+        return PartitionedChunk(super().prepare_cached(chunk), chunk.first, chunk.last)
+
+    def prepare_synthesis(self, start: int, count: int) -> PartitionedChunk:
+        first, last = self._get_synthesizer().time_range(start, count)
+        return PartitionedChunk(super().prepare_synthesis(start, count), first, last)
+
+    def payload_bytes(self, payload: PartitionedChunk) -> int:
+        return super().payload_bytes(payload.payload)
+
+    def send_chunk(
+        self,
+        payload: PartitionedChunk,
+        conn: Optional[connection] = None,
+        commit: bool = True,
+    ):
+        if conn is None:
+            with self.pool.connection() as conn:
+                self.send_chunk(payload, conn, commit)
+            return
+        if payload.first is not None:
+            self.ensure_partitions(payload.first, payload.last)
+        super().send_chunk(payload.payload, conn, commit)
+
+    def prepare_send(self, payloads: List[PartitionedChunk]) -> List[PartitionedChunk]:
+        ranges = [(p.first, p.last) for p in payloads if p.first is not None]
+        if ranges:
+            self.ensure_partitions(
+                min(first for first, _ in ranges), max(last for _, last in ranges)
+            )
+        # covered, `send_chunk` does not create them again
+        return [
+            replace(p, first=None, last=None) for p in super().prepare_send(payloads)
+        ]
+
+    def insert_rows(self, rows: Iterable[Row]):
+        rows = list(rows)
+        first, last = self._timestamp_range(rows)
+        if first is not None:
+            self.ensure_partitions(first, last)
+        super().insert_rows(rows)
+
+    def insert_event(self, event: Event):
+        self.insert_rows([self._event_to_row(event)])
+
+    def setup(self):
+        self._months.clear()
+        super().setup()
+
+    def restore_template(self, number_of_records: Optional[int] = None) -> bool:
+        self._months.clear()
+        return super().restore_template(number_of_records)
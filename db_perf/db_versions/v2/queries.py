@@ -0,0 +1,46 @@
+from db_perf.db_versions.v1.queries import (
+    AVG_PIPELINE_DURATION_6MONTHS,
+    COST_ATTRIBUTION_QUERY,
+    STATUS_PIPELINE_RUNS_THIS_MONTH_QUERY,
+)
+
+# Average pipeline Duration 6 months, bounded to the months it reports so only their
+# partitions are scanned. Runs that started before the window lose their earlier
+# events, so it does not return the v1 rows and is benchmarked under its own name.
+AVG_PIPELINE_DURATION_6MONTHS_PRUNED = """
+WITH months AS (
+  SELECT generate_series(
+    DATE_TRUNC('month', NOW()) - INTERVAL '6 months',
+    DATE_TRUNC('month', NOW()),
+    INTERVAL '1 month'
+  ) AS month_timestamp
+),
+
+time_series_runtime AS (
+  SELECT 
+    DATE_TRUNC('month', event_timestamp) AS month_timestamp,
+    AVG(run_duration_hours) AS average_runtime_hours,
+    COUNT(DISTINCT pipeline_name) AS unique_pipelines
+  FROM (
+    SELECT 
+      event_timestamp,
+      run_id,
+      pipeline_name,
+      EXTRACT(EPOCH FROM (MAX(event_timestamp) OVER (PARTITION BY run_id) - 
+               MIN(event_timestamp) OVER (PARTITION BY run_id))) / 3600 AS run_duration_hours
+    FROM batch_jobs_logs
+    WHERE pipeline_name IS NOT NULL
+      AND event_timestamp >= DATE_TRUNC('month', NOW()) - INTERVAL '6 months'
+      AND event_timestamp < DATE_TRUNC('month', NOW()) + INTERVAL '1 month'
+  ) AS run_durations
+  GROUP BY DATE_TRUNC('month', event_timestamp)
+)
+
+SELECT 
+  m.month_timestamp::timestamp AS time,
+  COALESCE(t.average_runtime_hours, 0)::float AS average_pipeline_runtime_hours
+FROM months m
+LEFT JOIN time_series_runtime t
+ON m.month_timestamp = t.month_timestamp
+ORDER BY time;
+"""
@@ -0,0 +1,107 @@
+from pathlib import Path
+from typing import List
+
+from db_perf.db_versions.v1 import DbClient as DbClientV1
+from db_perf.db_versions.v3.queries import (
+    AVG_PIPELINE_DURATION_6MONTHS,
+    COST_ATTRIBUTION_QUERY,
+    STATUS_PIPELINE_RUNS_THIS_MONTH_QUERY,
+)
+from db_perf.models.query import Query
+
+QUERIES = [
+    Query(name="cost_attribution_query", query=COST_ATTRIBUTION_QUERY),
+    Query(name="avg_pipeline_duration_6months", query=AVG_PIPELINE_DURATION_6MONTHS),
+    Query(
+        name="status_pipeline_runs_this_month_query",
+        query=STATUS_PIPELINE_RUNS_THIS_MONTH_QUERY,
+    ),
+]
+
+
+# summary keys and months of the events about to be deleted
+CAPTURE_SUMMARY_KEYS = """
+CREATE TEMPORARY TABLE deleted_summary_keys ON COMMIT DROP AS
+SELECT DISTINCT
+    md5(ROW(run_id, pipeline_name, tags)::text)::uuid AS summary_key,
+    COALESCE(DATE_TRUNC('month', event_timestamp), '-infinity') AS month
+FROM batch_jobs_logs
+WHERE id > %s
+"""
+
+DELETE_SUMMARY_ROWS = """
+DELETE FROM run_summary s
+USING deleted_summary_keys d
+WHERE s.summary_key = d.summary_key AND s.month = d.month
+"""
+
+# same aggregate as rebuild_run_summary(), over the remaining events of those keys
+RESUMMARIZE_KEYS = """
+INSERT INTO run_summary (
+    summary_key, month, run_id, pipeline_name, tags, first_ts, last_ts,
+    max_cost_per_hour, max_cpu_usage, max_mem_used, event_count
+)
+SELECT
+    md5(ROW(run_id, pipeline_name, tags)::text)::uuid,
+    COALESCE(DATE_TRUNC('month', event_timestamp), '-infinity'),
+    run_id,
+    pipeline_name,
+    tags,
+    MIN(event_timestamp),
+    MAX(event_timestamp),
+    MAX(ec2_cost_per_hour),
+    MAX(cpu_usage),
+    MAX(mem_used),
+    COUNT(*)
+FROM batch_jobs_logs
+WHERE (
+    md5(ROW(run_id, pipeline_name, tags)::text)::uuid,
+    COALESCE(DATE_TRUNC('month', event_timestamp), '-infinity')
+) IN (SELECT summary_key, month FROM deleted_summary_keys)
+GROUP BY 1, 2, run_id, pipeline_name, tags
+"""
+
+
+class DbClient(DbClientV1):
+    """
+    v1 events plus a `run_summary` rollup kept up to date by a statement level
+    insert trigger, so ingest pays for the aggregation the queries no longer do.
+    """
+
+    def name(self) -> str:
+        return "db_client_v3"
+
+    def _get_correct_schema_path(self) -> Path:
+        return self.schema_basedir / "v3/migrations"
+
+    def queries(self) -> List[Query]:
+        return QUERIES
+
+    def analyze(self):
+        super().analyze()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("ANALYZE run_summary")
+            conn.commit()
+            cursor.close()
+
+    def delete_rows_after(self, row_id: int):
+        # the trigger only folds inserts in, so the summary rows of the deleted events
+        # are recomputed from what is left of their runs, in the same transaction
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(CAPTURE_SUMMARY_KEYS, (row_id,))
+            cursor.execute("DELETE FROM batch_jobs_logs WHERE id > %s", (row_id,))
+            cursor.execute(DELETE_SUMMARY_ROWS)
+            cursor.execute(RESUMMARIZE_KEYS)
+            conn.commit()
+            cursor.close()
+        self.vacuum()
+
+    def vacuum(self):
+        super().vacuum()
+        with self.pool.connection() as conn:
+            conn.autocommit = True
+            cursor = conn.cursor()
+            cursor.execute("VACUUM (ANALYZE) run_summary")
+            cursor.close()
@@ -0,0 +1,332 @@
+"""
+Interned tag sets. Their ids are hashed from the tags text, so client loaders, server
+synthesis and cached datasets (whose tag sets are kept in `<key>.tag_sets.json` next
+to the COPY files) all compute the same id without a round trip.
+"""
+
+import hashlib
+import json
+import threading
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from psycopg2.extensions import connection
+from psycopg2.extras import execute_values
+from pydantic import BaseModel
+
+from db_perf.cache import DatasetCache
+from db_perf.db_versions.v1 import client as v1
+from db_perf.db_versions.v4.queries import (
+    COST_ATTRIBUTION_PARAMETERIZED,
+    COST_ATTRIBUTION_QUERY,
+    STATUS_PIPELINE_RUNS_THIS_MONTH_PARAMETERIZED,
+    STATUS_PIPELINE_RUNS_THIS_MONTH_QUERY,
+)
+from db_perf.encoder import EventField
+from db_perf.factories.server import SynthesisChunk
+from db_perf.ingest import Row
+from db_perf.models.events import Event
+from db_perf.models.load import EventSource, LoadReport
+from db_perf.models.query import Query, QueryParameter
+from db_perf.models.table import Column, Table
+
+# one tag per filter, e.g. {"env": "prod"}, from the tag sets of the first 10000 events
+TAGS = QueryParameter(
+    "tags",
+    "jsonb",
+    "SELECT DISTINCT jsonb_build_object(t.key, t.value)::text "
+    "FROM tag_sets s, jsonb_each(s.tags) t WHERE jsonb_typeof(s.tags) = 'object' "
+    "AND s.tag_set_id IN "
+    "(SELECT tag_set_id FROM batch_jobs_logs ORDER BY id LIMIT 10000)",
+)
+
+QUERIES = [
+    Query(
+        name="cost_attribution_query",
+        query=COST_ATTRIBUTION_QUERY,
+        parameterized=COST_ATTRIBUTION_PARAMETERIZED,
+        parameters=[v1.MONTH, TAGS, v1.NOW],
+    ),
+    # does not read tags
+    next(q for q in v1.QUERIES if q.name == "avg_pipeline_duration_6months"),
+    Query(
+        name="status_pipeline_runs_this_month_query",
+        query=STATUS_PIPELINE_RUNS_THIS_MONTH_QUERY,
+        parameterized=STATUS_PIPELINE_RUNS_THIS_MONTH_PARAMETERIZED,
+        parameters=[v1.MONTH, TAGS, v1.NOW],
+    ),
+]
+
+TAGS_INDEX = v1.BATCH_JOBS_LOGS.column_names.index("tags")
+
+# v1 columns with `tag_set_id` in place of `tags`
+BATCH_JOBS_LOGS = replace(
+    v1.BATCH_JOBS_LOGS,
+    columns=tuple(
+        Column("tag_set_id", "int8") if column.name == "tags" else column
+        for column in v1.BATCH_JOBS_LOGS.columns
+    ),
+)
+
+# the migration's `tag_set_hash`, how the server ids the tags of synthesized events
+TAG_SET_ID_SQL = "tag_set_hash({})"
+
+# the tag sets of synthesized events are interned by the server, from the inserted rows
+INTERN_SYNTHESIZED = """
+WITH inserted AS ({insert} RETURNING tag_set_id, data -> 'tags' AS tags)
+INSERT INTO tag_sets (tag_set_id, tags)
+SELECT DISTINCT ON (tag_set_id) tag_set_id, tags
+FROM inserted
+WHERE tag_set_id IS NOT NULL
+-- same lock order in every transaction, so concurrent loaders do not deadlock
+ORDER BY tag_set_id
+ON CONFLICT (tag_set_id) DO NOTHING
+"""
+
+
+def _jsonb_order(value: Any) -> Any:
+    if isinstance(value, dict):
+        keys = sorted(value, key=lambda key: (len(key.encode()), key.encode()))
+        return {key: _jsonb_order(value[key]) for key in keys}
+    if isinstance(value, list):
+        return [_jsonb_order(item) for item in value]
+    return value
+
+
+def tag_set_text(tags: Any) -> str:
+    """The tags as Postgres prints them as jsonb: shorter keys first, `, ` and `: `"""
+    if isinstance(tags, BaseModel):
+        tags = tags.model_dump(mode="json")
+    elif isinstance(tags, str):
+        tags = json.loads(tags)
+    return json.dumps(_jsonb_order(tags), ensure_ascii=False, separators=(", ", ": "))
+
+
+def tag_set_id(text: str) -> int:
+    """First 64 bits of the md5 of `tag_set_text`, as `tag_set_hash` in SQL"""
+    return int.from_bytes(hashlib.md5(text.encode()).digest()[:8], "big", signed=True)
+
+
+class TagSetInterner:
+    """
+    Ingest side cache of the tag sets. Ids are derived from the tags, so events are
+    encoded without asking the database for them; tag sets not written yet are
+    queued and written in the transaction of the next chunk sent.
+    """
+
+    def __init__(self):
+        self._ids: Dict[Any, int] = {}  # by tags value as encoded, str or repr
+        self.texts: Dict[int, str] = {}  # every tag set interned, by id
+        self.pending: Dict[int, str] = {}  # not known to be in tag_sets
+        self.known: Set[int] = set()
+        # the background thread encoding chunks interns while the main one writes
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def intern(self, tags: Any) -> Optional[int]:
+        """Id of a tags value (model, dict or jsonb text), queued if new"""
+        if tags is None:
+            return None
+        key = tags if isinstance(tags, str) else repr(tags)
+        tag_set = self._ids.get(key)
+        if tag_set is None:
+            text = tag_set_text(tags)
+            tag_set = tag_set_id(text)
+            with self._lock:
+                self._ids[key] = tag_set
+                self.texts[tag_set] = text
+                if tag_set not in self.known:
+                    self.pending[tag_set] = text
+        return tag_set
+
+    def add(self, tag_sets: Dict[int, str]):
+        """Queues tag sets interned elsewhere, e.g. while filling the dataset cache"""
+        with self._lock:
+            self.texts.update(tag_sets)
+            for tag_set, text in tag_sets.items():
+                if tag_set not in self.known:
+                    self.pending[tag_set] = text
+
+    def reset(self):
+        """The database was recreated, every tag set has to be written again"""
+        with self._lock:
+            self.known.clear()
+            self.pending = dict(self.texts)
+
+    def write_pending(self, cursor) -> Dict[int, str]:
+        """Inserts the queued tag sets in the cursor's transaction, returns them"""
+        with self._lock:
+            pending = dict(self.pending)
+        if pending:
+            # sorted, so concurrent loaders lock the same ids in the same order
+            execute_values(
+                cursor,
+                "INSERT INTO tag_sets (tag_set_id, tags) VALUES %s "
+                "ON CONFLICT (tag_set_id) DO NOTHING",
+                sorted(pending.items()),
+                template="(%s, %s::jsonb)",
+                page_size=len(pending),
+            )
+        return pending
+
+    def mark_written(self, tag_sets: Dict[int, str]):
+        """Tag sets from `write_pending` whose transaction committed"""
+        with self._lock:
+            self.known.update(tag_sets)
+            for tag_set in tag_sets:
+                self.pending.pop(tag_set, None)
+
+
+class DbClient(v1.DbClient):
+    """
+    v1 events with their tags interned into a `tag_sets` dictionary: events carry
+    an integer `tag_set_id`, which the queries group and join on, reading tags
+    documents only from the tag sets they display or filter. Ingest pays for the
+    interning, a lookup per event and a write per new tag set.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._interner = TagSetInterner()
+        self._fields = {
+            name: field
+            for name, field in v1.BATCH_JOBS_LOGS_FIELDS.items()
+            if name != "tags"
+        }
+        self._fields["tag_set_id"] = EventField(
+            "tags", function=self._interner.intern, sql=TAG_SET_ID_SQL
+        )
+
+    def name(self) -> str:
+        return "db_client_v4"
+
+    def _get_correct_schema_path(self) -> Path:
+        return self.schema_basedir / "v4/migrations"
+
+    def _get_table(self) -> Table:
+        return BATCH_JOBS_LOGS
+
+    def queries(self) -> List[Query]:
+        return QUERIES
+
+    def _event_fields(self) -> Dict[str, EventField]:
+        return self._fields
+
+    def _intern_row(self, row: Row) -> Row:
+        """A v1 row with its tags replaced by their tag set id"""
+        tag_set = self._interner.intern(row[TAGS_INDEX])
+        return (*row[:TAGS_INDEX], tag_set, *row[TAGS_INDEX + 1 :])
+
+    def _event_to_row(self, event: Event) -> Row:
+        return self._intern_row(v1.event_to_row(event))
+
+    def generate_rows(self, start: int, count: int) -> Iterator[Row]:
+        rows = super().generate_rows(start, count)
+        if self.load_options.source == EventSource.FACTORY:
+            return rows  # already through `_event_to_row`
+        return (self._intern_row(row) for row in rows)
+
+    def prepare_synthesis(self, start: int, count: int) -> SynthesisChunk:
+        chunk = super().prepare_synthesis(start, count)
+        return SynthesisChunk(INTERN_SYNTHESIZED.format(insert=chunk.sql), chunk.params)
+
+    def _write_tag_sets(self, conn: connection) -> Dict[int, str]:
+        cursor = conn.cursor()
+        written = self._interner.write_pending(cursor)
+        cursor.close()
+        return written
+
+    def send_chunk(
+        self, payload: Any, conn: Optional[connection] = None, commit: bool = True
+    ):
+        if conn is None:
+            with self.pool.connection() as conn:
+                self.send_chunk(payload, conn, commit)
+            return
+        written = self._write_tag_sets(conn)
+        super().send_chunk(payload, conn, commit)
+        if commit:
+            # otherwise they may still be rolled back, they stay queued until then,
+            # `prepare_send` writes them once ahead of uncommitted chunks
+            self._interner.mark_written(written)
+
+    def prepare_send(self, payloads: List[Any]) -> List[Any]:
+        # written and committed once, uncommitted chunks would each write them again
+        with self.pool.connection() as conn:
+            written = self._write_tag_sets(conn)
+            conn.commit()
+        self._interner.mark_written(written)
+        return super().prepare_send(payloads)
+
+    def insert_rows(self, rows: Iterable[Row]):
+        rows = list(rows)
+        with self.pool.connection() as conn:
+            written = self._write_tag_sets(conn)
+            conn.commit()
+        self._interner.mark_written(written)
+        super().insert_rows(rows)
+
+    def insert_event(self, event: Event):
+        self.insert_rows([self._event_to_row(event)])
+
+    def _cached_tag_sets(self, cache: DatasetCache) -> Dict[int, str]:
+        """
+        Tag sets of the cached dataset. Cached chunks are COPY streams read back as
+        is, so the tag sets interned while filling the cache are kept next to it.
+        """
+        path = cache.directory / f"{cache.key}.tag_sets.json"
+        try:
+            saved = {int(k): text for k, text in json.loads(path.read_text()).items()}
+        except FileNotFoundError:
+            saved = {}
+        tag_sets = {**saved, **self._interner.texts}
+        if len(tag_sets) != len(saved):
+            partial = path.with_suffix(".partial")
+            partial.write_text(json.dumps(tag_sets))
+            partial.replace(path)
+        return tag_sets
+
+    def load(self, number_of_records: int, start: int = 0) -> LoadReport:
+        cache = self._get_dataset_cache()
+        if cache is not None:
+            cache.ensure(
+                start + number_of_records,
+                self.generate_rows,
+                self.load_options.chunk_size,
+            )
+            # written with the first chunk, rows of the cache past this tier included
+            self._interner.add(self._cached_tag_sets(cache))
+        return super().load(number_of_records, start)
+
+    def setup(self):
+        self._interner.reset()
+        super().setup()
+
+    def restore_template(self, number_of_records: Optional[int] = None) -> bool:
+        self._interner.reset()
+        return super().restore_template(number_of_records)
+
+    def analyze(self):
+        super().analyze()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("ANALYZE tag_sets")
+            conn.commit()
+            cursor.close()
+
+    def vacuum(self):
+        super().vacuum()
+        with self.pool.connection() as conn:
+            conn.autocommit = True
+            cursor = conn.cursor()
+            cursor.execute("VACUUM (ANALYZE) tag_sets")
+            cursor.close()
@@ -0,0 +1,277 @@
+# The v1 dashboard queries with tags interned in tag_sets: events are grouped and joined
+# on their integer tag_set_id, tags documents are only read from the few tag_sets rows
+# displayed or filtered on. Results match v1 over the same events.
+
+COST_ATTRIBUTION_QUERY = """
+
+WITH job_metrics AS (
+  SELECT
+    run_id,
+    pipeline_name,
+    tag_set_id,
+    event_timestamp as ts,
+    ec2_cost_per_hour as cost_per_hour,
+    cpu_usage,
+    mem_used,
+    COALESCE(processed_dataset, 0) AS processed_dataset
+  FROM batch_jobs_logs b
+  WHERE pipeline_name IS NOT NULL and pipeline_name != ''
+),
+
+last_run_start AS (
+  SELECT DISTINCT ON (pipeline_name, tag_set_id)
+    pipeline_name,
+    tag_set_id,
+    run_id,
+    MIN(ts) AS last_run_start_date
+  FROM job_metrics
+  GROUP BY pipeline_name, tag_set_id, run_id
+  ORDER BY pipeline_name, tag_set_id, MAX(ts) DESC
+),
+
+pipeline_summary AS (
+  SELECT
+    pipeline_name,
+    tag_set_id,
+    COUNT(*) AS run_count,
+    MAX(end_time) AS last_activity_timestamp,
+    AVG(run_duration_hours * cost_per_hour) AS avg_cost_per_run,
+    AVG(run_duration_hours * 60) AS avg_run_time_minutes,
+    AVG(cpu_usage) FILTER (WHERE cpu_usage IS NOT NULL) AS avg_cpu_usage,
+    AVG(mem_used) FILTER (WHERE mem_used IS NOT NULL) / 1073741824 AS avg_ram_used_gb
+  FROM (
+    SELECT
+      pipeline_name,
+      tag_set_id,
+      run_id,
+      (EXTRACT(EPOCH FROM (MAX(ts) - MIN(ts))) / 3600) AS run_duration_hours,
+      MAX(cost_per_hour) AS cost_per_hour,
+      MAX(ts) AS end_time,
+      MAX(cpu_usage) AS cpu_usage,
+      MAX(mem_used) AS mem_used
+    FROM job_metrics
+    GROUP BY pipeline_name, tag_set_id, run_id
+  ) job_aggregations
+  GROUP BY pipeline_name, tag_set_id
+),
+
+tag_aggregation AS (
+  SELECT
+    ts.tag_set_id,
+    STRING_AGG(jt.value, ', ') AS tags_str
+  FROM tag_sets ts
+  CROSS JOIN LATERAL jsonb_each_text(ts.tags) AS jt(key, value)
+  WHERE ts.tag_set_id IN (SELECT tag_set_id FROM pipeline_summary)
+    AND jsonb_typeof(ts.tags) = 'object'
+  GROUP BY ts.tag_set_id
+)
+
+SELECT
+  COALESCE(NULLIF(pipeline_summary.pipeline_name, ''), 'pipeline_name_not_available') AS "Pipeline Name",
+  CASE
+    WHEN pipeline_summary.last_activity_timestamp < NOW() - INTERVAL '20 seconds' THEN 'Completed'
+    ELSE 'Running'
+  END AS "Status",
+  CASE
+    WHEN pipeline_summary.pipeline_name ILIKE '%atac%' THEN 'ATAC-seq'
+    WHEN pipeline_summary.pipeline_name ILIKE '%chip%' THEN 'ChIP-seq'
+    ELSE 'RNA-seq'
+  END AS "Analysis type",
+  COALESCE(tag_aggregation.tags_str, '') AS "Tags",
+  pipeline_summary.run_count AS "Number of Runs",
+  last_run_start.last_run_start_date AS "Last Run Date",
+  pipeline_summary.avg_run_time_minutes AS "AVG Runtime (Minutes)",
+  pipeline_summary.avg_ram_used_gb AS "Avg Max RAM",
+  pipeline_summary.avg_cpu_usage AS "Avg Max CPU %",
+  pipeline_summary.avg_cost_per_run AS "AVG Costs"
+FROM pipeline_summary
+LEFT JOIN tag_aggregation
+  ON pipeline_summary.tag_set_id = tag_aggregation.tag_set_id
+LEFT JOIN last_run_start
+  ON pipeline_summary.pipeline_name = last_run_start.pipeline_name
+  AND pipeline_summary.tag_set_id = last_run_start.tag_set_id
+ORDER BY pipeline_summary.last_activity_timestamp DESC, pipeline_summary.run_count;
+"""
+
+# status pipeline runs this month, the ILIKE runs once per tag set instead of per run
+STATUS_PIPELINE_RUNS_THIS_MONTH_QUERY = """
+WITH run_pool AS (
+  SELECT DISTINCT run_id
+  FROM batch_jobs_logs
+  WHERE event_timestamp >= DATE_TRUNC('month', CURRENT_DATE)
+    AND event_timestamp < DATE_TRUNC('month', CURRENT_DATE + INTERVAL '1 month')
+),
+
+failed_tag_sets AS (
+  SELECT tag_set_id
+  FROM tag_sets
+  WHERE tags::text ILIKE '%failed%'
+),
+
+job_metrics AS (
+  SELECT
+    b.run_id,
+    b.tag_set_id,
+    MAX(b.event_timestamp) AS ts
+  FROM batch_jobs_logs b
+  JOIN run_pool r ON b.run_id = r.run_id
+  GROUP BY b.run_id, b.tag_set_id
+),
+
+job_states AS (
+  SELECT
+    run_id,
+    CASE
+      WHEN tag_set_id IN (SELECT tag_set_id FROM failed_tag_sets) THEN 'Failed'
+      WHEN ts < NOW() - INTERVAL '30 seconds' THEN 'Completed'
+      ELSE 'Running'
+    END AS status
+  FROM job_metrics
+)
+
+SELECT
+  COUNT(*) FILTER (WHERE status = 'Completed') AS "Completed",
+  COUNT(*) FILTER (WHERE status = 'Failed') AS "Failed",
+  COUNT(*) FILTER (WHERE status = 'Running') AS "Running"
+FROM job_states;
+"""
+
+
+# Parameterized forms, the tag filter selects the matching tag sets once and events by
+# their tag_set_id
+COST_ATTRIBUTION_PARAMETERIZED = """
+
+WITH job_metrics AS (
+  SELECT
+    run_id,
+    pipeline_name,
+    tag_set_id,
+    event_timestamp as ts,
+    ec2_cost_per_hour as cost_per_hour,
+    cpu_usage,
+    mem_used,
+    COALESCE(processed_dataset, 0) AS processed_dataset
+  FROM batch_jobs_logs b
+  WHERE pipeline_name IS NOT NULL and pipeline_name != ''
+    AND event_timestamp >= %(month)s::timestamp
+    AND event_timestamp < %(month)s::timestamp + INTERVAL '1 month'
+    AND tag_set_id IN (SELECT tag_set_id FROM tag_sets WHERE tags @> %(tags)s::jsonb)
+),
+
+last_run_start AS (
+  SELECT DISTINCT ON (pipeline_name, tag_set_id)
+    pipeline_name,
+    tag_set_id,
+    run_id,
+    MIN(ts) AS last_run_start_date
+  FROM job_metrics
+  GROUP BY pipeline_name, tag_set_id, run_id
+  ORDER BY pipeline_name, tag_set_id, MAX(ts) DESC
+),
+
+pipeline_summary AS (
+  SELECT
+    pipeline_name,
+    tag_set_id,
+    COUNT(*) AS run_count,
+    MAX(end_time) AS last_activity_timestamp,
+    AVG(run_duration_hours * cost_per_hour) AS avg_cost_per_run,
+    AVG(run_duration_hours * 60) AS avg_run_time_minutes,
+    AVG(cpu_usage) FILTER (WHERE cpu_usage IS NOT NULL) AS avg_cpu_usage,
+    AVG(mem_used) FILTER (WHERE mem_used IS NOT NULL) / 1073741824 AS avg_ram_used_gb
+  FROM (
+    SELECT
+      pipeline_name,
+      tag_set_id,
+      run_id,
+      (EXTRACT(EPOCH FROM (MAX(ts) - MIN(ts))) / 3600) AS run_duration_hours,
+      MAX(cost_per_hour) AS cost_per_hour,
+      MAX(ts) AS end_time,
+      MAX(cpu_usage) AS cpu_usage,
+      MAX(mem_used) AS mem_used
+    FROM job_metrics
+    GROUP BY pipeline_name, tag_set_id, run_id
+  ) job_aggregations
+  GROUP BY pipeline_name, tag_set_id
+),
+
+tag_aggregation AS (
+  SELECT
+    ts.tag_set_id,
+    STRING_AGG(jt.value, ', ') AS tags_str
+  FROM tag_sets ts
+  CROSS JOIN LATERAL jsonb_each_text(ts.tags) AS jt(key, value)
+  WHERE ts.tag_set_id IN (SELECT tag_set_id FROM pipeline_summary)
+    AND jsonb_typeof(ts.tags) = 'object'
+  GROUP BY ts.tag_set_id
+)
+
+SELECT
+  COALESCE(NULLIF(pipeline_summary.pipeline_name, ''), 'pipeline_name_not_available') AS "Pipeline Name",
+  CASE
+    WHEN pipeline_summary.last_activity_timestamp < %(now)s::timestamp - INTERVAL '20 seconds' THEN 'Completed'
+    ELSE 'Running'
+  END AS "Status",
+  CASE
+    WHEN pipeline_summary.pipeline_name ILIKE '%%atac%%' THEN 'ATAC-seq'
+    WHEN pipeline_summary.pipeline_name ILIKE '%%chip%%' THEN 'ChIP-seq'
+    ELSE 'RNA-seq'
+  END AS "Analysis type",
+  COALESCE(tag_aggregation.tags_str, '') AS "Tags",
+  pipeline_summary.run_count AS "Number of Runs",
+  last_run_start.last_run_start_date AS "Last Run Date",
+  pipeline_summary.avg_run_time_minutes AS "AVG Runtime (Minutes)",
+  pipeline_summary.avg_ram_used_gb AS "Avg Max RAM",
+  pipeline_summary.avg_cpu_usage AS "Avg Max CPU %%",
+  pipeline_summary.avg_cost_per_run AS "AVG Costs"
+FROM pipeline_summary
+LEFT JOIN tag_aggregation
+  ON pipeline_summary.tag_set_id = tag_aggregation.tag_set_id
+LEFT JOIN last_run_start
+  ON pipeline_summary.pipeline_name = last_run_start.pipeline_name
+  AND pipeline_summary.tag_set_id = last_run_start.tag_set_id
+ORDER BY pipeline_summary.last_activity_timestamp DESC, pipeline_summary.run_count;
+"""
+
+STATUS_PIPELINE_RUNS_THIS_MONTH_PARAMETERIZED = """
+WITH run_pool AS (
+  SELECT DISTINCT run_id
+  FROM batch_jobs_logs
+  WHERE event_timestamp >= %(month)s::timestamp
+    AND event_timestamp < %(month)s::timestamp + INTERVAL '1 month'
+    AND tag_set_id IN (SELECT tag_set_id FROM tag_sets WHERE tags @> %(tags)s::jsonb)
+),
+
+failed_tag_sets AS (
+  SELECT tag_set_id
+  FROM tag_sets
+  WHERE tags::text ILIKE '%%failed%%'
+),
+
+job_metrics AS (
+  SELECT
+    b.run_id,
+    b.tag_set_id,
+    MAX(b.event_timestamp) AS ts
+  FROM batch_jobs_logs b
+  JOIN run_pool r ON b.run_id = r.run_id
+  GROUP BY b.run_id, b.tag_set_id
+),
+
+job_states AS (
+  SELECT
+    run_id,
+    CASE
+      WHEN tag_set_id IN (SELECT tag_set_id FROM failed_tag_sets) THEN 'Failed'
+      WHEN ts < %(now)s::timestamp - INTERVAL '30 seconds' THEN 'Completed'
+      ELSE 'Running'
+    END AS status
+  FROM job_metrics
+)
+
+SELECT
+  COUNT(*) FILTER (WHERE status = 'Completed') AS "Completed",
+  COUNT(*) FILTER (WHERE status = 'Failed') AS "Failed",
+  COUNT(*) FILTER (WHERE status = 'Running') AS "Running"
+FROM job_states;
+"""
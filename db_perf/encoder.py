@@ -0,0 +1,333 @@
+"""
+Compiled event encoders. Nested models are serialized by pydantic-core straight to
+JSON instead of through `model_dump`, which is most of what the generic
+`event_to_row` path spends per row.
+"""
+
+import struct
+import time
+import types
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+)
+
+import pandas as pd
+from pydantic import BaseModel
+
+from db_perf.ingest import (
+    _BINARY_ENCODERS,
+    _COPY_TEXT_ESCAPES,
+    _TEXT_ENCODERS,
+    COPY_BINARY_HEADER,
+    COPY_BINARY_TRAILER,
+    COPY_TEXT_NULL,
+    PG_EPOCH,
+    Row,
+    _binary_text_array,
+    _json_text,
+    _text_array,
+    naive_utc,
+    prepare_rows,
+)
+from db_perf.models.events import Event
+from db_perf.models.load import IngestStrategy
+from db_perf.models.table import Table
+
+PARAMS = "params"  # tuples for executemany / execute_values
+
+
+@dataclass(frozen=True)
+class EventField:
+    """
+    Where a column takes its value from, `default` is used when `path` is None.
+    `function` maps the non-null values at `path` to the column value, `sql` is the
+    same mapping for server synthesis, of their jsonb at `{}`.
+    """
+
+    path: Optional[str] = None  # dotted attribute path from the event, "" is the event
+    default: Any = None
+    function: Optional[Callable[[Any], Any]] = None
+    sql: Optional[str] = None
+
+
+def _unwrap_optional(annotation: Any) -> Tuple[Any, bool]:
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = get_args(annotation)
+        non_null = [arg for arg in args if arg is not type(None)]
+        if len(non_null) == 1:
+            return non_null[0], len(args) > 1
+    return annotation, False
+
+
+def _is_model(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+class _Generator:
+    """Builds the source of one encoding function, attribute paths are walked once per row"""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.lines: List[str] = []
+        self.namespace: Dict[str, Any] = {}
+        # path -> (variable, annotation, nullable)
+        self.paths: Dict[str, Tuple[str, Any, bool]] = {"": ("event", model, False)}
+
+    def bind(self, prefix: str, value: Any) -> str:
+        name = f"{prefix}_{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    def path(self, path: str) -> Tuple[str, Any, bool]:
+        if path in self.paths:
+            return self.paths[path]
+        parent, _, name = path.rpartition(".")
+        variable, annotation, nullable = self.path(parent)
+        if not _is_model(annotation) or name not in annotation.model_fields:
+            owner = getattr(annotation, "__name__", annotation)
+            raise ValueError(
+                f"{self.model.__name__}.{path}: {owner} has no field {name}"
+            )
+        child, optional = _unwrap_optional(annotation.model_fields[name].annotation)
+        child_variable = "v_" + path.replace(".", "_")
+        if nullable:
+            self.lines.append(
+                f"{child_variable} = None if {variable} is None else {variable}.{name}"
+            )
+        else:
+            self.lines.append(f"{child_variable} = {variable}.{name}")
+        self.paths[path] = (child_variable, child, nullable or optional)
+        return self.paths[path]
+
+    def json_bytes(self, variable: str, annotation: Any) -> str:
+        if _is_model(annotation):
+            # pydantic-core serializes the whole model tree without building dicts
+            dump = self.bind("dump", annotation.__pydantic_serializer__.to_json)
+            return f"{dump}({variable})"
+        return f"_json_text({variable}).encode()"
+
+
+def _binary_field(gen: _Generator, pg_type: str, variable: str, annotation: Any) -> str:
+    if pg_type == "jsonb":
+        return f'(pack_i(len(b := {gen.json_bytes(variable, annotation)}) + 1) + b"\\x01" + b)'
+    if pg_type == "text":
+        text = variable if annotation is str else f"str({variable})"
+        return f"(pack_i(len(b := {text}.encode())) + b)"
+    if pg_type == "text[]":
+        return f"(pack_i(len(b := _binary_text_array({variable}))) + b)"
+    if pg_type == "timestamp":
+        return f"pack_iq(8, (naive_utc({variable}) - PG_EPOCH) // MICROSECOND)"
+    if pg_type == "float8":
+        return f"pack_id(8, {variable})"
+    if pg_type == "int4":
+        return f"pack_ii(4, {variable})"
+    if pg_type == "int8":
+        return f"pack_iq(8, {variable})"
+    raise ValueError(f"Unsupported column type: {pg_type}")
+
+
+def _text_field(gen: _Generator, pg_type: str, variable: str, annotation: Any) -> str:
+    if pg_type == "jsonb":
+        return f"{gen.json_bytes(variable, annotation)}.decode().translate(ESCAPES)"
+    if pg_type == "text":
+        text = variable if annotation is str else f"str({variable})"
+        return f"{text}.translate(ESCAPES)"
+    if pg_type == "text[]":
+        return f"_text_array({variable}).translate(ESCAPES)"
+    if pg_type == "timestamp":
+        return f'naive_utc({variable}).isoformat(sep=" ")'
+    if pg_type == "float8":
+        return f"repr(float({variable}))"
+    if pg_type in ("int4", "int8"):
+        return f"str(int({variable}))"
+    raise ValueError(f"Unsupported column type: {pg_type}")
+
+
+def _param_field(gen: _Generator, pg_type: str, variable: str, annotation: Any) -> str:
+    if pg_type == "jsonb":
+        # pre-serialized documents are sent as text literals, as the columnar rows are
+        return f"{gen.json_bytes(variable, annotation)}.decode()"
+    return variable
+
+
+def _constant(fmt: str, pg_type: str, value: Any) -> Any:
+    if fmt == PARAMS:
+        return _json_text(value) if pg_type == "jsonb" and value is not None else value
+    if fmt == IngestStrategy.COPY_TEXT.value:
+        if value is None:
+            return COPY_TEXT_NULL
+        return _TEXT_ENCODERS[pg_type](value).translate(_COPY_TEXT_ESCAPES)
+    if value is None:
+        return b"\xff\xff\xff\xff"
+    encoded = _BINARY_ENCODERS[pg_type](value)
+    return struct.pack("!i", len(encoded)) + encoded
+
+
+_FIELD_BUILDERS = {
+    PARAMS: (_param_field, "None"),
+    IngestStrategy.COPY_TEXT.value: (_text_field, "NULL_TEXT"),
+    IngestStrategy.COPY_BINARY.value: (_binary_field, "NULL"),
+}
+
+_ROW_STATEMENTS = {
+    PARAMS: "append((\n            {fields},\n        ))",
+    IngestStrategy.COPY_TEXT.value: 'append("\\t".join((\n            {fields},\n        )))',
+    IngestStrategy.COPY_BINARY.value: "extend((\n            FIELD_COUNT,\n            {fields},\n        ))",
+}
+
+
+def _generate(
+    table: Table, columns: Dict[str, EventField], model: Type[BaseModel], fmt: str
+) -> Tuple[str, Dict[str, Any]]:
+    gen = _Generator(model)
+    build, null = _FIELD_BUILDERS[fmt]
+    fields = []
+    for column in table.columns:
+        source = columns[column.name]
+        if source.path is None:
+            fields.append(
+                gen.bind("const", _constant(fmt, column.pg_type, source.default))
+            )
+            continue
+        variable, annotation, nullable = gen.path(source.path)
+        value = variable
+        if source.function is not None:
+            value = f"{gen.bind('function', source.function)}({variable})"
+            annotation = Any
+        if _is_model(annotation) and column.pg_type != "jsonb":
+            raise ValueError(
+                f"{column.name}: {annotation.__name__} can only be stored as jsonb"
+            )
+        field = build(gen, column.pg_type, value, annotation)
+        if nullable and field != variable:
+            field = f"({null} if {variable} is None else {field})"
+        fields.append(field)
+
+    body = "\n".join(f"        {line}" for line in gen.lines)
+    row = _ROW_STATEMENTS[fmt].format(fields=",\n            ".join(fields))
+    append = "extend" if fmt == IngestStrategy.COPY_BINARY.value else "append"
+    source = (
+        "def encode(events):\n"
+        "    out = []\n"
+        f"    {append} = out.{append}\n"
+        "    for event in events:\n"
+        f"{body}\n"
+        f"        {row}\n"
+        "    return out\n"
+    )
+    return source, gen.namespace
+
+
+def _compile(table: Table, fmt: str, source: str, bound: Dict[str, Any]) -> Callable:
+    namespace = {
+        "pack_i": struct.Struct("!i").pack,
+        "pack_ii": struct.Struct("!ii").pack,
+        "pack_iq": struct.Struct("!iq").pack,
+        "pack_id": struct.Struct("!id").pack,
+        "naive_utc": naive_utc,
+        "PG_EPOCH": PG_EPOCH,
+        "MICROSECOND": timedelta(microseconds=1),
+        "ESCAPES": _COPY_TEXT_ESCAPES,
+        "NULL": b"\xff\xff\xff\xff",
+        "NULL_TEXT": COPY_TEXT_NULL,
+        "FIELD_COUNT": struct.pack("!h", len(table.columns)),
+        "_json_text": _json_text,
+        "_text_array": _text_array,
+        "_binary_text_array": _binary_text_array,
+        **bound,
+    }
+    exec(compile(source, f"<{table.name} {fmt} encoder>", "exec"), namespace)
+    return namespace["encode"]
+
+
+class EventEncoder:
+    """
+    Encodes events straight into the payload `send_rows` expects. The extraction of
+    every column is generated and compiled once per table and format, so encoding a
+    row is one pass of attribute reads and packing, with no dumps to dicts, no
+    `Json` adapters and no per value dispatch on the column type.
+    """
+
+    def __init__(
+        self,
+        table: Table,
+        columns: Dict[str, EventField],
+        model: Type[BaseModel] = Event,
+    ):
+        missing = [name for name in table.column_names if name not in columns]
+        if missing:
+            raise ValueError(f"No event field for columns: {', '.join(missing)}")
+        self.table = table
+        self.columns = columns
+        self.model = model
+        self.sources: Dict[str, str] = {}  # generated code per format, for inspection
+        self._encoders: Dict[str, Callable] = {}
+        for fmt in _FIELD_BUILDERS:
+            source, bound = _generate(table, columns, model, fmt)
+            self.sources[fmt] = source
+            self._encoders[fmt] = _compile(table, fmt, source, bound)
+
+    def __getstate__(self):
+        # compiled functions do not pickle, load workers compile their own
+        return {"table": self.table, "columns": self.columns, "model": self.model}
+
+    def __setstate__(self, state):
+        self.__init__(state["table"], state["columns"], state["model"])
+
+    def rows(self, events: Sequence[Event]) -> List[tuple]:
+        return self._encoders[PARAMS](events)
+
+    def encode(self, events: Sequence[Event], strategy: IngestStrategy) -> Any:
+        """Same payload as `prepare_rows` for the events' rows, jsonb text is compact"""
+        if strategy in (IngestStrategy.EXECUTEMANY, IngestStrategy.EXECUTE_VALUES):
+            return self.rows(events)
+        if strategy == IngestStrategy.COPY_TEXT:
+            lines = self._encoders[strategy.value](events)
+            return ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
+        if strategy == IngestStrategy.COPY_BINARY:
+            parts = self._encoders[strategy.value](events)
+            return b"".join([COPY_BINARY_HEADER, *parts, COPY_BINARY_TRAILER])
+        raise ValueError(f"Unknown ingest strategy: {strategy}")
+
+
+def benchmark_encoding(
+    encoder: EventEncoder,
+    event_to_row: Callable[[Event], Row],
+    events: Sequence[Event],
+    strategies: Optional[Sequence[IngestStrategy]] = None,
+) -> pd.DataFrame:
+    """
+    Compares rows/s of turning events into a payload per strategy, through
+    `event_to_row` and `prepare_rows` against the compiled encoder
+    """
+    results = []
+    for strategy in strategies or list(IngestStrategy):
+        started = time.perf_counter()
+        prepare_rows(encoder.table, (event_to_row(e) for e in events), strategy)
+        generic_rate = len(events) / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        encoder.encode(events, strategy)
+        compiled_rate = len(events) / (time.perf_counter() - started)
+
+        results.append(
+            {
+                "strategy": strategy.value,
+                "generic_rows_per_s": generic_rate,
+                "compiled_rows_per_s": compiled_rate,
+                "speedup": compiled_rate / generic_rate,
+            }
+        )
+    return pd.DataFrame(results)
@@ -0,0 +1,408 @@
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from faker import Faker
+
+from db_perf.factories.shape import WorkloadShaper
+
+# rows drawn from one rng stream, fixes the data regardless of chunking
+BLOCK_SIZE = 4096
+EVENT_INTERVAL_US = 1_000  # spacing between consecutive event timestamps
+POOL_STREAM, BLOCK_STREAM = 0, 1
+# upper bound of faker dates so pools are reproducible
+POOL_EPOCH = datetime(2025, 1, 1)
+
+EVENT_TYPES = ["process", "system", "log"]
+PROCESS_TYPES = ["ingest", "transform", "export"]
+PROCESS_STATUSES = ["running", "failed", "completed"]
+TAG_ENVS = ["dev", "staging", "prod"]
+EC2_COSTS = [0.24, 1.13]
+INSTANCE_TYPES = ["t2.micro", "m5.large", "c5.2xlarge"]
+AVAILABILITY_ZONES = ["us-east-1a", "us-west-2b"]
+REGIONS = ["us-east-1", "us-west-2"]
+ARCHS = ["x86_64", "arm64"]
+
+DATA_TEMPLATE = (
+    '{"timestamp": "%s", "message": %s, "event_type": "%s", "process_type": "%s", '
+    '"process_status": "%s", "pipeline_name": %s, "run_name": %s, "run_id": "%s", '
+    '"attributes": {"process": %s, "system_metric": %s, "syslog": %s, '
+    '"system_properties": %s, "nextflow_log": %s}, "tags": %s}'
+)
+
+SYSTEM_METRIC_TEMPLATE = (
+    '{"events_name": %s, "system_memory_total": %d, "system_memory_used": %d, '
+    '"system_memory_available": %d, "system_memory_utilization": %.2f, '
+    '"system_memory_swap_total": %d, "system_memory_swap_used": %d, '
+    '"system_cpu_utilization": %.2f, "system_disk_io": %s}'
+)
+
+
+def _uuid4_strings(rng: np.random.Generator, count: int) -> List[str]:
+    raw = rng.integers(0, 256, size=(count, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hexed = raw.tobytes().hex()
+    uuids = []
+    for i in range(0, count * 32, 32):
+        h = hexed[i : i + 32]
+        uuids.append(f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}")
+    return uuids
+
+
+def _disk_io(rng: np.random.Generator, devices: int) -> Dict[str, Dict[str, int]]:
+    return {
+        f"/dev/sd{chr(97 + i)}": {
+            "read_bytes": int(rng.integers(0, 1_000_001)),
+            "write_bytes": int(rng.integers(0, 1_000_001)),
+        }
+        for i in range(devices)
+    }
+
+
+@dataclass
+class EventBatch:
+    """A block of synthetic events in columnar form, rows are in `batch_jobs_logs` column order"""
+
+    start: int
+    data: List[str]  # the full event document, already serialized
+    run_name: List[str]
+    run_id: List[str]
+    pipeline_name: List[str]
+    tags: List[str]
+    event_timestamp: np.ndarray  # datetime64[us]
+    ec2_cost_per_hour: np.ndarray
+    cpu_usage: np.ndarray
+    mem_used: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def rows(self) -> Iterator[tuple]:
+        # session uuid, job ids and processed dataset mirror what the factory path extracts
+        for data, run_name, run_id, pipeline_name, tags, ts, cost, cpu, mem in zip(
+            self.data,
+            self.run_name,
+            self.run_id,
+            self.pipeline_name,
+            self.tags,
+            self.event_timestamp.tolist(),
+            self.ec2_cost_per_hour.tolist(),
+            self.cpu_usage.tolist(),
+            self.mem_used.tolist(),
+        ):
+            yield (
+                data,
+                "default",
+                run_name,
+                run_id,
+                pipeline_name,
+                None,
+                [],
+                tags,
+                ts,
+                cost,
+                cpu,
+                mem,
+                None,
+            )
+
+
+class ColumnarEventFactory:
+    """
+    Vectorized counterpart of `EventFactory`.
+
+    Values are drawn with NumPy per block of `BLOCK_SIZE` rows from a stream seeded by
+    (seed, block), so row `i` is identical no matter how the dataset is chunked.
+    Nested attribute documents are rendered once into string pools and picked per row.
+    With a `shaper`, runs, pipelines, tags, instance costs and timestamps follow its
+    workload shape instead of being drawn independently per row.
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        anchor: Optional[datetime] = None,
+        pool_size: int = 1024,
+        shaper: Optional[WorkloadShaper] = None,
+    ):
+        self.seed = seed
+        self.anchor = np.datetime64(anchor or datetime.now(), "us")
+        self.pool_size = pool_size
+        self.shaper = shaper
+        self._build_pools()
+
+    def _build_pools(self):
+        fake = Faker()
+        fake.seed_instance(self.seed)
+        rng = np.random.default_rng([self.seed, POOL_STREAM])
+        size = self.pool_size
+
+        self.raw_words = [fake.word() for _ in range(size)]
+        self.words = [json.dumps(word) for word in self.raw_words]
+        self.sentences = [json.dumps(fake.sentence()) for _ in range(size)]
+        self.first_names = [json.dumps(fake.first_name()) for _ in range(size)]
+        self.disk_io_3 = [json.dumps(_disk_io(rng, 3)) for _ in range(size)]
+
+        self.processes = [self._process(fake, rng) for _ in range(size)]
+        self.syslogs = [self._syslog(fake, rng) for _ in range(size)]
+        self.system_properties = []
+        self.system_properties_cost = np.empty(size, dtype=np.float64)
+        for i in range(size):
+            cost = EC2_COSTS[int(rng.integers(0, len(EC2_COSTS)))]
+            self.system_properties.append(self._system_properties(fake, rng, cost))
+            self.system_properties_cost[i] = cost
+        self.nextflow_logs = [
+            json.dumps(
+                {
+                    "session_uuid": fake.uuid4(),
+                    "jobs_ids": [fake.uuid4() for _ in range(3)],
+                }
+            )
+            for _ in range(size)
+        ]
+
+    def _process(self, fake: Faker, rng: np.random.Generator) -> str:
+        return json.dumps(
+            {
+                "tool_name": fake.word(),
+                "tool_pid": str(fake.random_number(digits=5)).zfill(5),
+                "tool_parent_pid": str(fake.random_number(digits=5)).zfill(5),
+                "tool_binary_path": fake.file_path(),
+                "tool_cmd": fake.sentence(),
+                "start_timestamp": fake.iso8601(end_datetime=POOL_EPOCH),
+                "process_cpu_utilization": round(float(rng.uniform(0, 100)), 2),
+                "process_memory_usage": int(rng.integers(1024, 1_048_577)),
+                "process_memory_virtual": int(rng.integers(2048, 2_097_153)),
+                "process_run_time": int(rng.integers(1, 10_001)),
+                "process_disk_usage_read_last_interval": int(rng.integers(0, 10_001)),
+                "process_disk_usage_write_last_interval": int(rng.integers(0, 10_001)),
+                "process_disk_usage_read_total": int(rng.integers(0, 100_001)),
+                "process_disk_usage_write_total": int(rng.integers(0, 100_001)),
+                "process_status": PROCESS_STATUSES[int(rng.integers(0, 3))],
+                "input_files": [
+                    {
+                        "file_name": fake.file_name(),
+                        "file_size": int(rng.integers(1024, 10_000_001)),
+                        "file_path": fake.file_path(),
+                        "file_directory": fake.file_path(),
+                        "file_updated_at_timestamp": fake.iso8601(
+                            end_datetime=POOL_EPOCH
+                        ),
+                    }
+                    for _ in range(2)
+                ],
+                "container_id": fake.uuid4(),
+                "job_id": fake.uuid4(),
+                "working_directory": fake.file_path(),
+            }
+        )
+
+    def _system_metric(self, fake: Faker, rng: np.random.Generator) -> dict:
+        return {
+            "events_name": fake.word(),
+            "system_memory_total": int(rng.integers(4096, 65_537)),
+            "system_memory_used": int(rng.integers(1024, 65_537)),
+            "system_memory_available": int(rng.integers(1024, 65_537)),
+            "system_memory_utilization": round(float(rng.uniform(0, 100)), 2),
+            "system_memory_swap_total": int(rng.integers(1024, 8193)),
+            "system_memory_swap_used": int(rng.integers(0, 8193)),
+            "system_cpu_utilization": round(float(rng.uniform(0, 100)), 2),
+            "system_disk_io": _disk_io(rng, 3),
+        }
+
+    def _syslog(self, fake: Faker, rng: np.random.Generator) -> str:
+        return json.dumps(
+            {
+                "system_metrics": self._system_metric(fake, rng),
+                "error_display_name": fake.word(),
+                "error_id": fake.uuid4(),
+                "error_line": fake.sentence(),
+                "file_line_number": int(rng.integers(1, 1001)),
+                "file_previous_logs": [fake.sentence() for _ in range(3)],
+            }
+        )
+
+    def _system_properties(
+        self, fake: Faker, rng: np.random.Generator, cost: float
+    ) -> str:
+        return json.dumps(
+            {
+                "os": fake.linux_platform_token(),
+                "os_version": fake.numerify(text="##.##.##"),
+                "kernel_version": fake.linux_platform_token(),
+                "arch": ARCHS[int(rng.integers(0, len(ARCHS)))],
+                "num_cpus": int(rng.integers(1, 65)),
+                "hostname": fake.hostname(),
+                "total_memory": int(rng.integers(4096, 131_073)),
+                "total_swap": int(rng.integers(0, 32_769)),
+                "uptime": int(rng.integers(100, 1_000_001)),
+                "aws_metadata": {
+                    "instance_id": fake.uuid4(),
+                    "instance_type": INSTANCE_TYPES[int(rng.integers(0, 3))],
+                    "availability_zone": AVAILABILITY_ZONES[int(rng.integers(0, 2))],
+                    "region": REGIONS[int(rng.integers(0, 2))],
+                },
+                "is_aws_instance": bool(rng.integers(0, 2)),
+                "system_disk_io": _disk_io(rng, 2),
+                "ec2_cost_per_hour": cost,
+            }
+        )
+
+    def _block(self, block: int) -> Dict[str, np.ndarray]:
+        rng = np.random.default_rng([self.seed, BLOCK_STREAM, block])
+        n = BLOCK_SIZE
+        pool = self.pool_size
+        run_ids = np.array(_uuid4_strings(rng, n), dtype=object)
+
+        return {
+            "message": rng.integers(0, pool, n),
+            "event_type": rng.integers(0, len(EVENT_TYPES), n),
+            "process_type": rng.integers(0, len(PROCESS_TYPES), n),
+            "process_status": rng.integers(0, len(PROCESS_STATUSES), n),
+            "pipeline_name": rng.integers(0, pool, n),
+            "run_name": rng.integers(0, pool, n),
+            "run_id": run_ids,
+            "process": rng.integers(0, pool, n),
+            "syslog": rng.integers(0, pool, n),
+            "system_properties": rng.integers(0, pool, n),
+            "nextflow_log": rng.integers(0, pool, n),
+            "events_name": rng.integers(0, pool, n),
+            "disk_io": rng.integers(0, pool, n),
+            "tag_env": rng.integers(0, len(TAG_ENVS), n),
+            "tag_owner": rng.integers(0, pool, n),
+            "memory_total": rng.integers(4096, 65_537, n),
+            "memory_used": rng.integers(1024, 65_537, n),
+            "memory_available": rng.integers(1024, 65_537, n),
+            "memory_utilization": np.round(rng.uniform(0, 100, n), 2),
+            "swap_total": rng.integers(1024, 8193, n),
+            "swap_used": rng.integers(0, 8193, n),
+            "cpu_utilization": np.round(rng.uniform(0, 100, n), 2),
+        }
+
+    def _columns(self, start: int, count: int) -> Dict[str, np.ndarray]:
+        first, last = start // BLOCK_SIZE, (start + count - 1) // BLOCK_SIZE
+        blocks = [self._block(block) for block in range(first, last + 1)]
+        offset = start - first * BLOCK_SIZE
+        return {
+            key: np.concatenate([b[key] for b in blocks])[offset : offset + count]
+            for key in blocks[0]
+        }
+
+    def generate(self, start: int, count: int) -> EventBatch:
+        """Generates rows [start, start + count) of the dataset"""
+        return self._render(start, self._columns(start, max(count, 1)), count)
+
+    def _render(self, start: int, c: Dict[str, np.ndarray], count: int) -> EventBatch:
+        words, sentences = self.words, self.sentences
+        system_properties = c["system_properties"][:count]
+
+        if self.shaper is None:
+            offsets = (
+                np.arange(start, start + count, dtype=np.int64) * EVENT_INTERVAL_US
+            )
+            timestamps = self.anchor + offsets.astype("timedelta64[us]")
+            pipeline_indices = c["pipeline_name"][:count].tolist()
+            run_name_indices = c["run_name"][:count].tolist()
+            pipeline_names = [self.raw_words[i] for i in pipeline_indices]
+            run_names = [self.raw_words[i] for i in run_name_indices]
+            pipeline_json = [words[i] for i in pipeline_indices]
+            run_name_json = [words[i] for i in run_name_indices]
+            run_ids = c["run_id"][:count].tolist()
+            tags = [
+                '{"env": "%s", "owner": %s}' % (TAG_ENVS[env], self.first_names[owner])
+                for env, owner in zip(
+                    c["tag_env"][:count].tolist(), c["tag_owner"][:count].tolist()
+                )
+            ]
+        else:
+            shaped = self.shaper.columns(start, count)
+            timestamps = shaped.event_timestamp
+            pipeline_names = shaped.pipeline_name
+            run_names = shaped.run_name
+            run_ids = shaped.run_id
+            pipeline_json = [json.dumps(name) for name in pipeline_names]
+            run_name_json = [json.dumps(name) for name in run_names]
+            tags = [
+                '{"env": "%s", "owner": %s}' % (env, json.dumps(owner))
+                for env, owner in zip(shaped.env, shaped.owner)
+            ]
+            # one instance, hence one hourly cost, per run
+            system_properties = (shaped.cost_draw * self.pool_size).astype(np.int64)
+
+        timestamp_strings = np.datetime_as_string(timestamps, unit="us").tolist()
+
+        system_metrics = [
+            SYSTEM_METRIC_TEMPLATE % values
+            for values in zip(
+                [words[i] for i in c["events_name"][:count].tolist()],
+                c["memory_total"][:count].tolist(),
+                c["memory_used"][:count].tolist(),
+                c["memory_available"][:count].tolist(),
+                c["memory_utilization"][:count].tolist(),
+                c["swap_total"][:count].tolist(),
+                c["swap_used"][:count].tolist(),
+                c["cpu_utilization"][:count].tolist(),
+                [self.disk_io_3[i] for i in c["disk_io"][:count].tolist()],
+            )
+        ]
+
+        data = [
+            DATA_TEMPLATE % values
+            for values in zip(
+                timestamp_strings,
+                [sentences[i] for i in c["message"][:count].tolist()],
+                [EVENT_TYPES[i] for i in c["event_type"][:count].tolist()],
+                [PROCESS_TYPES[i] for i in c["process_type"][:count].tolist()],
+                [PROCESS_STATUSES[i] for i in c["process_status"][:count].tolist()],
+                pipeline_json,
+                run_name_json,
+                run_ids,
+                [self.processes[i] for i in c["process"][:count].tolist()],
+                system_metrics,
+                [self.syslogs[i] for i in c["syslog"][:count].tolist()],
+                [self.system_properties[i] for i in system_properties.tolist()],
+                [self.nextflow_logs[i] for i in c["nextflow_log"][:count].tolist()],
+                tags,
+            )
+        ]
+
+        return EventBatch(
+            start=start,
+            data=data,
+            run_name=run_names,
+            run_id=run_ids,
+            pipeline_name=pipeline_names,
+            tags=tags,
+            event_timestamp=timestamps,
+            ec2_cost_per_hour=self.system_properties_cost[system_properties],
+            cpu_usage=c["cpu_utilization"][:count].astype(np.float64),
+            mem_used=c["memory_used"][:count].astype(np.float64),
+        )
+
+
+def benchmark_generation(num_of_events: int, seed: int = 0) -> Dict[str, float]:
+    """
+    Compares rows/s of the per-row `EventFactory` path against the columnar generator.
+    Building the string pools is a one-off cost per generator and is not timed.
+    """
+    from db_perf.factories.event import EventFactory
+
+    started = time.perf_counter()
+    for _ in range(num_of_events):
+        EventFactory()
+    factory_rate = num_of_events / (time.perf_counter() - started)
+
+    columnar = ColumnarEventFactory(seed=seed)
+    started = time.perf_counter()
+    columnar.generate(0, num_of_events)
+    columnar_rate = num_of_events / (time.perf_counter() - started)
+
+    return {
+        "factory_rows_per_s": factory_rate,
+        "columnar_rows_per_s": columnar_rate,
+        "speedup": columnar_rate / factory_rate,
+    }
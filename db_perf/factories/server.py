@@ -0,0 +1,417 @@
+"""
+Server side synthesis: only the statement and the Faker pools cross the wire. Values
+follow the columnar generator's distributions without being the same rows, so server
+synthesized datasets are not cached; `db_perf.synthesis.compare_with_client` loads
+the same rows both ways and compares speed and distributions.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from faker import Faker
+
+from db_perf.encoder import EventField
+from db_perf.factories.columnar import (
+    ARCHS,
+    AVAILABILITY_ZONES,
+    EC2_COSTS,
+    EVENT_INTERVAL_US,
+    EVENT_TYPES,
+    INSTANCE_TYPES,
+    POOL_EPOCH,
+    PROCESS_STATUSES,
+    PROCESS_TYPES,
+    REGIONS,
+    TAG_ENVS,
+)
+from db_perf.factories.shape import WorkloadShaper
+from db_perf.models.table import Table
+
+# stream of the string pools, next to the columnar pool, block and shape streams
+SERVER_STREAM = 3
+MAX_BIGINT = 2**63 - 1
+SALTS_PER_SEED = 1024  # independent draws per row, mixed with the seed
+
+
+@dataclass
+class SynthesisChunk:
+    """One `INSERT ... SELECT` producing a range of rows inside the server"""
+
+    sql: str
+    params: Dict[str, Any]
+
+    def size(self) -> int:
+        """Bytes of the statement and its parameters, roughly what goes over the wire"""
+        size = len(self.sql)
+        for value in self.params.values():
+            if isinstance(value, (list, tuple)):
+                size += sum(len(str(item)) + 3 for item in value)
+            else:
+                size += len(str(value))
+        return size
+
+
+class _Draws:
+    """
+    SQL expressions of independent pseudo random draws per row. Each draw hashes the
+    row number with its own salt, so rows do not depend on chunking or plan order.
+    """
+
+    def __init__(self):
+        self.salt = 0
+
+    def bits(self) -> str:
+        self.salt += 1
+        if self.salt >= SALTS_PER_SEED:
+            raise ValueError("too many draws per row")
+        return (
+            f"(hashtextextended(k.key, {self.salt} + %(seed)s::bigint "
+            f"* {SALTS_PER_SEED}) & {MAX_BIGINT})"
+        )
+
+    def integer(self, low: int, high: int) -> str:
+        """Uniform in [low, high]"""
+        return f"({low} + mod({self.bits()}, {high - low + 1}))"
+
+    def uniform(self, low: float, high: float) -> str:
+        """Uniform in [low, high), rounded to two decimals like the factories"""
+        return (
+            f"round(({low} + {high - low} * mod({self.bits()}, 1000000000) "
+            f"/ 1000000000.0)::numeric, 2)"
+        )
+
+    def pick(self, pool: str) -> str:
+        return f"p.{pool}[1 + mod({self.bits()}, array_length(p.{pool}, 1))]"
+
+    def choice(self, values: List[Any]) -> str:
+        literals = ", ".join(
+            f"'{value}'" if isinstance(value, str) else repr(value) for value in values
+        )
+        return f"(ARRAY[{literals}])[1 + mod({self.bits()}, {len(values)})]"
+
+    def boolean(self) -> str:
+        return f"(mod({self.bits()}, 2) = 1)"
+
+    def uuid4(self) -> str:
+        self.salt += 1
+        digest = f"md5(k.key || ':{self.salt}:' || %(seed)s)"
+        return (
+            f"overlay(overlay({digest} placing '4' from 13) placing '8' from 17)"
+            "::uuid::text"
+        )
+
+    def zero_padded(self, digits: int) -> str:
+        return f"lpad({self.integer(0, 10**digits - 1)}::text, {digits}, '0')"
+
+    def disk_io(self, devices: int) -> str:
+        entries = ", ".join(
+            f"'/dev/sd{chr(97 + i)}', jsonb_build_object("
+            f"'read_bytes', {self.integer(0, 1_000_000)}, "
+            f"'write_bytes', {self.integer(0, 1_000_000)})"
+            for i in range(devices)
+        )
+        return f"jsonb_build_object({entries})"
+
+
+def _object(**fields: str) -> str:
+    return (
+        "jsonb_build_object("
+        + ", ".join(f"'{name}', {expression}" for name, expression in fields.items())
+        + ")"
+    )
+
+
+def _json_path(path: str) -> str:
+    return "'{" + path.replace(".", ",") + "}'"
+
+
+class ServerEventSynthesizer:
+    """
+    Synthesizes events inside Postgres with one `INSERT ... SELECT` over
+    `generate_series` per chunk, drawing every value the way `EventFactory` and the
+    columnar generator do. Strings are picked from Faker pools sent with each
+    statement, everything else is hashed from (seed, row) so the data is the same
+    for any chunking. With a `shaper` its per run values are computed client side,
+    one per run, and looked up by the rows of each run.
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        anchor: Optional[datetime] = None,
+        pool_size: int = 1024,
+        shaper: Optional[WorkloadShaper] = None,
+    ):
+        self.seed = seed
+        self.anchor = anchor or datetime.now()
+        self.shaper = shaper
+        self.pools = self._build_pools(pool_size)
+        self._statements: Dict[Tuple[str, Tuple], str] = {}
+
+    def _build_pools(self, size: int) -> Dict[str, List[str]]:
+        fake = Faker()
+        fake.seed_instance(self.seed + SERVER_STREAM)
+        return {
+            "words": [fake.word() for _ in range(size)],
+            "sentences": [fake.sentence() for _ in range(size)],
+            "first_names": [fake.first_name() for _ in range(size)],
+            "file_names": [fake.file_name() for _ in range(size)],
+            "file_paths": [fake.file_path() for _ in range(size)],
+            "hostnames": [fake.hostname() for _ in range(size)],
+            "platforms": [fake.linux_platform_token() for _ in range(size)],
+            "versions": [fake.numerify(text="##.##.##") for _ in range(size)],
+            "dates": [fake.iso8601(end_datetime=POOL_EPOCH) for _ in range(size)],
+        }
+
+    def _run_values(self, draws: _Draws) -> Dict[str, str]:
+        """Timestamp, run and tag expressions of a row, per run with a shaper"""
+        if self.shaper is None:
+            return {
+                "ts": f"p.anchor + g.i * interval '{EVENT_INTERVAL_US} microseconds'",
+                "run_id": draws.uuid4(),
+                "run_name": draws.pick("words"),
+                "pipeline_name": draws.pick("words"),
+                "env": draws.choice(TAG_ENVS),
+                "owner": draws.pick("first_names"),
+                "cost": draws.choice(EC2_COSTS),
+            }
+        steps = max(self.shaper.shape.events_per_run - 1, 1)
+        return {
+            # events are spaced evenly from the first to the last of the run
+            "ts": (
+                "p.window_start + (p.start_us[k.run] + p.duration_us[k.run] "
+                f"* mod(g.i, {self.shaper.shape.events_per_run}) / {steps}) "
+                "* interval '1 microsecond'"
+            ),
+            "run_id": "p.run_ids[k.run]",
+            "run_name": "p.run_names[k.run]",
+            "pipeline_name": "p.pipeline_names[k.run]",
+            "env": "p.envs[k.run]",
+            "owner": "p.owners[k.run]",
+            "cost": "p.costs[k.run]",
+        }
+
+    def _document(self, draws: _Draws) -> str:
+        """The `data` document, shaped like `Event.model_dump(mode="json")`"""
+        process = _object(
+            tool_name=draws.pick("words"),
+            tool_pid=draws.zero_padded(5),
+            tool_parent_pid=draws.zero_padded(5),
+            tool_binary_path=draws.pick("file_paths"),
+            tool_cmd=draws.pick("sentences"),
+            start_timestamp=draws.pick("dates"),
+            process_cpu_utilization=draws.uniform(0, 100),
+            process_memory_usage=draws.integer(1024, 1_048_576),
+            process_memory_virtual=draws.integer(2048, 2_097_152),
+            process_run_time=draws.integer(1, 10_000),
+            process_disk_usage_read_last_interval=draws.integer(0, 10_000),
+            process_disk_usage_write_last_interval=draws.integer(0, 10_000),
+            process_disk_usage_read_total=draws.integer(0, 100_000),
+            process_disk_usage_write_total=draws.integer(0, 100_000),
+            process_status=draws.choice(PROCESS_STATUSES),
+            input_files="jsonb_build_array("
+            + ", ".join(
+                _object(
+                    file_name=draws.pick("file_names"),
+                    file_size=draws.integer(1024, 10_000_000),
+                    file_path=draws.pick("file_paths"),
+                    file_directory=draws.pick("file_paths"),
+                    file_updated_at_timestamp=draws.pick("dates"),
+                )
+                for _ in range(2)
+            )
+            + ")",
+            container_id=draws.uuid4(),
+            job_id=draws.uuid4(),
+            working_directory=draws.pick("file_paths"),
+        )
+        syslog = _object(
+            system_metrics=self._system_metric(draws),
+            error_display_name=draws.pick("words"),
+            error_id=draws.uuid4(),
+            error_line=draws.pick("sentences"),
+            file_line_number=draws.integer(1, 1000),
+            file_previous_logs="jsonb_build_array("
+            + ", ".join(draws.pick("sentences") for _ in range(3))
+            + ")",
+        )
+        system_properties = _object(
+            os=draws.pick("platforms"),
+            os_version=draws.pick("versions"),
+            kernel_version=draws.pick("platforms"),
+            arch=draws.choice(ARCHS),
+            num_cpus=draws.integer(1, 64),
+            hostname=draws.pick("hostnames"),
+            total_memory=draws.integer(4096, 131_072),
+            total_swap=draws.integer(0, 32_768),
+            uptime=draws.integer(100, 1_000_000),
+            aws_metadata=_object(
+                instance_id=draws.uuid4(),
+                instance_type=draws.choice(INSTANCE_TYPES),
+                availability_zone=draws.choice(AVAILABILITY_ZONES),
+                region=draws.choice(REGIONS),
+            ),
+            is_aws_instance=draws.boolean(),
+            system_disk_io=draws.disk_io(2),
+            ec2_cost_per_hour="e.cost",
+        )
+        nextflow_log = _object(
+            session_uuid=draws.uuid4(),
+            jobs_ids="jsonb_build_array("
+            + ", ".join(draws.uuid4() for _ in range(3))
+            + ")",
+        )
+        return _object(
+            timestamp="""to_char(e.ts, 'YYYY-MM-DD"T"HH24:MI:SS.US')""",
+            message=draws.pick("sentences"),
+            event_type=draws.choice(EVENT_TYPES),
+            process_type=draws.choice(PROCESS_TYPES),
+            process_status=draws.choice(PROCESS_STATUSES),
+            pipeline_name="e.pipeline_name",
+            run_name="e.run_name",
+            run_id="e.run_id",
+            attributes=_object(
+                process=process,
+                system_metric=self._system_metric(draws),
+                syslog=syslog,
+                system_properties=system_properties,
+                nextflow_log=nextflow_log,
+            ),
+            tags=_object(env="e.env", owner="e.owner"),
+        )
+
+    @staticmethod
+    def _system_metric(draws: _Draws) -> str:
+        return _object(
+            events_name=draws.pick("words"),
+            system_memory_total=draws.integer(4096, 65_536),
+            system_memory_used=draws.integer(1024, 65_536),
+            system_memory_available=draws.integer(1024, 65_536),
+            system_memory_utilization=draws.uniform(0, 100),
+            system_memory_swap_total=draws.integer(1024, 8192),
+            system_memory_swap_used=draws.integer(0, 8192),
+            system_cpu_utilization=draws.uniform(0, 100),
+            system_disk_io=draws.disk_io(3),
+        )
+
+    def statement(self, table: Table, fields: Dict[str, EventField]) -> str:
+        """
+        `INSERT ... SELECT` of `table`, whose columns are read from the synthesized
+        document by the `EventField` sources of the client's compiled encoder
+        """
+        key = (table.name, tuple(sorted((name, repr(f)) for name, f in fields.items())))
+        if key in self._statements:
+            return self._statements[key]
+
+        draws = _Draws()
+        run = self._run_values(draws)
+        document = self._document(draws)
+        pools = ", ".join(f"%({name})s::text[] AS {name}" for name in self.pools)
+        if self.shaper is None:
+            pools += ", %(anchor)s::timestamp AS anchor"
+            run_key = ""
+        else:
+            pools += (
+                ", %(window_start)s::timestamp AS window_start"
+                ", %(run_ids)s::text[] AS run_ids, %(run_names)s::text[] AS run_names"
+                ", %(pipeline_names)s::text[] AS pipeline_names"
+                ", %(envs)s::text[] AS envs, %(owners)s::text[] AS owners"
+                ", %(costs)s::float8[] AS costs"
+                ", %(start_us)s::bigint[] AS start_us"
+                ", %(duration_us)s::bigint[] AS duration_us"
+            )
+            events_per_run = self.shaper.shape.events_per_run
+            run_key = f", (g.i / {events_per_run} - %(first_run)s + 1)::int AS run"
+
+        columns = []
+        for column in table.columns:
+            source = fields[column.name]
+            pg_type = column.pg_type
+            if source.path is None:
+                constant = f"%(const_{column.name})s"
+                literal = "NULL" if source.default is None else constant
+                columns.append(f"{literal}::{pg_type}")
+            elif source.path == "":
+                columns.append("d.data")
+            elif source.sql is not None:
+                value = source.sql.format(f"d.data #> {_json_path(source.path)}")
+                columns.append(f"({value})::{pg_type}")
+            elif source.function is not None:
+                raise ValueError(f"{column.name}: no SQL to synthesize it with")
+            elif pg_type == "jsonb":
+                columns.append(f"d.data #> {_json_path(source.path)}")
+            else:
+                columns.append(f"(d.data #>> {_json_path(source.path)})::{pg_type}")
+
+        # OFFSET 0 keeps each lateral from being inlined, so every value is drawn once
+        sql = f"""
+            INSERT INTO {table.name} ({", ".join(table.column_names)})
+            SELECT {", ".join(columns)}
+            FROM generate_series(%(first)s::bigint, %(last)s::bigint) AS g(i)
+            CROSS JOIN (SELECT {pools}) p
+            CROSS JOIN LATERAL (SELECT g.i::text AS key{run_key} OFFSET 0) k
+            CROSS JOIN LATERAL (
+                SELECT {", ".join(f"{value} AS {name}" for name, value in run.items())}
+                OFFSET 0
+            ) e
+            CROSS JOIN LATERAL (SELECT {document} AS data OFFSET 0) d
+        """
+        self._statements[key] = sql
+        return sql
+
+    def chunk(
+        self, table: Table, fields: Dict[str, EventField], start: int, count: int
+    ) -> SynthesisChunk:
+        """Rows [start, start + count) of the dataset"""
+        params: Dict[str, Any] = {
+            "seed": self.seed,
+            "first": start,
+            "last": start + count - 1,
+            **self.pools,
+        }
+        for name, source in fields.items():
+            if source.path is None and source.default is not None:
+                params[f"const_{name}"] = source.default
+        if self.shaper is None:
+            params["anchor"] = self.anchor
+        else:
+            events_per_run = self.shaper.shape.events_per_run
+            first_run = start // events_per_run
+            last_run = (start + max(count, 1) - 1) // events_per_run
+            runs = np.arange(first_run, last_run + 1, dtype=np.int64)
+            shaped = self.shaper.run_columns(runs)
+            pipelines = shaped.pipeline.tolist()
+            cost_index = (shaped.cost_draw * len(EC2_COSTS)).astype(np.int64)
+            params.update(
+                first_run=first_run,
+                window_start=self.shaper.window_start.item(),
+                run_ids=shaped.run_id,
+                run_names=shaped.run_name,
+                pipeline_names=[self.shaper.pipeline_names[p] for p in pipelines],
+                envs=shaped.env,
+                owners=[self.shaper.owners[p] for p in pipelines],
+                costs=[EC2_COSTS[i] for i in cost_index.tolist()],
+                start_us=shaped.start_us.tolist(),
+                duration_us=shaped.duration_us.tolist(),
+            )
+        return SynthesisChunk(self.statement(table, fields), params)
+
+    def time_range(self, start: int, count: int) -> Tuple[datetime, datetime]:
+        """Bounds of the event timestamps of rows [start, start + count)"""
+        if self.shaper is None:
+            interval = timedelta(microseconds=EVENT_INTERVAL_US)
+            last = start + count - 1
+            return self.anchor + start * interval, self.anchor + last * interval
+        events_per_run = self.shaper.shape.events_per_run
+        first_run = start // events_per_run
+        last_run = (start + count - 1) // events_per_run
+        runs = np.arange(first_run, last_run + 1, dtype=np.int64)
+        shaped = self.shaper.run_columns(runs)
+        window_start = self.shaper.window_start
+        first = window_start + np.timedelta64(int(shaped.start_us.min()), "us")
+        last = window_start + np.timedelta64(
+            int((shaped.start_us + shaped.duration_us).max()), "us"
+        )
+        return first.item(), last.item()
@@ -0,0 +1,178 @@
+"""
+Workload shapes shared by every event source: the columnar generator, the factory
+and server synthesis all take runs, pipelines and timestamps from the same shaper,
+so a shape and seed describe the same dataset whichever source loads it.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List
+
+import numpy as np
+from faker import Faker
+
+from db_perf.models.workload import WorkloadShape
+
+SHAPE_STREAM = 2  # rng stream of the shape, next to the columnar pool and block streams
+AVERAGE_MONTH_US = int(30.436875 * 86_400 * 1_000_000)
+RUN_NAME_POOL = 512
+TAG_ENVS = ["dev", "staging", "prod"]
+
+# salts of the per run hashes, one per independent value
+_PIPELINE, _START, _DURATION, _RUN_NAME, _ENV, _RUN_ID, _RUN_ID_LOW, _COST = range(8)
+
+_MASK = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def _splitmix64(values: np.ndarray) -> np.ndarray:
+    z = values.astype(np.uint64)
+    with np.errstate(over="ignore"):
+        z = z + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return (z ^ (z >> np.uint64(31))) & _MASK
+
+
+def _unit(hashed: np.ndarray) -> np.ndarray:
+    """Maps 64 bit hashes to floats in [0, 1)"""
+    return (hashed >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+@dataclass
+class ShapedColumns:
+    """Run level columns of rows [start, start + count), in row order"""
+
+    run_index: np.ndarray  # global run number of each row
+    run_id: List[str]
+    run_name: List[str]
+    pipeline: np.ndarray  # pipeline number, 0 is the most popular
+    pipeline_name: List[str]
+    env: List[str]
+    owner: List[str]
+    cost_draw: np.ndarray  # uniform [0, 1) per run, picks the run's instance cost
+    event_timestamp: np.ndarray  # datetime64[us]
+
+
+@dataclass
+class ShapedRuns:
+    """Values of a set of runs, in the order of the run numbers given"""
+
+    run_id: List[str]
+    run_name: List[str]
+    pipeline: np.ndarray
+    env: List[str]
+    cost_draw: np.ndarray
+    start_us: np.ndarray  # run start, from the start of the window
+    duration_us: np.ndarray
+
+
+class WorkloadShaper:
+    """
+    Derives the run, pipeline and time columns of any row from its position alone,
+    hashing (seed, run) so rows can be generated in any chunking or process.
+    """
+
+    def __init__(self, shape: WorkloadShape, seed: int = 0):
+        self.shape = shape
+        self.seed = seed
+        anchor = shape.anchor or datetime.now()
+        self.window_end = np.datetime64(anchor, "us")
+        self.window_us = shape.months * AVERAGE_MONTH_US
+        self._build()
+
+    def _build(self):
+        shape = self.shape
+        rng = np.random.default_rng([self.seed, SHAPE_STREAM])
+
+        # largest remainder split of the runs by Zipf weight, at least one per pipeline
+        weights = 1.0 / np.arange(1, shape.pipelines + 1) ** shape.zipf_exponent
+        quotas = weights / weights.sum() * (shape.runs - shape.pipelines)
+        counts = np.floor(quotas).astype(np.int64)
+        remainder = shape.runs - shape.pipelines - counts.sum()
+        counts[np.argsort(counts - quotas)[:remainder]] += 1
+        allocation = np.repeat(np.arange(shape.pipelines), counts + 1)
+        self.allocation = rng.permutation(allocation)  # any prefix keeps the skew
+
+        fake = Faker()
+        fake.seed_instance(self.seed + SHAPE_STREAM)
+        self.pipeline_names = [
+            f"{fake.word()}-{fake.word()}-{i}" for i in range(shape.pipelines)
+        ]
+        self.owners = [fake.first_name() for _ in range(shape.pipelines)]
+        self.run_names = [f"{fake.word()}_{fake.word()}" for _ in range(RUN_NAME_POOL)]
+
+    def _hash(self, runs: np.ndarray, salt: int) -> np.ndarray:
+        key = (runs.astype(np.uint64) * np.uint64(8) + np.uint64(salt)) ^ _splitmix64(
+            np.array([self.seed], dtype=np.uint64)
+        )
+        return _splitmix64(key)
+
+    def _run_ids(self, runs: np.ndarray) -> List[str]:
+        high, low = self._hash(runs, _RUN_ID), self._hash(runs, _RUN_ID_LOW)
+        raw = np.stack([high, low], axis=1).astype(">u8").view(np.uint8).reshape(-1, 16)
+        raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+        raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+        hexed = raw.tobytes().hex()
+        return [
+            f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+            for h in (hexed[i : i + 32] for i in range(0, len(runs) * 32, 32))
+        ]
+
+    def run_columns(self, runs: np.ndarray) -> ShapedRuns:
+        """Values of the given global run numbers, one per run"""
+        shape = self.shape
+        pipeline = self.allocation[runs % len(self.allocation)]
+        duration_us = (
+            shape.run_duration.total_seconds()
+            * 1_000_000
+            * (0.5 + _unit(self._hash(runs, _DURATION)))
+        ).astype(np.int64)
+        latest_start = np.maximum(self.window_us - duration_us, 0)
+        start_us = (_unit(self._hash(runs, _START)) * latest_start).astype(np.int64)
+        run_names = self._hash(runs, _RUN_NAME) % np.uint64(RUN_NAME_POOL)
+        return ShapedRuns(
+            run_id=self._run_ids(runs),
+            run_name=[self.run_names[i] for i in run_names.tolist()],
+            pipeline=pipeline,
+            env=[
+                TAG_ENVS[i]
+                for i in (self._hash(runs, _ENV) % np.uint64(len(TAG_ENVS))).tolist()
+            ],
+            cost_draw=_unit(self._hash(runs, _COST)),
+            start_us=start_us,
+            duration_us=duration_us,
+        )
+
+    @property
+    def window_start(self) -> np.datetime64:
+        return self.window_end - np.timedelta64(self.window_us, "us")
+
+    def columns(self, start: int, count: int) -> ShapedColumns:
+        shape = self.shape
+        rows = np.arange(start, start + count, dtype=np.int64)
+        row_runs = rows // shape.events_per_run
+        event_in_run = rows % shape.events_per_run
+
+        # per run values are computed once per distinct run of the range
+        runs, inverse = np.unique(row_runs, return_inverse=True)
+        shaped = self.run_columns(runs)
+
+        # events are spaced evenly from the first to the last of the run
+        steps = max(shape.events_per_run - 1, 1)
+        durations = shaped.duration_us[inverse]
+        offset_us = shaped.start_us[inverse] + durations * event_in_run // steps
+        timestamps = self.window_start + offset_us.astype("timedelta64[us]")
+
+        row_pipeline = shaped.pipeline[inverse]
+        inverse_list = inverse.tolist()
+        return ShapedColumns(
+            run_index=row_runs,
+            run_id=[shaped.run_id[i] for i in inverse_list],
+            run_name=[shaped.run_name[i] for i in inverse_list],
+            pipeline=row_pipeline,
+            pipeline_name=[self.pipeline_names[p] for p in row_pipeline.tolist()],
+            env=[shaped.env[i] for i in inverse_list],
+            owner=[self.owners[p] for p in row_pipeline.tolist()],
+            cost_draw=shaped.cost_draw[inverse],
+            event_timestamp=timestamps,
+        )
@@ -0,0 +1,385 @@
+"""
+Candidate index sets for the client queries: BRIN or btree on `event_timestamp`,
+btree on `run_id`, `(pipeline_name, tags, run_id, event_timestamp)` full and partial,
+a covering `run_id` index and GIN on `tags`. The `tags` sets also come in
+`tag_set_id` versions for clients interning their tags.
+"""
+
+import math
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from db_perf.db_versions.base import BaseClient
+from db_perf.models.timing import TimingSummary
+from db_perf.stats import percentile
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    name: str
+    columns: str  # index expression list, e.g. "pipeline_name, tags"
+    method: str = "btree"
+    include: Optional[str] = None  # covered columns, btree only
+    where: Optional[str] = None  # predicate of a partial index
+
+    def create_sql(self, table: str) -> str:
+        statement = (
+            f"CREATE INDEX {self.name} ON {table} USING {self.method} ({self.columns})"
+        )
+        if self.include:
+            statement += f" INCLUDE ({self.include})"
+        if self.where:
+            statement += f" WHERE {self.where}"
+        return statement
+
+    def column_names(self) -> Set[str]:
+        """Columns it reads, the lower case identifiers (SQL keywords are upper case)"""
+        sql = " ".join(filter(None, (self.columns, self.include, self.where)))
+        return set(re.findall(r"\b[a-z_][a-z0-9_]*\b", sql))
+
+
+@dataclass(frozen=True)
+class IndexSet:
+    name: str
+    indexes: Tuple[IndexSpec, ...] = ()
+    # drop the table's secondary indexes (the schema's own) while the set is measured
+    replace_existing: bool = True
+
+    def missing_columns(self, client: BaseClient) -> Set[str]:
+        columns = set(client._get_table().column_names)
+        return {c for index in self.indexes for c in index.column_names()} - columns
+
+
+NAMED_PIPELINE = "pipeline_name IS NOT NULL AND pipeline_name <> ''"
+
+DEFAULT_INDEX_SETS = [
+    IndexSet("schema", replace_existing=False),
+    IndexSet("no_indexes"),
+    IndexSet(
+        "brin_event_timestamp",
+        (IndexSpec("idx_adv_event_ts_brin", "event_timestamp", method="brin"),),
+    ),
+    IndexSet(
+        "btree_event_timestamp",
+        (IndexSpec("idx_adv_event_ts", "event_timestamp"),),
+    ),
+    IndexSet("btree_run_id", (IndexSpec("idx_adv_run_id", "run_id"),)),
+    IndexSet(
+        "pipeline_tags_run_ts",
+        (
+            IndexSpec(
+                "idx_adv_pipeline_tags_run_ts",
+                "pipeline_name, tags, run_id, event_timestamp",
+            ),
+        ),
+    ),
+    IndexSet(
+        "partial_named_pipelines",
+        (
+            IndexSpec(
+                "idx_adv_named_pipeline_tags_run_ts",
+                "pipeline_name, tags, run_id, event_timestamp",
+                where=NAMED_PIPELINE,
+            ),
+        ),
+    ),
+    IndexSet(
+        "covering_run_id",
+        (
+            IndexSpec(
+                "idx_adv_run_id_covering",
+                "run_id, event_timestamp",
+                include="pipeline_name, tags, ec2_cost_per_hour, cpu_usage, mem_used",
+            ),
+        ),
+    ),
+    IndexSet("gin_tags", (IndexSpec("idx_adv_tags_gin", "tags", method="gin"),)),
+    IndexSet(
+        "brin_ts_btree_run_id_partial",
+        (
+            IndexSpec("idx_adv_event_ts_brin", "event_timestamp", method="brin"),
+            IndexSpec("idx_adv_run_id", "run_id"),
+            IndexSpec(
+                "idx_adv_named_pipeline_tags_run_ts",
+                "pipeline_name, tags, run_id, event_timestamp",
+                where=NAMED_PIPELINE,
+            ),
+        ),
+    ),
+    # the sets above reading `tags`, on the tag set ids of interned tags (v4)
+    IndexSet(
+        "pipeline_tag_set_run_ts",
+        (
+            IndexSpec(
+                "idx_adv_pipeline_tag_set_run_ts",
+                "pipeline_name, tag_set_id, run_id, event_timestamp",
+            ),
+        ),
+    ),
+    IndexSet(
+        "partial_named_pipelines_tag_set",
+        (
+            IndexSpec(
+                "idx_adv_named_pipeline_tag_set_run_ts",
+                "pipeline_name, tag_set_id, run_id, event_timestamp",
+                where=NAMED_PIPELINE,
+            ),
+        ),
+    ),
+    IndexSet(
+        "covering_run_id_tag_set",
+        (
+            IndexSpec(
+                "idx_adv_run_id_covering",
+                "run_id, event_timestamp",
+                include="pipeline_name, tag_set_id, ec2_cost_per_hour, cpu_usage, "
+                "mem_used",
+            ),
+        ),
+    ),
+]
+
+
+@dataclass
+class IndexAdvisorOptions:
+    index_sets: List[IndexSet] = field(default_factory=lambda: list(DEFAULT_INDEX_SETS))
+    probe_rows: int = 2_000  # rows inserted, rolled back and vacuumed, to time ingest
+    probe_repetitions: int = 3
+
+
+@dataclass
+class IndexSetResult:
+    index_set: str
+    size_bytes: int  # of the set's indexes, or of the kept schema indexes
+    build_seconds: float
+    ingest_ms: float  # median time to insert `probe_rows` rows
+    queries: Dict[str, TimingSummary]
+    ingest_slowdown: float = math.nan  # relative to the table without secondary indexes
+
+
+def secondary_indexes(client: BaseClient) -> Dict[str, str]:
+    """Index name to definition of the client table, leaving out constraint indexes"""
+    with client.pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT i.indexname, i.indexdef
+            FROM pg_indexes i
+            WHERE i.schemaname = current_schema()
+              AND i.tablename = %s
+              AND NOT EXISTS (
+                SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname
+              )
+            ORDER BY i.indexname
+            """,
+            (client._get_table().name,),
+        )
+        # definitions of partitioned indexes read `ON ONLY`, which would restore them
+        # without the per partition indexes
+        indexes = {
+            name: definition.replace(" ON ONLY ", " ON ", 1)
+            for name, definition in cur.fetchall()
+        }
+        conn.commit()
+        cur.close()
+    return indexes
+
+
+def index_size(client: BaseClient, names: List[str]) -> int:
+    """Bytes of the given indexes, including the partitions of partitioned ones"""
+    if not names:
+        return 0
+    with client.pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT COALESCE(SUM(pg_relation_size(i.relid)), 0)
+            FROM unnest(%s::text[]) AS n(name)
+            CROSS JOIN LATERAL (
+              SELECT n.name::regclass AS relid
+              UNION
+              SELECT relid FROM pg_partition_tree(n.name::regclass)
+            ) i
+            """,
+            (names,),
+        )
+        size = cur.fetchone()[0]
+        conn.commit()
+        cur.close()
+    return int(size)
+
+
+def _execute(client: BaseClient, statements: List[str]):
+    with client.pool.connection() as conn:
+        cur = conn.cursor()
+        for statement in statements:
+            cur.execute(statement)
+        conn.commit()
+        cur.close()
+
+
+def probe_ingest(
+    client: BaseClient, first_row: int, options: IndexAdvisorOptions
+) -> float:
+    """
+    Median ms to insert `probe_rows` new rows through the client ingest path,
+    rolled back every time and vacuumed, so the dataset is left as it was: dead
+    rows would otherwise slow the scans of the next index set's queries.
+    """
+    # per chunk setup, e.g. new tag sets, is committed once, not timed and rolled back
+    (payload,) = client.prepare_send(
+        [client.encode_chunk(first_row, options.probe_rows)]
+    )
+    samples = []
+    with client.pool.connection() as conn:
+        # the first insert after an index change also warms its pages, it is discarded
+        for _ in range(options.probe_repetitions + 1):
+            started = time.perf_counter()
+            try:
+                client.send_chunk(payload, conn, commit=False)
+                samples.append((time.perf_counter() - started) * 1000)
+            finally:
+                conn.rollback()
+    client.vacuum()
+    return percentile(samples[1:], 50)
+
+
+def measure_index_set(
+    client: BaseClient,
+    index_set: IndexSet,
+    existing: Dict[str, str],
+    first_row: int,
+    options: IndexAdvisorOptions,
+) -> IndexSetResult:
+    table = client._get_table().name
+    dropped = existing if index_set.replace_existing else {}
+    _execute(client, [f"DROP INDEX {name}" for name in dropped])
+    try:
+        started = time.perf_counter()
+        _execute(client, [index.create_sql(table) for index in index_set.indexes])
+        build_seconds = time.perf_counter() - started
+        client.analyze()
+
+        names = [index.name for index in index_set.indexes]
+        if not index_set.replace_existing:
+            names += list(existing)
+        size = index_size(client, names)
+
+        queries = client.benchmark_queries()
+        ingest_ms = probe_ingest(client, first_row, options)
+    finally:
+        _execute(
+            client,
+            [f"DROP INDEX IF EXISTS {index.name}" for index in index_set.indexes]
+            + list(dropped.values()),
+        )
+
+    return IndexSetResult(
+        index_set=index_set.name,
+        size_bytes=size,
+        build_seconds=build_seconds,
+        ingest_ms=ingest_ms,
+        queries=queries,
+    )
+
+
+def probe_ingest_without_indexes(
+    client: BaseClient,
+    existing: Dict[str, str],
+    first_row: int,
+    options: IndexAdvisorOptions,
+) -> float:
+    _execute(client, [f"DROP INDEX {name}" for name in existing])
+    try:
+        return probe_ingest(client, first_row, options)
+    finally:
+        _execute(client, list(existing.values()))
+
+
+def run_index_advisor(
+    client: BaseClient, loaded_records: int, options: IndexAdvisorOptions
+) -> List[IndexSetResult]:
+    """
+    Applies each index set to the loaded dataset in turn and measures the client's
+    queries, the size of the indexes and how much they slow down inserts. Sets
+    reading columns the client's table does not have are skipped. The schema's
+    indexes are restored afterwards.
+    """
+    existing = secondary_indexes(client)
+    no_index_ms = probe_ingest_without_indexes(
+        client, existing, loaded_records, options
+    )
+
+    results = []
+    for index_set in options.index_sets:
+        missing = index_set.missing_columns(client)
+        if missing:
+            print(
+                f"Skipping index set {index_set.name} on {client.name()}, "
+                f"no column {', '.join(sorted(missing))}"
+            )
+            continue
+        print(f"Measuring index set {index_set.name} on {client.name()}...")
+        result = measure_index_set(client, index_set, existing, loaded_records, options)
+        result.ingest_slowdown = result.ingest_ms / no_index_ms - 1
+        print(
+            f" {index_set.name}: {result.size_bytes / 2**20:.1f}MiB, "
+            f"built in {result.build_seconds:.2f}s, "
+            f"{result.ingest_slowdown:+.1%} ingest time"
+        )
+        results.append(result)
+    client.analyze()
+    return results
+
+
+def to_dataframe(results: List[IndexSetResult]) -> pd.DataFrame:
+    """One row per index set and query, ranked per query by median latency"""
+    records = []
+    for result in results:
+        for query_name, timings in result.queries.items():
+            records.append(
+                {
+                    "index_set": result.index_set,
+                    "query": query_name,
+                    "time_ms": timings.median,
+                    "p95_ms": timings.p95,
+                    "size_bytes": result.size_bytes,
+                    "build_s": result.build_seconds,
+                    "ingest_slowdown": result.ingest_slowdown,
+                }
+            )
+    df = pd.DataFrame(records)
+    if not df.empty:
+        df["rank"] = df.groupby("query")["time_ms"].rank(method="min").astype(int)
+    return df
+
+
+def rank_index_sets(results: List[IndexSetResult]) -> pd.DataFrame:
+    """
+    Ranks index sets overall by the geometric mean of their query latencies relative
+    to the first set, so every query weighs the same whatever its absolute time.
+    """
+    df = to_dataframe(results)
+    if df.empty:
+        return df
+    baseline = df[df["index_set"] == results[0].index_set].set_index("query")["time_ms"]
+    df["relative"] = df["time_ms"] / df["query"].map(baseline)
+    overall = (
+        df.groupby("index_set", sort=False)
+        .agg(
+            relative_latency=(
+                "relative",
+                lambda r: float(math.exp(r.map(math.log).mean())),
+            ),
+            size_bytes=("size_bytes", "first"),
+            build_s=("build_s", "first"),
+            ingest_slowdown=("ingest_slowdown", "first"),
+        )
+        .reset_index()
+    )
+    overall["rank"] = overall["relative_latency"].rank(method="min").astype(int)
+    return overall.sort_values("rank")
@@ -0,0 +1,288 @@
+import io
+import json
+import struct
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, Union
+
+from psycopg2.extensions import cursor
+from psycopg2.extras import Json, execute_values
+
+from db_perf.models.load import IngestStrategy
+from db_perf.models.table import Table
+
+Row = Sequence[Any]
+
+PG_EPOCH = datetime(2000, 1, 1)
+TEXT_OID = 25
+
+COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+COPY_BINARY_TRAILER = struct.pack("!h", -1)
+COPY_TEXT_NULL = "\\N"
+
+_COPY_TEXT_ESCAPES = str.maketrans(
+    {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"}
+)
+
+
+def insert_sql(table: Table) -> str:
+    columns = ", ".join(table.column_names)
+    placeholders = ", ".join(["%s"] * len(table.columns))
+    return f"INSERT INTO {table.name} ({columns}) VALUES ({placeholders})"
+
+
+def copy_sql(table: Table, binary: bool) -> str:
+    columns = ", ".join(table.column_names)
+    options = " WITH (FORMAT binary)" if binary else ""
+    return f"COPY {table.name} ({columns}) FROM STDIN{options}"
+
+
+def naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _json_text(value: Any) -> str:
+    # pre-serialized documents are passed through untouched
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+# --- parameter adaptation (executemany / execute_values) ---
+
+
+def adapt_row(table: Table, row: Row) -> tuple:
+    adapted = []
+    for column, value in zip(table.columns, row):
+        if (
+            column.pg_type == "jsonb"
+            and value is not None
+            and not isinstance(value, str)
+        ):
+            value = Json(value, dumps=json.dumps)
+        adapted.append(value)
+    return tuple(adapted)
+
+
+# --- COPY text format ---
+
+
+def _text_array(values: Iterable[Optional[str]]) -> str:
+    elements = []
+    for value in values:
+        if value is None:
+            elements.append("NULL")
+        else:
+            escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+            elements.append(f'"{escaped}"')
+    return "{" + ",".join(elements) + "}"
+
+
+_TEXT_ENCODERS: Dict[str, Callable[[Any], str]] = {
+    "text": str,
+    "text[]": _text_array,
+    "jsonb": _json_text,
+    "timestamp": lambda value: naive_utc(value).isoformat(sep=" "),
+    "float8": lambda value: repr(float(value)),
+    "int4": lambda value: str(int(value)),
+    "int8": lambda value: str(int(value)),
+}
+
+
+def encode_copy_text(table: Table, rows: Iterable[Row]) -> Iterator[bytes]:
+    encoders = [_TEXT_ENCODERS[column.pg_type] for column in table.columns]
+    for row in rows:
+        fields = [
+            (
+                COPY_TEXT_NULL
+                if value is None
+                else encode(value).translate(_COPY_TEXT_ESCAPES)
+            )
+            for encode, value in zip(encoders, row)
+        ]
+        yield ("\t".join(fields) + "\n").encode("utf-8")
+
+
+# --- COPY binary format ---
+
+
+def _binary_text_array(values: Sequence[Optional[str]]) -> bytes:
+    if not values:
+        return struct.pack("!iii", 0, 0, TEXT_OID)
+
+    has_null = any(value is None for value in values)
+    parts = [struct.pack("!iiiii", 1, int(has_null), TEXT_OID, len(values), 1)]
+    for value in values:
+        if value is None:
+            parts.append(struct.pack("!i", -1))
+        else:
+            encoded = str(value).encode("utf-8")
+            parts.append(struct.pack("!i", len(encoded)))
+            parts.append(encoded)
+    return b"".join(parts)
+
+
+def _binary_timestamp(value: datetime) -> bytes:
+    delta = naive_utc(value) - PG_EPOCH
+    micros = (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return struct.pack("!q", micros)
+
+
+_BINARY_ENCODERS: Dict[str, Callable[[Any], bytes]] = {
+    "text": lambda value: str(value).encode("utf-8"),
+    "text[]": _binary_text_array,
+    # jsonb binary format is a version byte followed by the json text
+    "jsonb": lambda value: b"\x01" + _json_text(value).encode("utf-8"),
+    "timestamp": _binary_timestamp,
+    "float8": lambda value: struct.pack("!d", value),
+    "int4": lambda value: struct.pack("!i", value),
+    "int8": lambda value: struct.pack("!q", value),
+}
+
+
+def encode_copy_binary(
+    table: Table, rows: Iterable[Row], header: bool = True, trailer: bool = True
+) -> Iterator[bytes]:
+    encoders = [_BINARY_ENCODERS[column.pg_type] for column in table.columns]
+    field_count = struct.pack("!h", len(encoders))
+
+    if header:
+        yield COPY_BINARY_HEADER
+    for row in rows:
+        parts = [field_count]
+        for encode, value in zip(encoders, row):
+            if value is None:
+                parts.append(b"\xff\xff\xff\xff")
+                continue
+            encoded = encode(value)
+            parts.append(struct.pack("!i", len(encoded)))
+            parts.append(encoded)
+        yield b"".join(parts)
+    if trailer:
+        yield COPY_BINARY_TRAILER
+
+
+class CopyPayload:
+    """A COPY stream made of buffers, e.g. slices of a memory-mapped file, sent without joining them"""
+
+    def __init__(self, parts: Sequence[Union[bytes, memoryview]]):
+        self.parts = parts
+
+    def __len__(self) -> int:
+        return sum(len(part) for part in self.parts)
+
+    def reader(self) -> "BufferReader":
+        return BufferReader(self.parts)
+
+
+class BufferReader:
+    """File-like reader over a sequence of buffers, copying only the slices read"""
+
+    def __init__(self, parts: Sequence[Union[bytes, memoryview]]):
+        self._parts = iter(parts)
+        self._part: Union[bytes, memoryview] = b""
+        self._position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        while self._position >= len(self._part):
+            self._part = next(self._parts, None)
+            self._position = 0
+            if self._part is None:
+                self._part = b""
+                return b""
+        end = len(self._part) if size < 0 else self._position + size
+        data = bytes(self._part[self._position : end])
+        self._position += len(data)
+        return data
+
+
+class IteratorReader:
+    """File-like adapter so `copy_expert` can stream from a generator of bytes"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = bytearray()
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer.extend(chunk)
+
+        if size < 0 or size >= len(self._buffer):
+            data = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        return data
+
+
+COPY_READ_SIZE = 1 << 16
+
+
+def prepare_rows(table: Table, rows: Iterable[Row], strategy: IngestStrategy) -> Any:
+    """Encodes rows into the payload `send_rows` expects, so encoding can run apart from sending"""
+    if strategy in (IngestStrategy.EXECUTEMANY, IngestStrategy.EXECUTE_VALUES):
+        return [adapt_row(table, row) for row in rows]
+    if strategy == IngestStrategy.COPY_TEXT:
+        return b"".join(encode_copy_text(table, rows))
+    if strategy == IngestStrategy.COPY_BINARY:
+        return b"".join(encode_copy_binary(table, rows))
+    raise ValueError(f"Unknown ingest strategy: {strategy}")
+
+
+def send_rows(
+    cur: cursor,
+    table: Table,
+    payload: Any,
+    strategy: IngestStrategy,
+    page_size: int = 1000,
+):
+    """Sends a payload from `prepare_rows`, or a lazily encoded one from `write_rows`"""
+    if strategy == IngestStrategy.EXECUTEMANY:
+        cur.executemany(insert_sql(table), payload)
+    elif strategy == IngestStrategy.EXECUTE_VALUES:
+        columns = ", ".join(table.column_names)
+        execute_values(
+            cur,
+            f"INSERT INTO {table.name} ({columns}) VALUES %s",
+            payload,
+            page_size=page_size,
+        )
+    elif strategy in (IngestStrategy.COPY_TEXT, IngestStrategy.COPY_BINARY):
+        if isinstance(payload, CopyPayload):
+            source = payload.reader()
+        elif isinstance(payload, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(payload)
+        else:
+            source = IteratorReader(payload)
+        cur.copy_expert(
+            copy_sql(table, binary=strategy == IngestStrategy.COPY_BINARY),
+            source,
+            size=COPY_READ_SIZE,
+        )
+    else:
+        raise ValueError(f"Unknown ingest strategy: {strategy}")
+
+
+def write_rows(
+    cur: cursor,
+    table: Table,
+    rows: Iterable[Row],
+    strategy: IngestStrategy,
+    page_size: int = 1000,
+):
+    if strategy == IngestStrategy.EXECUTEMANY:
+        payload = [adapt_row(table, row) for row in rows]
+    elif strategy == IngestStrategy.EXECUTE_VALUES:
+        payload = (adapt_row(table, row) for row in rows)
+    elif strategy == IngestStrategy.COPY_TEXT:
+        payload = encode_copy_text(table, rows)
+    elif strategy == IngestStrategy.COPY_BINARY:
+        payload = encode_copy_binary(table, rows)
+    else:
+        raise ValueError(f"Unknown ingest strategy: {strategy}")
+    send_rows(cur, table, payload, strategy, page_size=page_size)
@@ -0,0 +1,116 @@
+"""
+Counters read around a load. With `pg_stat_statements` preloaded by the server, as
+in the compose file, the extension is created in the client database and statement
+execution time is split out of the client's send time.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from psycopg2.extensions import adapt, connection
+
+from db_perf.models.load import IngestStrategy
+
+# rows of a parameter chunk whose SQL literals are measured to estimate its size
+PAYLOAD_SAMPLE_ROWS = 100
+
+
+@dataclass
+class ServerCounters:
+    """Server side counters read around a load, subtracted to get what it wrote"""
+
+    wal_lsn: str
+    heap_bytes: int
+    index_bytes: int
+    toast_bytes: int
+    database_bytes: int
+    exec_ms: Optional[float]  # pg_stat_statements execution time of the database
+
+
+def payload_size(payload: Any, strategy: IngestStrategy) -> int:
+    """
+    Bytes of an encoded chunk. COPY payloads are the exact stream sent; parameter
+    rows are estimated from the SQL literals of a sample of them.
+    """
+    if strategy in (IngestStrategy.COPY_TEXT, IngestStrategy.COPY_BINARY):
+        return len(payload)
+    if not payload:
+        return 0
+    sample = payload[:PAYLOAD_SAMPLE_ROWS]
+    # `(a, b, ...)` per row: the literals, a separator each and the parentheses
+    literals = sum(_literal_size(value) + 2 for row in sample for value in row)
+    return literals * len(payload) // len(sample)
+
+
+def _literal_size(value: Any) -> int:
+    adapted = adapt(value)
+    if hasattr(adapted, "encoding"):
+        adapted.encoding = "utf8"  # unbound string adapters default to latin-1
+    return len(adapted.getquoted())
+
+
+def enable_statement_stats(conn: connection) -> bool:
+    """
+    Creates the pg_stat_statements extension in the client database when the server
+    preloads it, returns whether statement execution times can be read.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SHOW shared_preload_libraries")
+        libraries = [name.strip() for name in cur.fetchone()[0].split(",")]
+        if "pg_stat_statements" not in libraries:
+            return False
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_stat_statements")
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"pg_stat_statements unavailable, server time is not split out: {e}")
+        conn.rollback()
+        return False
+    finally:
+        cur.close()
+
+
+def read_counters(
+    conn: connection, table: str, statement_stats: bool
+) -> ServerCounters:
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT pg_current_wal_lsn()::text,
+               COALESCE(SUM(pg_relation_size(c.oid)), 0),
+               COALESCE(SUM(pg_indexes_size(c.oid)), 0),
+               COALESCE(SUM(pg_total_relation_size(NULLIF(c.reltoastrelid, 0))), 0),
+               pg_database_size(current_database())
+        FROM (
+          SELECT %s::regclass AS relid
+          UNION
+          SELECT relid FROM pg_partition_tree(%s::regclass)
+        ) t
+        JOIN pg_class c ON c.oid = t.relid
+        """,
+        (table, table),
+    )
+    wal_lsn, heap, index, toast, database = cur.fetchone()
+    exec_ms = None
+    if statement_stats:
+        cur.execute("""
+            SELECT COALESCE(SUM(total_exec_time), 0)
+            FROM pg_stat_statements
+            WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+            """)
+        exec_ms = float(cur.fetchone()[0])
+    conn.commit()
+    cur.close()
+    return ServerCounters(
+        wal_lsn, int(heap), int(index), int(toast), int(database), exec_ms
+    )
+
+
+def wal_bytes_between(conn: connection, before: str, after: str) -> int:
+    cur = conn.cursor()
+    cur.execute("SELECT pg_wal_lsn_diff(%s::pg_lsn, %s::pg_lsn)", (after, before))
+    wal_bytes = cur.fetchone()[0]
+    conn.commit()
+    cur.close()
+    return int(wal_bytes)
@@ -0,0 +1,311 @@
+"""
+Operating points of ingest: batch size, rows per commit, synchronous_commit and the
+target table. Staging tables trade durability for speed, their merge into the client
+table is timed with them, so points compare on rows landed in the client table.
+"""
+
+import itertools
+import time
+from dataclasses import dataclass, field, replace
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from psycopg2.extensions import connection
+
+from db_perf.db_versions.base import BaseClient
+from db_perf.ingest import Row, prepare_rows, send_rows
+from db_perf.models.settings import SettingsProfile
+from db_perf.models.timing import TimingSummary
+
+
+class DurabilityLevel(str, Enum):
+    """What a crash may cost, from nothing to everything not yet merged"""
+
+    DURABLE = "durable"  # every commit is flushed before it returns
+    ASYNC_COMMIT = "async_commit"  # the last few hundred ms of commits may be lost
+    UNLOGGED = "unlogged"  # staged rows are truncated by crash recovery
+
+
+DURABILITY_ORDER = [
+    DurabilityLevel.DURABLE,
+    DurabilityLevel.ASYNC_COMMIT,
+    DurabilityLevel.UNLOGGED,
+]
+
+
+class IngestTarget(str, Enum):
+    TABLE = "table"  # the client table through its own ingest path
+    LOGGED_STAGING = "logged_staging"  # a plain copy of its columns, merged afterwards
+    UNLOGGED_STAGING = "unlogged_staging"
+
+
+@dataclass
+class IngestTunerOptions:
+    batch_sizes: List[int] = field(default_factory=lambda: [1, 10, 100, 1_000])
+    # batches per commit
+    commit_batches: List[int] = field(default_factory=lambda: [1, 10])
+    synchronous_commit: List[bool] = field(default_factory=lambda: [True, False])
+    targets: List[IngestTarget] = field(default_factory=lambda: list(IngestTarget))
+    rows_per_point: int = 2_000
+    # stops a slow point early, e.g. one row per commit
+    max_seconds_per_point: float = 5.0
+    durability: DurabilityLevel = DurabilityLevel.DURABLE  # level to recommend for
+
+
+@dataclass
+class IngestTuningPoint:
+    batch_size: int
+    commit_rows: int
+    synchronous_commit: bool
+    target: IngestTarget
+    rows: int
+    seconds: float
+    latency: TimingSummary  # per batch, including the commit that follows it
+    merge_seconds: float = 0.0  # moving staged rows into the client table
+
+    @property
+    def durability(self) -> DurabilityLevel:
+        if self.target == IngestTarget.UNLOGGED_STAGING:
+            return DurabilityLevel.UNLOGGED
+        if not self.synchronous_commit:
+            return DurabilityLevel.ASYNC_COMMIT
+        return DurabilityLevel.DURABLE
+
+    @property
+    def rows_per_s(self) -> float:
+        """Rows/s into the client table, staged points pay for their merge"""
+        seconds = self.seconds + self.merge_seconds
+        return self.rows / seconds if seconds else 0.0
+
+    def meets(self, level: DurabilityLevel) -> bool:
+        return DURABILITY_ORDER.index(self.durability) <= DURABILITY_ORDER.index(level)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "batch_size": self.batch_size,
+            "commit_rows": self.commit_rows,
+            "synchronous_commit": self.synchronous_commit,
+            "target": self.target.value,
+            "durability": self.durability.value,
+            "rows": self.rows,
+            "rows_per_s": self.rows_per_s,
+            "merge_s": self.merge_seconds,
+            "p50_ms": self.latency.median,
+            "p95_ms": self.latency.p95,
+            "p99_ms": self.latency.p99,
+        }
+
+
+def _staging_name(client: BaseClient) -> str:
+    return f"{client._get_table().name}_tuner_staging"
+
+
+def _create_staging(client: BaseClient, target: IngestTarget):
+    table = client._get_table().name
+    unlogged = "UNLOGGED " if target == IngestTarget.UNLOGGED_STAGING else ""
+    with client.pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"DROP TABLE IF EXISTS {_staging_name(client)}")
+        cur.execute(
+            f"CREATE {unlogged}TABLE {_staging_name(client)} "
+            f"(LIKE {table} INCLUDING DEFAULTS)"
+        )
+        conn.commit()
+        cur.close()
+
+
+def _drop_staging(client: BaseClient):
+    with client.pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"DROP TABLE IF EXISTS {_staging_name(client)}")
+        conn.commit()
+        cur.close()
+
+
+def _merge_staging(client: BaseClient, conn: connection) -> float:
+    """
+    Seconds to move the staged rows into the client table and commit them, as a
+    loader would, under the point's synchronous_commit. The rows are deleted after
+    the sweep.
+    """
+    columns = ", ".join(client._get_table().column_names)
+    cur = conn.cursor()
+    started = time.perf_counter()
+    cur.execute(
+        f"INSERT INTO {client._get_table().name} ({columns}) "
+        f"SELECT {columns} FROM {_staging_name(client)}"
+    )
+    conn.commit()
+    seconds = time.perf_counter() - started
+    cur.close()
+    return seconds
+
+
+def _encode_batches(
+    client: BaseClient, rows: List[Row], batch_size: int, target: IngestTarget
+) -> List[Tuple[int, Any]]:
+    """
+    (rows, payload) per batch, encoded up front and with the client's per chunk
+    setup, e.g. partitions or tag sets, committed once so only sending rows is timed.
+    Staged rows get the same setup, their merge goes through the client table.
+    """
+    batches = [rows[i : i + batch_size] for i in range(0, len(rows), batch_size)]
+    if target == IngestTarget.TABLE:
+        payloads = client.prepare_send([client.prepare_chunk(b) for b in batches])
+        return [(len(batch), p) for batch, p in zip(batches, payloads)]
+    client.prepare_send([client.prepare_chunk(rows)])
+    staging = replace(client._get_table(), name=_staging_name(client))
+    return [
+        (len(batch), prepare_rows(staging, batch, client.load_options.strategy))
+        for batch in batches
+    ]
+
+
+def _send_batches(
+    client: BaseClient,
+    conn: connection,
+    batches: List[Tuple[int, Any]],
+    batch_size: int,
+    commit_batches: int,
+    synchronous_commit: bool,
+    target: IngestTarget,
+    options: IngestTunerOptions,
+) -> IngestTuningPoint:
+    staging = replace(client._get_table(), name=_staging_name(client))
+    samples, rows = [], 0
+    deadline = time.perf_counter() + options.max_seconds_per_point
+    started = time.perf_counter()
+    for sent, (batch_rows, payload) in enumerate(batches, start=1):
+        batch_started = time.perf_counter()
+        if target == IngestTarget.TABLE:
+            client.send_chunk(payload, conn, commit=False)
+        else:
+            cur = conn.cursor()
+            send_rows(
+                cur,
+                staging,
+                payload,
+                client.load_options.strategy,
+                page_size=client.load_options.page_size,
+            )
+            cur.close()
+        last = sent == len(batches) or time.perf_counter() >= deadline
+        if sent % commit_batches == 0 or last:
+            conn.commit()
+        samples.append((time.perf_counter() - batch_started) * 1000)
+        rows += batch_rows
+        if last:
+            break
+    return IngestTuningPoint(
+        batch_size=batch_size,
+        commit_rows=batch_size * commit_batches,
+        synchronous_commit=synchronous_commit,
+        target=target,
+        rows=rows,
+        seconds=time.perf_counter() - started,
+        latency=TimingSummary(samples=samples),
+    )
+
+
+def measure_point(
+    client: BaseClient,
+    rows: List[Row],
+    batch_size: int,
+    commit_batches: int,
+    synchronous_commit: bool,
+    target: IngestTarget,
+    options: IngestTunerOptions,
+) -> IngestTuningPoint:
+    batches = _encode_batches(client, rows, batch_size, target)
+    settings = SettingsProfile(
+        "tuner", {"synchronous_commit": "on" if synchronous_commit else "off"}
+    )
+    if target != IngestTarget.TABLE:
+        _create_staging(client, target)
+    try:
+        with client.pool.connection() as conn, client._session_settings(conn, settings):
+            point = _send_batches(
+                client,
+                conn,
+                batches,
+                batch_size,
+                commit_batches,
+                synchronous_commit,
+                target,
+                options,
+            )
+            if target != IngestTarget.TABLE:
+                point.merge_seconds = _merge_staging(client, conn)
+    finally:
+        if target != IngestTarget.TABLE:
+            _drop_staging(client)
+    return point
+
+
+def run_ingest_tuner(
+    client: BaseClient, loaded_records: int, options: IngestTunerOptions
+) -> List[IngestTuningPoint]:
+    """
+    Inserts `rows_per_point` new rows for every combination of batch size, batches
+    per commit, synchronous_commit and target, timing each batch. Staging tables are
+    dropped after each point and the rows written to the client table deleted once
+    after the sweep, so the loaded dataset is left as it was.
+    """
+    rows = list(client.generate_rows(loaded_records, options.rows_per_point))
+    last_id = client.last_row_id()
+    points = []
+    try:
+        for batch_size, commit_batches, synchronous_commit, target in itertools.product(
+            options.batch_sizes,
+            options.commit_batches,
+            options.synchronous_commit,
+            options.targets,
+        ):
+            point = measure_point(
+                client,
+                rows,
+                batch_size,
+                commit_batches,
+                synchronous_commit,
+                target,
+                options,
+            )
+            print(
+                f" batch {batch_size}, commit every {point.commit_rows} rows, "
+                f"synchronous_commit {'on' if synchronous_commit else 'off'}, "
+                f"{target.value}: {point.rows_per_s:,.0f} rows/s, "
+                f"p95 {point.latency.p95:.2f}ms per batch"
+            )
+            points.append(point)
+    finally:
+        client.delete_rows_after(last_id)
+    return points
+
+
+def recommend(
+    points: List[IngestTuningPoint], level: DurabilityLevel
+) -> Optional[IngestTuningPoint]:
+    """The fastest operating point losing no more on a crash than `level` allows"""
+    eligible = [point for point in points if point.meets(level)]
+    if not eligible:
+        return None
+    return max(eligible, key=lambda point: point.rows_per_s)
+
+
+def to_dataframe(points: List[IngestTuningPoint]) -> pd.DataFrame:
+    df = pd.DataFrame([point.to_dict() for point in points])
+    if not df.empty:
+        df["rank"] = df["rows_per_s"].rank(ascending=False, method="min").astype(int)
+    return df
+
+
+def describe(point: Optional[IngestTuningPoint]) -> str:
+    if point is None:
+        return "no operating point measured"
+    return (
+        f"batches of {point.batch_size} rows, commit every {point.commit_rows} rows, "
+        f"synchronous_commit {'on' if point.synchronous_commit else 'off'}, "
+        f"{point.target.value} ({point.rows_per_s:,.0f} rows/s, "
+        f"p95 {point.latency.p95:.2f}ms per batch)"
+    )
@@ -3,12 +3,16 @@ from pathlib import Path
 
 
 class DatabaseMigrator:
+    _sqlx_checked = False  # shared by every migrator in the process
+
     def __init__(self, database_url, migration_folder: Path):
         self.database_url = database_url
         self.migration_folder = migration_folder
 
     def _check_sqlx_installed(self):
-        # Check if sqlx is installed
+        # Only checked once per process, so an install never lands in the middle of a run
+        if DatabaseMigrator._sqlx_checked:
+            return
         try:
             subprocess.run(
                 ["sqlx", "--version"],
@@ -16,7 +20,7 @@ class DatabaseMigrator:
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
             )
-        except subprocess.CalledProcessError:
+        except (subprocess.CalledProcessError, FileNotFoundError):
             print("sqlx not found. Installing...")
             subprocess.run(
                 [
@@ -29,6 +33,7 @@ class DatabaseMigrator:
                 ],
                 check=True,
             )
+        DatabaseMigrator._sqlx_checked = True
 
     def run_migrations(self):
         # Check if sqlx is installed
@@ -0,0 +1,346 @@
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from db_perf.concurrency import (
+    ALL_QUERIES,
+    ConcurrencyOptions,
+    SessionThread,
+    in_mix,
+    join_sessions,
+    run_session,
+    start_sessions,
+)
+from db_perf.db_versions.base import BaseClient
+from db_perf.models.timing import TimingSummary
+from db_perf.pipeline import chunk_bounds, prefetch
+
+
+@dataclass
+class MixedWorkloadOptions:
+    # target rows/s, 0 is the read-only baseline
+    write_rates: List[int] = field(default_factory=lambda: [0, 1_000, 5_000, 20_000])
+    sessions: int = 4  # concurrent reader sessions
+    duration_s: float = 30.0  # per write rate
+    window_s: float = 1.0  # width of the time buckets reported over a run
+    batch_rows: int = 100  # rows per writer transaction
+    seed: int = 0
+
+
+@dataclass
+class MixedWorkloadWindow:
+    write_rate: int
+    start_s: float  # window start relative to the start of the run
+    rows_written: int
+    window_s: float
+    latency: TimingSummary  # latency of the whole query mix completed in the window
+
+    @property
+    def ingest_rows_per_s(self) -> float:
+        return self.rows_written / self.window_s
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "write_rate": self.write_rate,
+            "start_s": self.start_s,
+            "ingest_rows_per_s": self.ingest_rows_per_s,
+            "queries": self.latency.n,
+            "p50_ms": self.latency.median,
+            "p95_ms": self.latency.p95,
+            "p99_ms": self.latency.p99,
+        }
+
+
+@dataclass
+class MixedWorkloadResult:
+    write_rate: int
+    query: str
+    requests: int
+    errors: int
+    rows_written: int
+    duration_s: float
+    latency: TimingSummary
+    windows: List[MixedWorkloadWindow] = field(default_factory=list)
+
+    @property
+    def ingest_rows_per_s(self) -> float:
+        return self.rows_written / self.duration_s if self.duration_s else 0.0
+
+    @property
+    def throughput_qps(self) -> float:
+        return self.requests / self.duration_s if self.duration_s else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "write_rate": self.write_rate,
+            "query": self.query,
+            "ingest_rows_per_s": self.ingest_rows_per_s,
+            "requests": self.requests,
+            "errors": self.errors,
+            "throughput_qps": self.throughput_qps,
+            "p50_ms": self.latency.median,
+            "p95_ms": self.latency.p95,
+            "p99_ms": self.latency.p99,
+            "mean_ms": self.latency.mean,
+        }
+
+
+def _writer(
+    client: BaseClient,
+    rate: int,
+    first_row: int,
+    options: MixedWorkloadOptions,
+    start: threading.Barrier,
+    deadline: List[float],
+    commits: List[Tuple[float, int]],
+):
+    """
+    Inserts batches of `batch_rows` through the client ingest path on a fixed
+    schedule, one batch every `batch_rows / rate` seconds. A batch that falls
+    behind is sent at once, so the achieved rate shows where ingest saturates.
+    """
+    batches = (
+        (rows, client.encode_chunk(batch_start, rows))
+        for batch_start, rows in chunk_bounds(first_row, 2**62, options.batch_rows)
+    )
+    interval = options.batch_rows / rate
+    try:
+        with client.pool.connection() as conn:
+            start.wait()
+            started = time.perf_counter()
+            for sent, (rows, payload) in enumerate(prefetch(batches, 2)):
+                scheduled = started + sent * interval
+                now = time.perf_counter()
+                if scheduled > now:
+                    time.sleep(scheduled - now)
+                if time.perf_counter() >= deadline[0]:
+                    break
+                client.send_chunk(payload, conn)
+                commits.append((time.perf_counter(), rows))
+    except Exception:
+        start.abort()
+        raise
+
+
+def _windows(
+    write_rate: int,
+    started: float,
+    elapsed: float,
+    window_s: float,
+    timeline: List[Tuple[float, str, float]],
+    commits: List[Tuple[float, int]],
+) -> List[MixedWorkloadWindow]:
+    count = max(1, math.ceil(elapsed / window_s))
+    samples: List[List[float]] = [[] for _ in range(count)]
+    rows = [0] * count
+    for finished, _, ms in timeline:
+        samples[min(count - 1, int((finished - started) // window_s))].append(ms)
+    for committed, batch_rows in commits:
+        rows[min(count - 1, int((committed - started) // window_s))] += batch_rows
+    return [
+        MixedWorkloadWindow(
+            write_rate=write_rate,
+            start_s=i * window_s,
+            rows_written=rows[i],
+            # the last window is usually partial
+            window_s=min(window_s, elapsed - i * window_s),
+            latency=TimingSummary(samples=samples[i]),
+        )
+        for i in range(count)
+    ]
+
+
+def run_mixed_level(
+    client: BaseClient, write_rate: int, first_row: int, options: MixedWorkloadOptions
+) -> List[MixedWorkloadResult]:
+    """
+    Runs the client's query mix from `sessions` reader threads while a writer
+    thread inserts rows at `write_rate` rows/s, both for `duration_s` seconds.
+    """
+    queries = in_mix(client.queries())
+    reader_options = ConcurrencyOptions(
+        sessions=[options.sessions], duration_s=options.duration_s, seed=options.seed
+    )
+    latencies = {query.name: [] for query in queries}
+    errors = {query.name: 0 for query in queries}
+    timeline: List[Tuple[float, str, float]] = []
+    commits: List[Tuple[float, int]] = []
+    writers = 1 if write_rate > 0 else 0
+    if writers:
+        # e.g. partitions for the rows the writer can send, before the clock starts
+        client.prepare_load(
+            first_row, math.ceil(write_rate * options.duration_s) + options.batch_rows
+        )
+    # the writer may borrow a second connection for rows not prepared ahead
+    client.pool.ensure_capacity(options.sessions + 2 * writers)
+    start = threading.Barrier(options.sessions + writers + 1)
+    deadline = [float("inf")]
+
+    threads = [
+        SessionThread(
+            target=run_session,
+            args=(
+                client.pool,
+                queries,
+                reader_options,
+                i,
+                start,
+                deadline,
+                latencies,
+                errors,
+                timeline,
+            ),
+            name=f"mixed-reader-{i}",
+        )
+        for i in range(options.sessions)
+    ]
+    if writers:
+        threads.append(
+            SessionThread(
+                target=_writer,
+                args=(client, write_rate, first_row, options, start, deadline, commits),
+                name="mixed-writer",
+            )
+        )
+    for thread in threads:
+        thread.start()
+
+    start_sessions(start, threads)
+    started = time.perf_counter()
+    deadline[0] = started + options.duration_s
+    join_sessions(threads)
+    elapsed = time.perf_counter() - started
+
+    rows_written = sum(rows for _, rows in commits)
+    results = [
+        MixedWorkloadResult(
+            write_rate=write_rate,
+            query=name,
+            requests=len(samples),
+            errors=errors[name],
+            rows_written=rows_written,
+            duration_s=elapsed,
+            latency=TimingSummary(samples=samples),
+        )
+        for name, samples in latencies.items()
+    ]
+    results.append(
+        MixedWorkloadResult(
+            write_rate=write_rate,
+            query=ALL_QUERIES,
+            requests=len(timeline),
+            errors=sum(errors.values()),
+            rows_written=rows_written,
+            duration_s=elapsed,
+            latency=TimingSummary(samples=[ms for _, _, ms in timeline]),
+            windows=_windows(
+                write_rate, started, elapsed, options.window_s, timeline, commits
+            ),
+        )
+    )
+    return results
+
+
+def run_mixed_benchmark(
+    client: BaseClient, loaded_records: int, options: MixedWorkloadOptions
+) -> List[MixedWorkloadResult]:
+    """
+    Runs every write rate against the loaded dataset. Written rows continue the
+    dataset after `loaded_records` and are deleted again after each rate, so every
+    level starts from the same table.
+    """
+    results = []
+    for write_rate in options.write_rates:
+        print(
+            f"Running mixed workload with {options.sessions} reader(s) "
+            f"at {write_rate} rows/s..."
+        )
+        if write_rate > 0:
+            last_id = client.last_row_id()
+            try:
+                level = run_mixed_level(client, write_rate, loaded_records, options)
+            finally:
+                client.delete_rows_after(last_id)
+        else:
+            level = run_mixed_level(client, write_rate, loaded_records, options)
+        total = level[-1]
+        print(
+            f" {write_rate} rows/s target: {total.ingest_rows_per_s:,.0f} rows/s written, "
+            f"p95 {total.latency.p95:.2f}ms, {total.throughput_qps:.1f} queries/s"
+        )
+        results.extend(level)
+    return results
+
+
+def to_dataframe(results: List[MixedWorkloadResult]) -> pd.DataFrame:
+    return pd.DataFrame([result.to_dict() for result in results])
+
+
+def windows_dataframe(results: List[MixedWorkloadResult]) -> pd.DataFrame:
+    return pd.DataFrame(
+        [window.to_dict() for result in results for window in result.windows]
+    )
+
+
+def plot_mixed_workload(
+    df: pd.DataFrame,
+    windows: pd.DataFrame,
+    path: str = "db_mixed_workload_plot.png",
+):
+    """Latency and achieved ingest against the target write rate, and p95 over time"""
+    fig, (latency, ingest, over_time) = plt.subplots(1, 3, figsize=(20, 6))
+    for (records, client), group in df[df["query"] == ALL_QUERIES].groupby(
+        ["records", "client"]
+    ):
+        group_sorted = group.sort_values("write_rate")
+        label = f"{client} - {records} records"
+        latency.plot(
+            group_sorted["write_rate"],
+            group_sorted["p95_ms"],
+            marker="o",
+            label=f"{label} p95",
+        )
+        latency.plot(
+            group_sorted["write_rate"],
+            group_sorted["p50_ms"],
+            marker="x",
+            linestyle="--",
+            label=f"{label} p50",
+        )
+        ingest.plot(
+            group_sorted["write_rate"],
+            group_sorted["ingest_rows_per_s"],
+            marker="o",
+            label=label,
+        )
+
+    for (records, client, write_rate), group in windows.groupby(
+        ["records", "client", "write_rate"]
+    ):
+        group_sorted = group.sort_values("start_s")
+        over_time.plot(
+            group_sorted["start_s"],
+            group_sorted["p95_ms"],
+            label=f"{client} - {records} records @ {write_rate} rows/s",
+        )
+
+    latency.set_title("Query Latency vs. Write Rate")
+    latency.set_xlabel("Target write rate (rows/s)")
+    latency.set_ylabel("Latency (ms)")
+    ingest.set_title("Achieved vs. Target Write Rate")
+    ingest.set_xlabel("Target write rate (rows/s)")
+    ingest.set_ylabel("Achieved write rate (rows/s)")
+    over_time.set_title("p95 Latency over Time")
+    over_time.set_xlabel("Seconds into run")
+    over_time.set_ylabel("p95 latency (ms)")
+    for axis in (latency, ingest, over_time):
+        axis.grid(True)
+        axis.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class BenchmarkOptions:
+    warmup: int = 1  # discarded runs per query before measuring
+    repetitions: int = 5  # measured warm-cache runs per query
+    cold_repetitions: int = 1  # runs per query right after `cold_cache_command`
+    # shell command that empties the caches, e.g. restarting Postgres and dropping the
+    # OS page cache. Without it the cold sample is the first run on a fresh connection,
+    # which only starts with cold plan and catalog caches.
+    cold_cache_command: Optional[str] = None
+    reconnect_timeout_s: float = 60.0
@@ -0,0 +1,119 @@
+import math
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from enum import Enum
+from typing import Dict, Optional
+
+from db_perf.models.workload import WorkloadShape
+
+
+class IngestStrategy(str, Enum):
+    EXECUTEMANY = "executemany"
+    EXECUTE_VALUES = "execute_values"
+    COPY_TEXT = "copy_text"
+    COPY_BINARY = "copy_binary"
+
+
+class EventSource(str, Enum):
+    FACTORY = "factory"  # per-row EventFactory / pydantic path
+    COLUMNAR = "columnar"  # vectorized ColumnarEventFactory
+    SERVER = "server"  # synthesized by Postgres, INSERT ... SELECT generate_series
+
+
+def today() -> datetime:
+    """Midnight of the current day, the default anchor of generated timestamps"""
+    return datetime.combine(date.today(), time.min)
+
+
+@dataclass
+class LoadOptions:
+    strategy: IngestStrategy = IngestStrategy.EXECUTEMANY
+    source: EventSource = EventSource.FACTORY
+    seed: int = 0
+    page_size: int = 1000  # rows per statement for execute_values
+    chunk_size: int = 10_000  # rows generated, encoded and committed together
+    # chunks encoded ahead of the insert, 0 runs the pipeline serially
+    prefetch: int = 2
+    workers: int = 1  # generator processes, each streaming into its own connection
+    # runs, pipelines and time spread, None is one run per event
+    shape: Optional[WorkloadShape] = None
+    # encode factory events with db_perf.encoder, not row by row
+    compiled_encoder: bool = True
+    # keep COPY encoded datasets here across clients and runs
+    cache_dir: Optional[str] = None
+    # generated timestamps are placed from it, shared by every client of a run and
+    # part of dataset cache keys and template names
+    anchor: datetime = field(default_factory=today)
+
+
+@dataclass
+class ChunkStats:
+    """Client side work of loading chunks, summed over chunks and workers"""
+
+    rows: int = 0
+    payload_bytes: int = 0  # encoded bytes sent, estimated for the execute strategies
+    encode_seconds: float = 0.0  # generating and encoding, overlapped with sending
+    send_seconds: float = 0.0  # sending and committing
+
+    def __add__(self, other: "ChunkStats") -> "ChunkStats":
+        return ChunkStats(
+            rows=self.rows + other.rows,
+            payload_bytes=self.payload_bytes + other.payload_bytes,
+            encode_seconds=self.encode_seconds + other.encode_seconds,
+            send_seconds=self.send_seconds + other.send_seconds,
+        )
+
+
+@dataclass
+class LoadReport:
+    rows: int
+    seconds: float
+    workers: int = 1
+    payload_bytes: int = 0
+    encode_seconds: float = 0.0  # summed over workers, see ChunkStats
+    send_seconds: float = 0.0
+    server_seconds: float = math.nan  # statement execution, needs pg_stat_statements
+    wal_bytes: int = 0
+    # growth of the table (partitions included) and of the whole database
+    heap_bytes: int = 0
+    index_bytes: int = 0
+    toast_bytes: int = 0
+    database_bytes: int = 0
+
+    @property
+    def rows_per_s(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.payload_bytes / 2**20 / self.seconds if self.seconds else 0.0
+
+    @property
+    def network_seconds(self) -> float:
+        """Send time not spent executing on the server: round trips, transfer and driver"""
+        return self.send_seconds - self.server_seconds
+
+    @property
+    def write_amplification(self) -> float:
+        """WAL bytes written per payload byte"""
+        return self.wal_bytes / self.payload_bytes if self.payload_bytes else math.nan
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "rows": self.rows,
+            "seconds": self.seconds,
+            "workers": self.workers,
+            "rows_per_s": self.rows_per_s,
+            "mb_per_s": self.mb_per_s,
+            "payload_bytes": self.payload_bytes,
+            "encode_s": self.encode_seconds,
+            "send_s": self.send_seconds,
+            "server_s": self.server_seconds,
+            "network_s": self.network_seconds,
+            "wal_bytes": self.wal_bytes,
+            "write_amplification": self.write_amplification,
+            "heap_bytes": self.heap_bytes,
+            "index_bytes": self.index_bytes,
+            "toast_bytes": self.toast_bytes,
+            "database_bytes": self.database_bytes,
+        }
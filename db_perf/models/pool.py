@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class PoolOptions:
+    min_size: int = 1  # connections opened when the pool is first used
+    max_size: int = 8  # borrowers wait once this many connections are checked out
+    # run `SELECT 1` on every borrowed connection, replacing it when the server went
+    # away, e.g. after the database was dropped or the server restarted
+    health_check: bool = True
+    # raise instead of waiting longer for a free connection
+    borrow_timeout_s: float = 60.0
@@ -1,7 +1,39 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional
+
+BASELINE_VARIANT = "baseline"  # `Query.query` itself
+
+
+@dataclass(frozen=True)
+class QueryParameter:
+    name: str  # `%(name)s` placeholder in `Query.parameterized`
+    pg_type: str  # type the prepared statement declares it as
+    sample: str  # SQL selecting the values it is drawn from in the loaded data
 
 
 @dataclass
 class Query:
     name: str
     query: str
+    weight: float = 1.0  # share of the mix in concurrent load tests, 0 leaves it out
+    # rewrites that must return the same rows as `query`, by variant name
+    variants: Dict[str, str] = field(default_factory=dict)
+    # `query` as the dashboard sends it, with `%(name)s` placeholders for `parameters`
+    parameterized: Optional[str] = None
+    parameters: List[QueryParameter] = field(default_factory=list)
+
+    def variant_names(self) -> List[str]:
+        return [BASELINE_VARIANT, *self.variants]
+
+    def variant(self, name: str) -> "Query":
+        """This query running the SQL of variant `name`"""
+        if name == BASELINE_VARIANT:
+            return self
+        return replace(self, query=self.variants[name], variants={})
+
+    def numbered(self) -> str:
+        """`parameterized` with `$n` placeholders in `parameters` order, for PREPARE"""
+        sql = self.parameterized
+        for number, parameter in enumerate(self.parameters, start=1):
+            sql = sql.replace(f"%({parameter.name})s", f"${number}")
+        return sql.replace("%%", "%")
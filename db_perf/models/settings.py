@@ -0,0 +1,28 @@
+from dataclasses import dataclass, field
+from typing import Dict
+
+
+@dataclass(frozen=True)
+class SettingsProfile:
+    """Session settings (GUCs) queries are benchmarked under, on top of the server's"""
+
+    name: str
+    settings: Dict[str, str] = field(default_factory=dict)  # e.g. {"work_mem": "64MB"}
+
+
+DEFAULT_PROFILE = SettingsProfile("default")
+
+DEFAULT_PROFILES = [
+    DEFAULT_PROFILE,
+    SettingsProfile("work_mem_64mb", {"work_mem": "64MB"}),
+    SettingsProfile("work_mem_256mb", {"work_mem": "256MB"}),
+    SettingsProfile("no_jit", {"jit": "off"}),
+    SettingsProfile("no_parallel", {"max_parallel_workers_per_gather": "0"}),
+    SettingsProfile("parallel_4", {"max_parallel_workers_per_gather": "4"}),
+    SettingsProfile("ssd_costs", {"random_page_cost": "1.1"}),
+    SettingsProfile("no_hashagg", {"enable_hashagg": "off"}),
+    SettingsProfile("no_nestloop", {"enable_nestloop": "off"}),
+    SettingsProfile(
+        "tuned", {"work_mem": "64MB", "jit": "off", "random_page_cost": "1.1"}
+    ),
+]
@@ -0,0 +1,18 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    pg_type: str  # one of: text, text[], jsonb, timestamp, float8, int4, int8
+
+
+@dataclass(frozen=True)
+class Table:
+    name: str
+    columns: Tuple[Column, ...]
+
+    @property
+    def column_names(self) -> List[str]:
+        return [column.name for column in self.columns]
@@ -0,0 +1,68 @@
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from db_perf.stats import mean_confidence_interval_95, percentile, stddev
+
+
+@dataclass
+class TimingSummary:
+    """Execution times of one query in ms, warm samples after warmup plus cold-cache samples"""
+
+    samples: List[float]
+    cold_samples: List[float] = field(default_factory=list)
+    # EXPLAIN (ANALYZE, BUFFERS, SETTINGS) of the last run
+    plan: Optional[List[dict]] = None
+
+    @property
+    def n(self) -> int:
+        return len(self.samples)
+
+    @property
+    def min(self) -> float:
+        return min(self.samples) if self.samples else math.nan
+
+    @property
+    def mean(self) -> float:
+        return sum(self.samples) / self.n if self.samples else math.nan
+
+    @property
+    def median(self) -> float:
+        return percentile(self.samples, 50)
+
+    @property
+    def p95(self) -> float:
+        return percentile(self.samples, 95)
+
+    @property
+    def p99(self) -> float:
+        return percentile(self.samples, 99)
+
+    @property
+    def stddev(self) -> float:
+        return stddev(self.samples)
+
+    @property
+    def ci95(self) -> tuple[float, float]:
+        return mean_confidence_interval_95(self.samples)
+
+    @property
+    def cold(self) -> float:
+        if not self.cold_samples:
+            return math.nan
+        return sum(self.cold_samples) / len(self.cold_samples)
+
+    def to_dict(self) -> Dict[str, float]:
+        ci_low, ci_high = self.ci95
+        return {
+            "n": self.n,
+            "time_ms": self.median,
+            "min_ms": self.min,
+            "mean_ms": self.mean,
+            "p95_ms": self.p95,
+            "p99_ms": self.p99,
+            "stddev_ms": self.stddev,
+            "ci95_low_ms": ci_low,
+            "ci95_high_ms": ci_high,
+            "cold_ms": self.cold,
+        }
@@ -0,0 +1,33 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class WorkloadShape:
+    """
+    How generated events group into runs and pipelines and spread over time.
+
+    Rows are laid out run after run, `events_per_run` rows each. A dataset of
+    `pipelines * runs_per_pipeline * events_per_run` rows holds exactly that many
+    runs, shared by the pipelines with Zipf skewed popularity; larger datasets repeat
+    the allocation with new runs.
+    """
+
+    pipelines: int = 40
+    runs_per_pipeline: int = 50  # on average, the most popular pipelines get more
+    events_per_run: int = 200
+    run_duration: timedelta = timedelta(hours=2)  # mean, each run varies by +-50%
+    months: int = 12  # run starts are spread uniformly over this window
+    zipf_exponent: float = 1.1  # 0 gives every pipeline the same share of runs
+    # end of the window, defaults to LoadOptions.anchor
+    anchor: Optional[datetime] = None
+
+    @property
+    def runs(self) -> int:
+        return self.pipelines * self.runs_per_pipeline
+
+    @property
+    def records(self) -> int:
+        """Dataset size holding every run of the allocation once"""
+        return self.runs * self.events_per_run
@@ -1,40 +1,460 @@
-from typing import Dict
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from db_perf.concurrency import (
+    ConcurrencyOptions,
+    ConcurrencyResult,
+    plot_saturation,
+    run_concurrency_benchmark,
+)
 from db_perf.db_versions.base import BaseClient
+from db_perf.indexes import (
+    IndexAdvisorOptions,
+    IndexSetResult,
+    rank_index_sets,
+    run_index_advisor,
+)
+from db_perf.indexes import to_dataframe as index_dataframe
+from db_perf.ingest_tuner import (
+    IngestTunerOptions,
+    IngestTuningPoint,
+    describe,
+    recommend,
+    run_ingest_tuner,
+)
+from db_perf.ingest_tuner import to_dataframe as tuning_dataframe
+from db_perf.mixed import (
+    MixedWorkloadOptions,
+    MixedWorkloadResult,
+    plot_mixed_workload,
+    run_mixed_benchmark,
+)
+from db_perf.models.load import LoadReport
+from db_perf.models.settings import DEFAULT_PROFILE, SettingsProfile
+from db_perf.models.timing import TimingSummary
+from db_perf.plans import PlanChange, diff_plans, save_plan
+from db_perf.prepared import PreparedOptions, PreparedResult, run_prepared_benchmark
+from db_perf.prepared import to_dataframe as prepared_dataframe
+from db_perf.results import ResultsStore
+from db_perf.variants import VariantResult, run_query_variants
+from db_perf.variants import to_dataframe as variant_dataframe
 
 
 class PerfClient:
 
-    def __init__(self, clients: list[BaseClient], number_of_records: list[int]):
+    def __init__(
+        self,
+        clients: list[BaseClient],
+        number_of_records: list[int],
+        incremental: bool = False,
+        plans_dir: Optional[Path] = Path("plans"),
+        concurrency: Optional[ConcurrencyOptions] = None,
+        mixed: Optional[MixedWorkloadOptions] = None,
+        index_advisor: Optional[IndexAdvisorOptions] = None,
+        profiles: Optional[List[SettingsProfile]] = None,
+        results_store: Optional[ResultsStore] = None,
+        ingest_tuner: Optional[IngestTunerOptions] = None,
+        query_variants: bool = False,
+        prepared: Optional[PreparedOptions] = None,
+    ):
         self.clients = clients
         self.number_of_records = number_of_records
-        self.results: Dict[int, Dict[str, Dict[str, float]]] = (
-            {}
-        )  # number of records:  dict of number of records : benchmark data
+        self.incremental = incremental
+        self.plans_dir = plans_dir
+        self.concurrency = concurrency
+        self.mixed = mixed
+        self.index_advisor = index_advisor
+        self.ingest_tuner = ingest_tuner
+        self.query_variants = query_variants
+        self.prepared = prepared
+        # session settings every query is benchmarked under, the first is the baseline
+        self.profiles = profiles or [DEFAULT_PROFILE]
+        self.results_store = results_store
+        # (client name, profile, query, number of records): EXPLAIN json
+        self.plans: Dict[Tuple[str, str, str, int], List[dict]] = {}
+        # number of records: client name: profile name: query timings
+        self.results: Dict[int, Dict[str, Dict[str, Dict[str, TimingSummary]]]] = {}
+        self.concurrency_results: Dict[int, Dict[str, List[ConcurrencyResult]]] = {}
+        self.mixed_results: Dict[int, Dict[str, List[MixedWorkloadResult]]] = {}
+        self.index_results: Dict[int, Dict[str, List[IndexSetResult]]] = {}
+        self.tuning_results: Dict[int, Dict[str, List[IngestTuningPoint]]] = {}
+        self.variant_results: Dict[int, Dict[str, List[VariantResult]]] = {}
+        self.prepared_results: Dict[int, Dict[str, List[PreparedResult]]] = {}
+        # number of records: client name: load of that tier, absent when restored from a template
+        self.load_reports: Dict[int, Dict[str, LoadReport]] = {}
 
     def run_insert_and_benchmark_client_queries(self, num_records: int):
 
         for client in self.clients:
-            self.results[num_records] = client.run_benchmark(num_records)
+            print(f"Running insert benchmark on {client.name()}")
+            client.setup()
+            try:
+                self.load_client(client, num_records)
+                self.benchmark_client(client, num_records)
+            finally:
+                client.teardown()
+
+    def load_client(
+        self, client: BaseClient, num_records: int, loaded_records: int = 0
+    ):
+        report = client.load_tier(num_records, loaded_records)
+        if report is not None:
+            self.load_reports.setdefault(num_records, {})[client.name()] = report
+
+    def benchmark_client(self, client: BaseClient, num_records: int):
+        """Runs every benchmark phase against a loaded client database"""
+        print(f"benchmarking Queries for {client.name()}")
+        for profile in self.profiles:
+            timings = client.benchmark_queries(profile)
+            self.results.setdefault(num_records, {}).setdefault(client.name(), {})[
+                profile.name
+            ] = timings
+            self.track_plans(num_records, client.name(), profile.name, timings)
+
+        if self.query_variants:
+            print(f"Checking and benchmarking query variants of {client.name()}")
+            self.variant_results.setdefault(num_records, {})[client.name()] = (
+                run_query_variants(client, self.profiles[0])
+            )
+
+        if self.prepared is not None:
+            print(f"Benchmarking prepared statements of {client.name()}")
+            self.prepared_results.setdefault(num_records, {})[client.name()] = (
+                run_prepared_benchmark(client, self.prepared, self.profiles[0])
+            )
+
+        if self.concurrency is not None:
+            self.concurrency_results.setdefault(num_records, {})[client.name()] = (
+                run_concurrency_benchmark(
+                    client.pool, client.queries(), self.concurrency
+                )
+            )
+
+        if self.mixed is not None:
+            self.mixed_results.setdefault(num_records, {})[client.name()] = (
+                run_mixed_benchmark(client, num_records, self.mixed)
+            )
+
+        if self.index_advisor is not None:
+            results = run_index_advisor(client, num_records, self.index_advisor)
+            self.index_results.setdefault(num_records, {})[client.name()] = results
+            print(f"index sets for {client.name()} at {num_records} records:")
+            print(rank_index_sets(results).to_string(index=False))
+
+        if self.ingest_tuner is not None:
+            print(f"Tuning ingest of {client.name()}...")
+            points = run_ingest_tuner(client, num_records, self.ingest_tuner)
+            self.tuning_results.setdefault(num_records, {})[client.name()] = points
+            level = self.ingest_tuner.durability
+            print(
+                f"recommended {level.value} ingest for {client.name()} at "
+                f"{num_records} records: {describe(recommend(points, level))}"
+            )
+
+        self.store_results(client, num_records)
+
+    def store_results(self, client: BaseClient, num_records: int):
+        """Appends everything measured for the client at this tier to the results store"""
+        if self.results_store is None:
+            return
+        frames = {
+            "load": self.load_dataframe(),
+            "query": self.to_dataframe(),
+            "concurrency": self.concurrency_dataframe(),
+            "mixed": self.mixed_dataframe(),
+            "mixed_window": self.mixed_dataframe(windows=True),
+            "index": self.index_dataframe(),
+            "ingest_tuning": self.tuning_dataframe(),
+            "query_variant": self.variant_dataframe(),
+            "prepared": self.prepared_dataframe(),
+        }
+        for kind, df in frames.items():
+            if df.empty:
+                continue
+            tier = df[(df["records"] == num_records) & (df["client"] == client.name())]
+            self.results_store.append(kind, client, tier)
+
+    def track_plans(
+        self,
+        num_records: int,
+        client_name: str,
+        profile: str,
+        queries: Dict[str, TimingSummary],
+    ):
+        """Stores the captured plans and reports changes against the previous tier"""
+        # plans of the default settings keep their unsuffixed name and file
+        suffix = None if profile == DEFAULT_PROFILE.name else profile
+        for query_name, timings in queries.items():
+            if timings.plan is None:
+                continue
+            self.plans[(client_name, profile, query_name, num_records)] = timings.plan
+            if self.plans_dir is not None:
+                save_plan(
+                    self.plans_dir,
+                    client_name,
+                    query_name,
+                    num_records,
+                    timings.plan,
+                    suffix,
+                )
+
+            previous = [
+                records
+                for (client, settings, query, records) in self.plans
+                if client == client_name
+                and settings == profile
+                and query == query_name
+                and records < num_records
+            ]
+            if not previous:
+                continue
+            before = self.plans[(client_name, profile, query_name, max(previous))]
+            label = query_name if suffix is None else f"{query_name} ({suffix})"
+            for change in diff_plans(before, timings.plan):
+                print(
+                    f"plan change for {client_name} {label} "
+                    f"{max(previous)} -> {num_records} records: {change}"
+                )
+
+    def compare_client_plans(
+        self,
+        baseline: str,
+        candidate: str,
+        num_records: int,
+        profile: str = DEFAULT_PROFILE.name,
+    ) -> Dict[str, List[PlanChange]]:
+        """Plan differences per query between two clients at the same record count"""
+        changes = {}
+        for (client, settings, query, records), plan in self.plans.items():
+            if client != baseline or settings != profile or records != num_records:
+                continue
+            other = self.plans.get((candidate, profile, query, records))
+            if other is not None:
+                changes[query] = diff_plans(plan, other)
+        return changes
+
+    def compare_profile_plans(
+        self, client_name: str, baseline: str, candidate: str, num_records: int
+    ) -> Dict[str, List[PlanChange]]:
+        """Plan differences per query of one client between two settings profiles"""
+        changes = {}
+        for (client, settings, query, records), plan in self.plans.items():
+            if client != client_name or settings != baseline or records != num_records:
+                continue
+            other = self.plans.get((client, candidate, query, records))
+            if other is not None:
+                changes[query] = diff_plans(plan, other)
+        return changes
+
+    def run_incremental_client(self, client: BaseClient):
+        """
+        Keeps the client database across tiers: each tier only inserts the rows added
+        since the previous one, then re-analyzes and benchmarks. Rollback runs once at the end.
+        """
+        client.setup()
+        try:
+            total_entries = 0
+            for num_of_records in self.number_of_records:
+                start = total_entries
+                total_entries += num_of_records
+                print(f"inserting {num_of_records} ({total_entries} total)...")
+                self.load_client(client, total_entries, loaded_records=start)
+                print(f"benchmark database at {total_entries}...")
+                self.benchmark_client(client, total_entries)
+        finally:
+            client.teardown()
 
     def to_dataframe(self):
         # Transform to long format
         records = []
         for num_records, clients in self.results.items():
-            for client_name, queries in clients.items():
-                for query_name, time in queries.items():
+            for client_name, profiles in clients.items():
+                for profile, queries in profiles.items():
+                    for query_name, timings in queries.items():
+                        records.append(
+                            {
+                                "records": num_records,
+                                "client": client_name,
+                                "profile": profile,
+                                "query": query_name,
+                                **timings.to_dict(),
+                            }
+                        )
+
+        return pd.DataFrame(records)
+
+    def load_dataframe(self) -> pd.DataFrame:
+        """Ingest metrics of every loaded tier, restored templates have none"""
+        records = []
+        for num_records, clients in self.load_reports.items():
+            for client_name, report in clients.items():
+                records.append(
+                    {"records": num_records, "client": client_name, **report.to_dict()}
+                )
+        return pd.DataFrame(records)
+
+    def profile_dataframe(self) -> pd.DataFrame:
+        """
+        Median latency per tier, client, profile and query, with the speedup over the
+        first profile, i.e. what session settings alone buy
+        """
+        df = self.to_dataframe()
+        if df.empty:
+            return df
+        keys = ["records", "client", "query"]
+        df = df[["records", "client", "profile", "query", "time_ms", "p95_ms"]]
+        baseline = df[df["profile"] == self.profiles[0].name][keys + ["time_ms"]]
+        df = df.merge(baseline.rename(columns={"time_ms": "baseline_ms"}), on=keys)
+        df["speedup"] = df["baseline_ms"] / df["time_ms"]
+        return df
+
+    def report_profiles(self):
+        """Prints the settings profiles of every client and tier, best first"""
+        if len(self.profiles) < 2:
+            return
+        df = self.profile_dataframe()
+        if df.empty:
+            return
+        # geometric mean, so every query weighs the same whatever its absolute time
+        overall = (
+            df.groupby(["records", "client", "profile"], sort=False)["speedup"]
+            .agg(lambda s: math.exp(s.map(math.log).mean()))
+            .reset_index()
+        )
+        for (num_records, client_name), group in overall.groupby(
+            ["records", "client"], sort=False
+        ):
+            print(f"settings profiles for {client_name} at {num_records} records:")
+            for row in group.sort_values("speedup", ascending=False).itertuples():
+                print(f" {row.profile}: {row.speedup:.2f}x vs {self.profiles[0].name}")
+
+    def tradeoff_dataframe(self, baseline: str, candidate: str) -> pd.DataFrame:
+        """
+        Per tier and query, how much faster `candidate` answers than `baseline` next to
+        how much more each inserted row costs it, e.g. for ingest time rollups.
+        """
+        records = []
+        for num_records, clients in self.results.items():
+            if baseline not in clients or candidate not in clients:
+                continue
+            loads = self.load_reports.get(num_records, {})
+            ingest_overhead = float("nan")
+            if baseline in loads and candidate in loads:
+                ingest_overhead = (
+                    loads[baseline].rows_per_s / loads[candidate].rows_per_s - 1
+                )
+            for profile, queries in clients[baseline].items():
+                for query_name, timings in queries.items():
+                    other = clients[candidate].get(profile, {}).get(query_name)
+                    if other is None:
+                        continue
                     records.append(
                         {
                             "records": num_records,
-                            "client": client_name,
+                            "profile": profile,
                             "query": query_name,
-                            "time_ms": time,
+                            "baseline_ms": timings.median,
+                            "candidate_ms": other.median,
+                            "speedup": timings.median / other.median,
+                            # extra time per row, 0.1 = 10%
+                            "ingest_overhead": ingest_overhead,
+                        }
+                    )
+        return pd.DataFrame(records)
+
+    def report_tradeoffs(self):
+        """Prints query speedup against ingest cost of every client relative to the first"""
+        baseline = self.clients[0].name()
+        for client in self.clients[1:]:
+            df = self.tradeoff_dataframe(baseline, client.name())
+            if df.empty:
+                continue
+            print(f"{client.name()} vs {baseline}:")
+            for row in df.itertuples():
+                settings = "" if len(self.profiles) < 2 else f" ({row.profile})"
+                print(
+                    f" {row.records} records {row.query}{settings}: "
+                    f"speedup {row.speedup:.2f}x, "
+                    f"{row.ingest_overhead:+.1%} ingest time per row"
+                )
+
+    def index_dataframe(self) -> pd.DataFrame:
+        """Index advisor results per tier, client, index set and query"""
+        frames = []
+        for num_records, clients in self.index_results.items():
+            for client_name, results in clients.items():
+                df = index_dataframe(results)
+                df.insert(0, "client", client_name)
+                df.insert(0, "records", num_records)
+                frames.append(df)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def tuning_dataframe(self) -> pd.DataFrame:
+        """Ingest tuner operating points per tier and client, ranked by rows/s"""
+        frames = []
+        for num_records, clients in self.tuning_results.items():
+            for client_name, points in clients.items():
+                df = tuning_dataframe(points)
+                df.insert(0, "client", client_name)
+                df.insert(0, "records", num_records)
+                frames.append(df)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def variant_dataframe(self) -> pd.DataFrame:
+        """Query variants per tier and client with their speedup over the baseline SQL"""
+        frames = []
+        for num_records, clients in self.variant_results.items():
+            for client_name, results in clients.items():
+                df = variant_dataframe(results)
+                df.insert(0, "client", client_name)
+                df.insert(0, "records", num_records)
+                frames.append(df)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def prepared_dataframe(self) -> pd.DataFrame:
+        """Parameterized queries per tier, client and plan cache mode"""
+        frames = []
+        for num_records, clients in self.prepared_results.items():
+            for client_name, results in clients.items():
+                df = prepared_dataframe(results, self.prepared.regression_ratio)
+                df.insert(0, "client", client_name)
+                df.insert(0, "records", num_records)
+                frames.append(df)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def concurrency_dataframe(self) -> pd.DataFrame:
+        records = []
+        for num_records, clients in self.concurrency_results.items():
+            for client_name, results in clients.items():
+                for result in results:
+                    records.append(
+                        {
+                            "records": num_records,
+                            "client": client_name,
+                            **result.to_dict(),
                         }
                     )
+        return pd.DataFrame(records)
 
+    def mixed_dataframe(self, windows: bool = False) -> pd.DataFrame:
+        """Mixed workload results per write rate, or per time window with `windows`"""
+        records = []
+        for num_records, clients in self.mixed_results.items():
+            for client_name, results in clients.items():
+                for result in results:
+                    rows = (
+                        [window.to_dict() for window in result.windows]
+                        if windows
+                        else [result.to_dict()]
+                    )
+                    for row in rows:
+                        records.append(
+                            {"records": num_records, "client": client_name, **row}
+                        )
         return pd.DataFrame(records)
 
     def plot(self):
@@ -42,25 +462,50 @@ class PerfClient:
 
         # Plot
         plt.figure(figsize=(10, 6))
-        for (client, query), group in df.groupby(["client", "query"]):
+        for (client, profile, query), group in df.groupby(
+            ["client", "profile", "query"]
+        ):
             group_sorted = group.sort_values("records")
-            plt.plot(
+            if profile != DEFAULT_PROFILE.name:
+                client = f"{client} ({profile})"
+            # median with bars spanning min to p95
+            plt.errorbar(
                 group_sorted["records"],
                 group_sorted["time_ms"],
+                yerr=[
+                    group_sorted["time_ms"] - group_sorted["min_ms"],
+                    group_sorted["p95_ms"] - group_sorted["time_ms"],
+                ],
                 marker="o",
+                capsize=3,
                 label=f"{client} - {query}",
             )
 
         plt.title("Query Performance vs. Number of Records")
         plt.xlabel("Number of Records")
-        plt.ylabel("Time (ms)")
+        plt.ylabel("Median time (ms), bars min to p95")
         plt.grid(True)
         plt.legend()
         plt.tight_layout()
         plt.savefig("db_query_performance_plot.png")
         plt.close()
 
+        if self.concurrency_results:
+            plot_saturation(self.concurrency_dataframe())
+        if self.mixed_results:
+            plot_mixed_workload(
+                self.mixed_dataframe(), self.mixed_dataframe(windows=True)
+            )
+
     def run(self):
+        if self.incremental:
+            for client in self.clients:
+                self.run_incremental_client(client)
+            self.report_tradeoffs()
+            self.report_profiles()
+            self.plot()
+            return
+
         total_entires = 0
 
         for num_of_records in self.number_of_records:
@@ -69,4 +514,6 @@ class PerfClient:
             print(f"benchmark database at {total_entires}...")
             self.run_insert_and_benchmark_client_queries(total_entires)
 
+        self.report_tradeoffs()
+        self.report_profiles()
         self.plot()
@@ -0,0 +1,60 @@
+import queue
+import threading
+from typing import Iterator, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+
+def chunk_bounds(start: int, count: int, chunk_size: int) -> Iterator[Tuple[int, int]]:
+    """Yields (chunk_start, chunk_rows) covering rows [start, start + count)"""
+    end = start + count
+    for chunk_start in range(start, end, chunk_size):
+        yield chunk_start, min(chunk_size, end - chunk_start)
+
+
+def prefetch(items: Iterator[T], depth: int) -> Iterator[T]:
+    """
+    Drains `items` on a background thread, keeping at most `depth` produced items
+    waiting, so producing item N+1 overlaps with the caller consuming item N.
+    """
+    if depth <= 0:
+        yield from items
+        return
+
+    buffer: "queue.Queue" = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+            put((_DONE, None))
+        except BaseException as e:
+            put((_DONE, e))
+
+    producer = threading.Thread(target=produce, name="chunk-producer", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        producer.join()
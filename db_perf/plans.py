@@ -0,0 +1,163 @@
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+SCAN_NODES = {
+    "Seq Scan",
+    "Index Scan",
+    "Index Only Scan",
+    "Bitmap Heap Scan",
+    "Bitmap Index Scan",
+    "Tid Scan",
+}
+
+
+@dataclass
+class PlanChange:
+    kind: str  # scan | hash_spill | hashagg_spill | sort_method
+    target: str  # relation, sort key or node the change applies to
+    before: str
+    after: str
+
+    def __str__(self) -> str:
+        return f"[{self.kind}] {self.target}: {self.before} -> {self.after}"
+
+
+def walk(node: dict) -> Iterator[dict]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk(child)
+
+
+def root_node(explain: List[dict]) -> dict:
+    """Top plan node of an `EXPLAIN (FORMAT JSON)` document"""
+    return explain[0]["Plan"]
+
+
+def _scans(explain: List[dict]) -> Dict[str, Set[str]]:
+    scans: Dict[str, Set[str]] = {}
+    for node in walk(root_node(explain)):
+        if node["Node Type"] in SCAN_NODES and "Relation Name" in node:
+            relation = f"{node['Relation Name']} {node.get('Alias', '')}".strip()
+            scans.setdefault(relation, set()).add(node["Node Type"])
+    return scans
+
+
+def _sorts(explain: List[dict]) -> Dict[str, Tuple[str, str]]:
+    sorts = {}
+    for node in walk(root_node(explain)):
+        if node["Node Type"] == "Sort" and "Sort Method" in node:
+            key = ", ".join(node.get("Sort Key", []))
+            sorts[key] = (node["Sort Method"], node.get("Sort Space Type", ""))
+    return sorts
+
+
+def _hash_batches(explain: List[dict]) -> int:
+    return max(
+        (
+            node.get("Hash Batches", 1)
+            for node in walk(root_node(explain))
+            if node["Node Type"] == "Hash"
+        ),
+        default=1,
+    )
+
+
+def _hashagg_spills(explain: List[dict]) -> Dict[str, int]:
+    spills = {}
+    for node in walk(root_node(explain)):
+        if node["Node Type"] == "Aggregate" and node.get("Strategy") == "Hashed":
+            key = ", ".join(node.get("Group Key", []))
+            spills[key] = node.get("HashAgg Batches", 1)
+    return spills
+
+
+def diff_plans(before: List[dict], after: List[dict]) -> List[PlanChange]:
+    """
+    Flags plan changes that usually explain a latency jump: a relation scanned with a
+    different access method, a hash join or hash aggregate spilling to disk (more than
+    one batch) and a sort changing method, e.g. quicksort to external merge.
+    """
+    changes = []
+
+    before_scans, after_scans = _scans(before), _scans(after)
+    for relation in sorted(before_scans.keys() & after_scans.keys()):
+        if before_scans[relation] != after_scans[relation]:
+            changes.append(
+                PlanChange(
+                    "scan",
+                    relation,
+                    ", ".join(sorted(before_scans[relation])),
+                    ", ".join(sorted(after_scans[relation])),
+                )
+            )
+
+    before_batches, after_batches = _hash_batches(before), _hash_batches(after)
+    if after_batches > 1 and before_batches <= 1:
+        changes.append(
+            PlanChange(
+                "hash_spill",
+                "Hash",
+                f"{before_batches} batch(es)",
+                f"{after_batches} batches",
+            )
+        )
+
+    before_aggs, after_aggs = _hashagg_spills(before), _hashagg_spills(after)
+    for key in sorted(before_aggs.keys() & after_aggs.keys()):
+        if after_aggs[key] > 1 and before_aggs[key] <= 1:
+            changes.append(
+                PlanChange(
+                    "hashagg_spill",
+                    key,
+                    f"{before_aggs[key]} batch(es)",
+                    f"{after_aggs[key]} batches",
+                )
+            )
+
+    before_sorts, after_sorts = _sorts(before), _sorts(after)
+    for key in sorted(before_sorts.keys() & after_sorts.keys()):
+        if before_sorts[key] != after_sorts[key]:
+            changes.append(
+                PlanChange(
+                    "sort_method",
+                    key,
+                    " / ".join(filter(None, before_sorts[key])),
+                    " / ".join(filter(None, after_sorts[key])),
+                )
+            )
+
+    return changes
+
+
+def plan_path(
+    directory: Path,
+    client: str,
+    query: str,
+    records: int,
+    profile: Optional[str] = None,
+) -> Path:
+    name = f"{records}.json" if profile is None else f"{records}_{profile}.json"
+    return Path(directory) / client / query / name
+
+
+def save_plan(
+    directory: Path,
+    client: str,
+    query: str,
+    records: int,
+    plan: List[dict],
+    profile: Optional[str] = None,
+):
+    path = plan_path(directory, client, query, records, profile)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(plan, indent=2))
+
+
+def load_plan(path: Path) -> List[dict]:
+    return json.loads(Path(path).read_text())
+
+
+def diff_plan_files(before: Path, after: Path) -> List[PlanChange]:
+    return diff_plans(load_plan(before), load_plan(after))
@@ -0,0 +1,127 @@
+"""
+Client connection pools. A pool is emptied whenever its database is dropped, cloned
+or frozen as a template, and the concurrency and mixed benchmarks grow it to their
+number of sessions.
+"""
+
+import threading
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Iterator, Optional
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, connection
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+from db_perf.models.pool import PoolOptions
+
+
+def _alive(conn: connection) -> bool:
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        cursor.close()
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+class ConnectionPool:
+    """
+    Thread safe pool of connections to one database, opened on first use so it can
+    be created before the database exists. Borrowed connections are health checked,
+    and handed back without an open transaction and with autocommit off.
+    """
+
+    def __init__(self, database_url: str, options: Optional[PoolOptions] = None):
+        self.database_url = database_url
+        self.options = options or PoolOptions()
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadedConnectionPool] = None
+        # psycopg2 raises once `maxconn` connections are out, borrowers wait here instead
+        self._slots = threading.BoundedSemaphore(self.options.max_size)
+
+    def __getstate__(self):
+        # pools travel with their client to load workers, which open their own
+        return {"database_url": self.database_url, "options": self.options}
+
+    def __setstate__(self, state):
+        self.__init__(state["database_url"], state["options"])
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        with self._lock:
+            if self._pool is None:
+                try:
+                    self._pool = ThreadedConnectionPool(
+                        min(self.options.min_size, self.options.max_size),
+                        self.options.max_size,
+                        self.database_url,
+                    )
+                except Exception as e:
+                    print(f"Error connecting to database: {e}")
+                    raise e
+            return self._pool
+
+    def _checkout(self, pool: ThreadedConnectionPool) -> connection:
+        # after a database reset every idle connection is dead, the last try opens a new one
+        for _ in range(self.options.max_size + 1):
+            conn = pool.getconn()
+            if not conn.closed and (not self.options.health_check or _alive(conn)):
+                return conn
+            pool.putconn(conn, close=True)
+        raise PoolError("could not get a live connection")
+
+    def _checkin(self, pool: ThreadedConnectionPool, conn: connection):
+        broken = bool(conn.closed)
+        if not broken:
+            try:
+                if conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                conn.autocommit = False
+            except psycopg2.Error:
+                broken = True
+        if pool.closed:  # reset while borrowed
+            conn.close()
+        else:
+            pool.putconn(conn, close=broken)
+
+    @contextmanager
+    def connection(self) -> Iterator[connection]:
+        """Borrows a live connection, waiting for one while `max_size` are checked out"""
+        slots = self._slots
+        if not slots.acquire(timeout=self.options.borrow_timeout_s):
+            raise PoolError(
+                f"no free connection after {self.options.borrow_timeout_s}s, "
+                f"{self.options.max_size} checked out"
+            )
+        try:
+            pool = self._get_pool()
+            conn = self._checkout(pool)
+            try:
+                yield conn
+            finally:
+                self._checkin(pool, conn)
+        finally:
+            slots.release()
+
+    def ensure_capacity(self, size: int):
+        """Grows the pool to at least `size` connections, call it between phases"""
+        if size <= self.options.max_size:
+            return
+        with self._lock:
+            self.options = replace(self.options, max_size=size)
+            self._slots = threading.BoundedSemaphore(size)
+            if self._pool is not None:
+                self._pool.maxconn = size
+
+    def reset(self):
+        """
+        Closes every connection, borrowed ones included. The next borrow opens new
+        ones, so call it before the database is dropped or restored.
+        """
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None and not pool.closed:
+            pool.closeall()
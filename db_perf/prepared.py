@@ -0,0 +1,235 @@
+"""
+Server-side prepared statements under each `plan_cache_mode`. Generic and custom plan
+counts come from `pg_prepared_statements`, Postgres 14 and later: they stay empty on
+the compose file's `postgres:13` image.
+"""
+
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from psycopg2.extensions import connection
+
+from db_perf.db_versions.base import BaseClient
+from db_perf.models.query import Query
+from db_perf.models.settings import SettingsProfile
+from db_perf.models.timing import TimingSummary
+
+UNPREPARED = "unprepared"  # literal values, parsed and planned on every execution
+PLAN_CACHE_MODES = ["auto", "force_custom_plan", "force_generic_plan"]
+GENERIC_MODES = ("auto", "force_generic_plan")  # modes that may run a generic plan
+
+
+@dataclass
+class PreparedOptions:
+    modes: List[str] = field(default_factory=lambda: [UNPREPARED, *PLAN_CACHE_MODES])
+    # per query and mode, the same parameter draws in each. `auto` custom plans the
+    # first five executions before it compares them with a generic plan
+    executions: int = 20
+    seed: int = 0
+    regression_ratio: float = 1.2  # slower than custom plans by this is a regression
+
+
+@dataclass
+class PreparedResult:
+    query: str
+    mode: str
+    planning: TimingSummary  # ms per execution, EXPLAIN ANALYZE "Planning Time"
+    execution: TimingSummary
+    generic_plans: Optional[int] = None  # pg_prepared_statements counters, Postgres 14+
+    custom_plans: Optional[int] = None
+
+    @property
+    def total(self) -> TimingSummary:
+        samples = [p + e for p, e in zip(self.planning.samples, self.execution.samples)]
+        return TimingSummary(samples=samples)
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = self.total
+        return {
+            "query": self.query,
+            "mode": self.mode,
+            "executions": total.n,
+            "plan_ms": self.planning.median,
+            "exec_ms": self.execution.median,
+            "total_ms": total.median,
+            "total_mean_ms": total.mean,
+            "p95_ms": total.p95,
+            "generic_plans": self.generic_plans,
+            "custom_plans": self.custom_plans,
+        }
+
+
+class ParameterSampler:
+    """Draws parameter values of a query from the values found in the loaded data"""
+
+    def __init__(self, query: Query, candidates: Dict[str, List[Any]], seed: int = 0):
+        for parameter in query.parameters:
+            if not candidates.get(parameter.name):
+                raise ValueError(
+                    f"{query.name}: no values of parameter {parameter.name} in the data"
+                )
+        self.query = query
+        self.candidates = candidates
+        self.seed = seed
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def from_data(
+        cls, conn: connection, query: Query, seed: int = 0
+    ) -> "ParameterSampler":
+        cur = conn.cursor()
+        candidates = {}
+        for parameter in query.parameters:
+            cur.execute(parameter.sample)
+            values = [row[0] for row in cur.fetchall() if row[0] is not None]
+            candidates[parameter.name] = sorted(values, key=str)  # stable across runs
+        conn.commit()
+        cur.close()
+        return cls(query, candidates, seed)
+
+    def reset(self):
+        """Starts the same sequence of draws again"""
+        self._rng = random.Random(self.seed)
+
+    def draw(self) -> List[Any]:
+        """Values in `query.parameters` order"""
+        return [
+            self._rng.choice(self.candidates[parameter.name])
+            for parameter in self.query.parameters
+        ]
+
+
+def _statement_name(query: Query) -> str:
+    return f"bench_{query.name}"
+
+
+def _explain(cur, sql: str, values: Any) -> dict:
+    cur.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", values)
+    plan = cur.fetchone()[0][0]
+    cur.connection.commit()  # prepared statements outlive the transaction
+    return plan
+
+
+def _plan_counts(cur, name: str) -> tuple:
+    if cur.connection.server_version < 140000:
+        return None, None
+    cur.execute(
+        "SELECT generic_plans, custom_plans FROM pg_prepared_statements "
+        "WHERE name = %s",
+        (name,),
+    )
+    return cur.fetchone()
+
+
+def measure_mode(
+    client: BaseClient,
+    query: Query,
+    sampler: ParameterSampler,
+    mode: str,
+    options: PreparedOptions,
+    profile: Optional[SettingsProfile] = None,
+) -> PreparedResult:
+    """
+    Runs `options.executions` draws of the query's parameters, as literal SQL for
+    UNPREPARED or else through one PREPAREd statement under `plan_cache_mode`
+    """
+    settings = dict(profile.settings) if profile is not None else {}
+    if mode != UNPREPARED:
+        settings["plan_cache_mode"] = mode
+    planning, execution = [], []
+    counts = (None, None)
+    name = _statement_name(query)
+    sampler.reset()
+    session = SettingsProfile(mode, settings)
+    with client.pool.connection() as conn, client._session_settings(conn, session):
+        cur = conn.cursor()
+        prepared = False
+        try:
+            if mode != UNPREPARED:
+                types = ", ".join(parameter.pg_type for parameter in query.parameters)
+                cur.execute(f"PREPARE {name} ({types}) AS {query.numbered()}")
+                prepared = True
+                placeholders = ", ".join(["%s"] * len(query.parameters))
+            for _ in range(options.executions):
+                values = sampler.draw()
+                if mode == UNPREPARED:
+                    named = {p.name: v for p, v in zip(query.parameters, values)}
+                    plan = _explain(cur, query.parameterized, named)
+                else:
+                    plan = _explain(cur, f"EXECUTE {name} ({placeholders})", values)
+                planning.append(plan.get("Planning Time", 0.0))
+                execution.append(plan["Execution Time"])
+            if mode != UNPREPARED:
+                counts = _plan_counts(cur, name)
+        finally:
+            conn.rollback()
+            # a failed PREPARE left nothing to deallocate
+            if prepared and not conn.closed:
+                cur.execute(f"DEALLOCATE {name}")
+                conn.commit()
+            cur.close()
+    return PreparedResult(
+        query=query.name,
+        mode=mode,
+        planning=TimingSummary(samples=planning),
+        execution=TimingSummary(samples=execution),
+        generic_plans=counts[0],
+        custom_plans=counts[1],
+    )
+
+
+def run_prepared_benchmark(
+    client: BaseClient,
+    options: PreparedOptions,
+    profile: Optional[SettingsProfile] = None,
+) -> List[PreparedResult]:
+    """
+    Benchmarks every parameterized query of the client under each mode with the same
+    parameter draws, sampled from the loaded data
+    """
+    results = []
+    for query in client.queries():
+        if query.parameterized is None:
+            continue
+        with client.pool.connection() as conn:
+            sampler = ParameterSampler.from_data(conn, query, options.seed)
+        for mode in options.modes:
+            result = measure_mode(client, query, sampler, mode, options, profile)
+            plans = ""
+            if result.generic_plans is not None:
+                plans = (
+                    f", {result.generic_plans} generic / "
+                    f"{result.custom_plans} custom plans"
+                )
+            print(
+                f" {query.name} {mode}: median {result.total.median:.2f}ms "
+                f"(planning {result.planning.median:.2f}ms){plans}"
+            )
+            results.append(result)
+    return results
+
+
+def to_dataframe(
+    results: List[PreparedResult], regression_ratio: float = 1.2
+) -> pd.DataFrame:
+    """
+    One row per query and mode with its speedup over unprepared execution and, for
+    modes running generic plans, whether their mean time is `regression_ratio` times
+    that of force_custom_plan or more
+    """
+    df = pd.DataFrame([result.to_dict() for result in results])
+    if df.empty:
+        return df
+    references = (("unprepared_ms", UNPREPARED), ("custom_ms", "force_custom_plan"))
+    for column, mode in references:
+        reference = df[df["mode"] == mode][["query", "total_mean_ms"]]
+        df = df.merge(
+            reference.rename(columns={"total_mean_ms": column}), on="query", how="left"
+        )
+    df["speedup"] = df["unprepared_ms"] / df["total_mean_ms"]
+    df["generic_regression"] = df["mode"].isin(GENERIC_MODES) & (
+        df["total_mean_ms"] >= df["custom_ms"] * regression_ratio
+    )
+    return df.drop(columns=["unprepared_ms", "custom_ms"])
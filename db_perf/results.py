@@ -0,0 +1,249 @@
+"""
+Benchmark history. Every run records its timestamp, git commit, Postgres version and
+non-default settings, host CPU and memory, and every measurement the client's seed,
+event source, ingest strategy and workload shape, so runs compare across changes.
+"""
+
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import uuid
+from contextlib import closing
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from db_perf.db_versions.base import BaseClient
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    git_commit TEXT,
+    git_dirty INTEGER,
+    postgres_version TEXT,
+    postgres_settings TEXT,
+    host TEXT,
+    cpu TEXT,
+    cpu_count INTEGER,
+    memory_bytes INTEGER
+);
+CREATE TABLE IF NOT EXISTS measurements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL REFERENCES runs (run_id),
+    recorded_at TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    records INTEGER NOT NULL,
+    client TEXT NOT NULL,
+    seed INTEGER,
+    source TEXT,
+    strategy TEXT,
+    shape TEXT,
+    metrics TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS measurements_kind_client
+    ON measurements (kind, client, records);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class RunMetadata:
+    """Where and on what a benchmark run was measured"""
+
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    started_at: str = field(default_factory=_now)
+    git_commit: Optional[str] = None
+    git_dirty: Optional[bool] = None
+    postgres_version: Optional[str] = None
+    # settings not at their built-in default, e.g. from postgresql.conf or the command line
+    postgres_settings: Dict[str, str] = field(default_factory=dict)
+    host: str = field(default_factory=platform.node)
+    cpu: str = ""
+    cpu_count: Optional[int] = field(default_factory=os.cpu_count)
+    memory_bytes: Optional[int] = None
+
+
+def git_revision(directory: Path = REPO_DIR) -> Tuple[Optional[str], Optional[bool]]:
+    """HEAD commit of the checkout and whether it has uncommitted changes"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=directory,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=directory,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def _memory_bytes() -> Optional[int]:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def collect_metadata(client: BaseClient) -> RunMetadata:
+    """Describes the checkout, the host and the server the client benchmarks against"""
+    commit, dirty = git_revision()
+    metadata = RunMetadata(
+        git_commit=commit,
+        git_dirty=dirty,
+        cpu=_cpu_model(),
+        memory_bytes=_memory_bytes(),
+    )
+    with client.pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SHOW server_version")
+        metadata.postgres_version = cur.fetchone()[0]
+        cur.execute("""
+            SELECT name, setting || COALESCE(unit, '')
+            FROM pg_settings
+            WHERE source NOT IN ('default', 'override', 'client', 'session')
+            ORDER BY name
+            """)
+        metadata.postgres_settings = dict(cur.fetchall())
+        conn.commit()
+        cur.close()
+    return metadata
+
+
+def _dataset(client: BaseClient) -> Dict[str, Optional[str]]:
+    options = client.load_options
+    shape = None
+    if options.shape is not None:
+        shape = json.dumps(asdict(options.shape), default=str, sort_keys=True)
+    return {
+        "seed": options.seed,
+        "source": options.source.value,
+        "strategy": options.strategy.value,
+        "shape": shape,
+    }
+
+
+class ResultsStore:
+    """
+    Append-only SQLite file of benchmark measurements. Every run adds one `runs` row
+    with its metadata and one `measurements` row per measured value set, whose
+    metrics are kept as JSON so every benchmark phase shares the table.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.run: Optional[RunMetadata] = None
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+            db.commit()
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.path))
+
+    def start_run(self, metadata: RunMetadata):
+        self.run = metadata
+        row = asdict(metadata)
+        row["postgres_settings"] = json.dumps(row["postgres_settings"], sort_keys=True)
+        columns = ", ".join(row)
+        with self._connect() as db:
+            db.execute(
+                f"INSERT INTO runs ({columns}) VALUES ({', '.join('?' * len(row))})",
+                list(row.values()),
+            )
+            db.commit()
+
+    def append(self, kind: str, client: BaseClient, df: pd.DataFrame):
+        """
+        Stores every row of a `PerfClient` dataframe of `client` as a measurement.
+        `records` and `client` become columns, everything else its metrics.
+        """
+        if self.run is None:
+            self.start_run(collect_metadata(client))
+        if df.empty:
+            return
+        dataset = _dataset(client)
+        recorded_at = _now()
+        rows = []
+        for row in df.to_dict(orient="records"):
+            records = int(row.pop("records"))
+            row.pop("client", None)
+            rows.append(
+                (
+                    self.run.run_id,
+                    recorded_at,
+                    kind,
+                    records,
+                    client.name(),
+                    dataset["seed"],
+                    dataset["source"],
+                    dataset["strategy"],
+                    dataset["shape"],
+                    json.dumps(row, default=str),
+                )
+            )
+        with self._connect() as db:
+            db.executemany(
+                """
+                INSERT INTO measurements (
+                    run_id, recorded_at, kind, records, client,
+                    seed, source, strategy, shape, metrics
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            db.commit()
+
+
+def load_results(path: Path, kind: Optional[str] = None) -> pd.DataFrame:
+    """
+    Reads stored measurements back, one row per measurement with its metrics as
+    columns next to the metadata of its run, oldest first. Pass `kind` (query, load,
+    concurrency, mixed, mixed_window, index, ingest_tuning, query_variant, prepared)
+    to get a single phase.
+    """
+    query = """
+        SELECT m.run_id, m.recorded_at, m.kind, m.records, m.client,
+               m.seed, m.source, m.strategy, m.shape, m.metrics,
+               r.started_at, r.git_commit, r.git_dirty, r.postgres_version,
+               r.postgres_settings, r.host, r.cpu, r.cpu_count, r.memory_bytes
+        FROM measurements m
+        JOIN runs r USING (run_id)
+    """
+    params: Tuple = ()
+    if kind is not None:
+        query += " WHERE m.kind = ?"
+        params = (kind,)
+    query += " ORDER BY m.id"
+    with closing(sqlite3.connect(path)) as db:
+        df = pd.read_sql_query(query, db, params=params)
+    metrics = pd.DataFrame([json.loads(m) for m in df.pop("metrics")], index=df.index)
+    return pd.concat([df, metrics], axis=1)
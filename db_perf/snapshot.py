@@ -0,0 +1,150 @@
+"""
+Postgres templates of migrated client databases, and with TemplateMode.DATASET of
+every loaded tier. Clients tag their templates with a hash of their migration files,
+contents included, and for datasets of the workload shape and timestamp anchor, so
+edited migrations or a new anchor day build new templates instead of reusing stale
+ones. Templates outlive runs, drop them with `DROP DATABASE` when no longer needed.
+"""
+
+import hashlib
+import re
+from enum import Enum
+from urllib.parse import urlparse, urlunparse
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extensions import connection
+
+MAX_IDENTIFIER_LENGTH = 63
+
+
+class TemplateMode(str, Enum):
+    NONE = "none"  # migrate with sqlx and reload every dataset
+    SCHEMA = "schema"  # clone the migrated, empty database
+    DATASET = "dataset"  # also freeze every loaded tier and reuse it on later runs
+
+
+def with_database(database_url: str, database: str) -> str:
+    return urlunparse(urlparse(database_url)._replace(path=f"/{database}"))
+
+
+def database_name(database_url: str) -> str:
+    return urlparse(database_url).path.lstrip("/")
+
+
+class DatabaseSnapshot:
+    """
+    Freezes a database as a Postgres template and restores it with
+    `CREATE DATABASE ... TEMPLATE`, a file-level copy done by the server.
+    Statements run from the maintenance database since the target is dropped.
+    """
+
+    def __init__(self, database_url: str, maintenance_database: str = "postgres"):
+        self.database_url = database_url
+        self.database = database_name(database_url)
+        self.admin_url = with_database(database_url, maintenance_database)
+
+    def _admin(self) -> connection:
+        conn = psycopg2.connect(self.admin_url)
+        conn.autocommit = True  # CREATE/DROP DATABASE cannot run in a transaction
+        return conn
+
+    def template_name(self, tag: str) -> str:
+        name = re.sub(r"[^a-z0-9_]", "_", f"{self.database}_tpl_{tag}".lower())
+        if len(name) > MAX_IDENTIFIER_LENGTH:
+            digest = hashlib.sha1(name.encode()).hexdigest()[:12]
+            name = f"{name[:MAX_IDENTIFIER_LENGTH - 13]}_{digest}"
+        return name
+
+    def exists(self, tag: str) -> bool:
+        conn = self._admin()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT 1 FROM pg_database WHERE datname = %s",
+                (self.template_name(tag),),
+            )
+            return cur.fetchone() is not None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _disconnect(cur, database: str):
+        cur.execute(
+            "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+            "WHERE datname = %s AND pid <> pg_backend_pid()",
+            (database,),
+        )
+
+    @staticmethod
+    def _drop_template(cur, template: str):
+        cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (template,))
+        if cur.fetchone() is None:
+            return
+        cur.execute(
+            sql.SQL("ALTER DATABASE {} IS_TEMPLATE false").format(
+                sql.Identifier(template)
+            )
+        )
+        cur.execute(
+            sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)").format(
+                sql.Identifier(template)
+            )
+        )
+
+    def freeze(self, tag: str):
+        """Copies the current database into a template, the database must be idle"""
+        template = self.template_name(tag)
+        print(f"Freezing {self.database} as template {template}...")
+        conn = self._admin()
+        try:
+            cur = conn.cursor()
+            self._drop_template(cur, template)
+            self._disconnect(cur, self.database)
+            cur.execute(
+                sql.SQL("CREATE DATABASE {} TEMPLATE {}").format(
+                    sql.Identifier(template), sql.Identifier(self.database)
+                )
+            )
+            cur.execute(
+                sql.SQL(
+                    "ALTER DATABASE {} IS_TEMPLATE true ALLOW_CONNECTIONS false"
+                ).format(sql.Identifier(template))
+            )
+        finally:
+            conn.close()
+
+    def restore(self, tag: str):
+        """Replaces the database with a clone of the template"""
+        template = self.template_name(tag)
+        print(f"Restoring {self.database} from template {template}...")
+        self._recreate(sql.Identifier(template))
+
+    def reset(self):
+        """Replaces the database with an empty one"""
+        print(f"Recreating {self.database}...")
+        self._recreate(sql.Identifier("template0"))
+
+    def _recreate(self, template: sql.Identifier):
+        conn = self._admin()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)").format(
+                    sql.Identifier(self.database)
+                )
+            )
+            cur.execute(
+                sql.SQL("CREATE DATABASE {} TEMPLATE {}").format(
+                    sql.Identifier(self.database), template
+                )
+            )
+        finally:
+            conn.close()
+
+    def drop(self, tag: str):
+        conn = self._admin()
+        try:
+            self._drop_template(conn.cursor(), self.template_name(tag))
+        finally:
+            conn.close()
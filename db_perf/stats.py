@@ -0,0 +1,42 @@
+import math
+from typing import Sequence
+
+import numpy as np
+
+# two-sided 95% Student t critical values by degrees of freedom
+_T_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]  # fmt: skip
+_Z_95 = 1.96
+
+
+def t_critical_95(degrees_of_freedom: int) -> float:
+    if degrees_of_freedom < 1:
+        return math.nan
+    if degrees_of_freedom <= len(_T_95):
+        return _T_95[degrees_of_freedom - 1]
+    return _Z_95
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    if not samples:
+        return math.nan
+    return float(np.percentile(samples, q))
+
+
+def stddev(samples: Sequence[float]) -> float:
+    if len(samples) < 2:
+        return 0.0
+    return float(np.std(samples, ddof=1))
+
+
+def mean_confidence_interval_95(samples: Sequence[float]) -> tuple[float, float]:
+    if not samples:
+        return math.nan, math.nan
+    mean = float(np.mean(samples))
+    if len(samples) < 2:
+        return mean, mean
+    margin = t_critical_95(len(samples) - 1) * stddev(samples) / math.sqrt(len(samples))
+    return mean - margin, mean + margin
@@ -0,0 +1,202 @@
+import time
+from dataclasses import replace
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from db_perf.db_versions.base import BaseClient
+from db_perf.ingest import prepare_rows, send_rows
+from db_perf.models.load import IngestStrategy
+from db_perf.models.table import Table
+from db_perf.pipeline import chunk_bounds
+
+NUMERIC_TYPES = ("float8", "int4", "int8")
+MAX_CATEGORIES = 32  # text columns with at most this many values report each one
+SKIPPED_COLUMNS = ("id",)
+
+
+def _staging(client: BaseClient, suffix: str) -> Table:
+    return replace(client._get_table(), name=f"{client._get_table().name}_{suffix}")
+
+
+def _create(client: BaseClient, tables: List[Table]):
+    with client.pool.connection() as conn:
+        cur = conn.cursor()
+        for table in tables:
+            cur.execute(f"DROP TABLE IF EXISTS {table.name}")
+            cur.execute(
+                f"CREATE TABLE {table.name} "
+                f"(LIKE {client._get_table().name} INCLUDING DEFAULTS)"
+            )
+        conn.commit()
+        cur.close()
+
+
+def _drop(client: BaseClient, tables: List[Table]):
+    with client.pool.connection() as conn:
+        cur = conn.cursor()
+        for table in tables:
+            cur.execute(f"DROP TABLE IF EXISTS {table.name}")
+        conn.commit()
+        cur.close()
+
+
+def _fill_from_client(client: BaseClient, table: Table, rows: int) -> float:
+    """Seconds to generate, encode and COPY `rows` rows client side"""
+    chunk_size = client.load_options.chunk_size
+    with client.pool.connection() as conn:
+        cur = conn.cursor()
+        started = time.perf_counter()
+        for start, count in chunk_bounds(0, rows, chunk_size):
+            payload = prepare_rows(
+                table, client.generate_rows(start, count), IngestStrategy.COPY_BINARY
+            )
+            send_rows(cur, table, payload, IngestStrategy.COPY_BINARY)
+            conn.commit()
+        seconds = time.perf_counter() - started
+        cur.close()
+    return seconds
+
+
+def _fill_from_server(client: BaseClient, table: Table, rows: int) -> float:
+    """Seconds to synthesize `rows` rows with `INSERT ... SELECT generate_series`"""
+    synthesizer = client._get_synthesizer()
+    fields = client._event_fields()
+    with client.pool.connection() as conn:
+        cur = conn.cursor()
+        started = time.perf_counter()
+        for start, count in chunk_bounds(0, rows, client.load_options.chunk_size):
+            chunk = synthesizer.chunk(table, fields, start, count)
+            cur.execute(chunk.sql, chunk.params)
+            conn.commit()
+        seconds = time.perf_counter() - started
+        cur.close()
+    return seconds
+
+
+def _profile_sql(table: Table) -> List[Tuple[str, str]]:
+    """(metric, aggregate expression) of the distribution of every column"""
+    metrics = [("rows", "count(*)")]
+    for column in table.columns:
+        name, pg_type = column.name, column.pg_type
+        if name in SKIPPED_COLUMNS:
+            continue
+        if pg_type in NUMERIC_TYPES:
+            for aggregate in ("avg", "stddev", "min", "max"):
+                metrics.append((f"{name}.{aggregate}", f"{aggregate}({name})::float8"))
+        elif pg_type == "timestamp":
+            span = f"extract(epoch FROM max({name}) - min({name})) / 3600"
+            metrics.append((f"{name}.span_hours", span))
+        elif pg_type == "text":
+            metrics.append(
+                (f"{name}.distinct_ratio", f"count(DISTINCT {name})::float8 / count(*)")
+            )
+        elif pg_type == "text[]":
+            metrics.append((f"{name}.avg_length", f"avg(cardinality({name}))::float8"))
+        if pg_type in ("jsonb", "text", "text[]"):
+            size, nulls = f"pg_column_size({name})", f"({name} IS NULL)::int"
+            metrics.append((f"{name}.avg_bytes", f"avg({size})::float8"))
+            metrics.append((f"{name}.null_ratio", f"avg({nulls})::float8"))
+    return metrics
+
+
+def _frequencies(cur, table: Table) -> Dict[str, float]:
+    """
+    Share of rows per value of low cardinality text columns, per element of text
+    arrays and per key path (two levels deep) of jsonb documents
+    """
+    shares: Dict[str, float] = {}
+    for column in table.columns:
+        name, pg_type = column.name, column.pg_type
+        if pg_type == "text":
+            cur.execute(f"""
+                SELECT {name}, count(*)::float8 / sum(count(*)) OVER ()
+                FROM {table.name} GROUP BY {name}
+                LIMIT {MAX_CATEGORIES + 1}
+                """)
+            values = cur.fetchall()
+            if len(values) <= MAX_CATEGORIES:
+                shares.update({f"{name}={value}": share for value, share in values})
+        elif pg_type == "text[]":
+            cur.execute(f"""
+                SELECT e, count(*)::float8 / (SELECT count(*) FROM {table.name})
+                FROM {table.name}, unnest({name}) e GROUP BY e
+                LIMIT {MAX_CATEGORIES + 1}
+                """)
+            values = cur.fetchall()
+            if len(values) <= MAX_CATEGORIES:
+                shares.update({f"{name}[]={value}": share for value, share in values})
+        elif pg_type == "jsonb":
+            cur.execute(f"""
+                WITH top AS (
+                  SELECT k.key, k.value
+                  FROM {table.name} t, jsonb_each(CASE jsonb_typeof(t.{name})
+                    WHEN 'object' THEN t.{name} ELSE '{{}}' END) k
+                )
+                SELECT path, count(*)::float8 / (SELECT count(*) FROM {table.name})
+                FROM (
+                  SELECT key AS path FROM top
+                  UNION ALL
+                  SELECT top.key || '.' || sub.key
+                  FROM top, jsonb_object_keys(CASE jsonb_typeof(top.value)
+                    WHEN 'object' THEN top.value ELSE '{{}}' END) sub(key)
+                ) paths
+                GROUP BY path
+                """)
+            shares.update({f"{name}.{path}": share for path, share in cur.fetchall()})
+    return shares
+
+
+def profile(client: BaseClient, table: Table) -> Dict[str, float]:
+    """Distribution metrics of the rows of `table`, which has the client's columns"""
+    metrics = _profile_sql(table)
+    with client.pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT {', '.join(sql for _, sql in metrics)} FROM {table.name}")
+        values = dict(zip([metric for metric, _ in metrics], cur.fetchone()))
+        values.update(_frequencies(cur, table))
+        conn.commit()
+        cur.close()
+    return {name: None if v is None else float(v) for name, v in values.items()}
+
+
+def compare_with_client(client: BaseClient, rows: int = 20_000) -> pd.DataFrame:
+    """
+    Fills two staging copies of the client table with the same `rows` rows, one
+    generated and COPY loaded client side (`generate_rows`), one synthesized by the
+    server, and compares their rows/s and the distribution of every column: one row
+    per metric with both values and their difference, values missing on one side
+    (e.g. a category never drawn) are 0 shares. Staging tables are dropped.
+    """
+    if client._event_fields() is None:
+        raise ValueError(f"{type(client).__name__} has no event fields to synthesize")
+    generated = _staging(client, "generated")
+    synthesized = _staging(client, "synthesized")
+    _create(client, [generated, synthesized])
+    try:
+        client_seconds = _fill_from_client(client, generated, rows)
+        server_seconds = _fill_from_server(client, synthesized, rows)
+        client_profile = profile(client, generated)
+        server_profile = profile(client, synthesized)
+    finally:
+        _drop(client, [generated, synthesized])
+
+    results = [
+        {
+            "metric": "rows_per_s",
+            "client": rows / client_seconds,
+            "server": rows / server_seconds,
+        }
+    ]
+    # only shares can be missing on one side, both profile the same columns
+    for metric in dict.fromkeys([*client_profile, *server_profile]):
+        results.append(
+            {
+                "metric": metric,
+                "client": client_profile.get(metric, 0.0),
+                "server": server_profile.get(metric, 0.0),
+            }
+        )
+    df = pd.DataFrame(results)
+    df["difference"] = df["server"] - df["client"]
+    return df
@@ -0,0 +1,133 @@
+"""
+Rewritten SQL of a query, e.g. v1 aggregating the 6 months duration per run and month
+instead of windowing every event. Variants are only benchmarked once an ordered
+checksum of their rows, numbers rounded, matches the baseline's.
+"""
+
+import hashlib
+import math
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from db_perf.db_versions.base import BaseClient
+from db_perf.models.query import BASELINE_VARIANT, Query
+from db_perf.models.settings import SettingsProfile
+from db_perf.models.timing import TimingSummary
+
+# significant digits numbers are compared at, rewrites may sum floats in another order
+CHECKSUM_DIGITS = 10
+
+
+@dataclass
+class VariantResult:
+    query: str
+    variant: str
+    rows: int
+    checksum: str
+    equivalent: bool  # same rows in the same order as the baseline
+    timings: Optional[TimingSummary] = None  # only equivalent variants are benchmarked
+    baseline_ms: float = math.nan
+
+    @property
+    def speedup(self) -> float:
+        if self.timings is None or not self.timings.median:
+            return math.nan
+        return self.baseline_ms / self.timings.median
+
+    def to_dict(self) -> Dict[str, Any]:
+        timings = self.timings.to_dict() if self.timings is not None else {}
+        return {
+            "query": self.query,
+            "variant": self.variant,
+            "rows": self.rows,
+            "checksum": self.checksum,
+            "equivalent": self.equivalent,
+            "time_ms": timings.get("time_ms", math.nan),
+            "p95_ms": timings.get("p95_ms", math.nan),
+            "speedup": self.speedup,
+        }
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, (float, Decimal)) and math.isfinite(value):
+        return float(f"{float(value):.{CHECKSUM_DIGITS}g}")
+    return value
+
+
+def result_checksum(rows: List[tuple]) -> str:
+    """Ordered checksum of a result set, numbers rounded to `CHECKSUM_DIGITS`"""
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(repr(tuple(_normalize(value) for value in row)).encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def check_equivalence(client: BaseClient, query: Query) -> Dict[str, Tuple[int, str]]:
+    """
+    (rows, checksum) of every variant of `query` on the loaded data. They run in one
+    transaction, so `NOW()` and `CURRENT_DATE` are the same for all of them.
+    """
+    results = {}
+    with client.pool.connection() as conn:
+        cur = conn.cursor()
+        try:
+            for name in query.variant_names():
+                cur.execute(query.variant(name).query)
+                rows = cur.fetchall()
+                results[name] = (len(rows), result_checksum(rows))
+        finally:
+            conn.rollback()
+            cur.close()
+    return results
+
+
+def run_query_variants(
+    client: BaseClient, profile: Optional[SettingsProfile] = None
+) -> List[VariantResult]:
+    """
+    Checks that every variant of the client's queries returns the baseline's rows,
+    then benchmarks the equivalent ones like `benchmark_queries` does. Queries without
+    variants are skipped.
+    """
+    results = []
+    for query in client.queries():
+        if not query.variants:
+            continue
+        checksums = check_equivalence(client, query)
+        _, baseline_checksum = checksums[BASELINE_VARIANT]
+        variants = []
+        for name in query.variant_names():
+            rows, checksum = checksums[name]
+            variant = VariantResult(
+                query=query.name,
+                variant=name,
+                rows=rows,
+                checksum=checksum,
+                equivalent=checksum == baseline_checksum,
+            )
+            if variant.equivalent:
+                variant.timings = client.measure_query(query.variant(name), profile)
+            else:
+                print(
+                    f" {query.name} {name}: results differ from the baseline, skipped"
+                )
+            variants.append(variant)
+
+        baseline_ms = variants[0].timings.median
+        for variant in variants:
+            variant.baseline_ms = baseline_ms
+            if variant.timings is not None:
+                print(
+                    f" {query.name} {variant.variant}: median "
+                    f"{variant.timings.median:.2f}ms ({variant.speedup:.2f}x)"
+                )
+        results.extend(variants)
+    return results
+
+
+def to_dataframe(results: List[VariantResult]) -> pd.DataFrame:
+    return pd.DataFrame([result.to_dict() for result in results])
@@ -0,0 +1,25 @@
+-- Add up migration script here
+-- Same columns as v1, range partitioned by month on event_timestamp.
+-- The partition key has to be part of the primary key and cannot be NULL.
+CREATE TABLE IF NOT EXISTS batch_jobs_logs (
+    id BIGSERIAL,
+    data JSONB NOT NULL,
+    job_id TEXT NULL,
+    creation_date TIMESTAMP DEFAULT NOW(),
+    run_name TEXT NULL,
+    run_id TEXT NULL,
+    pipeline_name TEXT NULL,
+    nextflow_session_uuid TEXT NULL,
+    job_ids TEXT[] NULL,
+    tags JSONB,
+    event_timestamp TIMESTAMP NOT NULL,
+    ec2_cost_per_hour FLOAT,
+    cpu_usage FLOAT,
+    mem_used FLOAT,
+    processed_dataset INT,
+    PRIMARY KEY (id, event_timestamp)
+) PARTITION BY RANGE (event_timestamp);
+
+-- catches rows outside of the created months until their partition exists
+CREATE TABLE IF NOT EXISTS batch_jobs_logs_default
+    PARTITION OF batch_jobs_logs DEFAULT;
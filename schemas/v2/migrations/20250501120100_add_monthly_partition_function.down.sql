@@ -0,0 +1,2 @@
+-- Add down migration script here
+DROP FUNCTION IF EXISTS ensure_batch_jobs_logs_partitions(TIMESTAMP, TIMESTAMP);
@@ -0,0 +1,48 @@
+-- Add up migration script here
+-- Creates the monthly partitions covering [from_ts, to_ts]. Rows of those months
+-- already in the default partition are moved into the new partition before it is
+-- attached, since attaching fails while the default partition holds rows of its range.
+CREATE OR REPLACE FUNCTION ensure_batch_jobs_logs_partitions(from_ts TIMESTAMP, to_ts TIMESTAMP)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    month_start TIMESTAMP := DATE_TRUNC('month', from_ts);
+    month_end TIMESTAMP;
+    partition_name TEXT;
+    created INT := 0;
+BEGIN
+    -- concurrent loaders would otherwise race to create the same month
+    PERFORM pg_advisory_xact_lock(hashtext('batch_jobs_logs_partitions'));
+
+    WHILE month_start <= to_ts LOOP
+        month_end := month_start + INTERVAL '1 month';
+        partition_name := 'batch_jobs_logs_' || TO_CHAR(month_start, 'YYYY_MM');
+
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE batch_jobs_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                partition_name
+            );
+            EXECUTE format(
+                'WITH moved AS (
+                    DELETE FROM batch_jobs_logs_default
+                    WHERE event_timestamp >= %L AND event_timestamp < %L
+                    RETURNING *
+                )
+                INSERT INTO %I SELECT * FROM moved',
+                month_start, month_end, partition_name
+            );
+            EXECUTE format(
+                'ALTER TABLE batch_jobs_logs ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, month_end
+            );
+            created := created + 1;
+        END IF;
+
+        month_start := month_end;
+    END LOOP;
+
+    RETURN created;
+END;
+$$;
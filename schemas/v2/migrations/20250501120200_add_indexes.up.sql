@@ -0,0 +1,7 @@
+-- Add up migration script here
+-- UP: Create Indexes, same as v1 so the comparison only measures partitioning.
+-- Defined on the parent, so every partition (also those created later) gets its own.
+CREATE INDEX IF NOT EXISTS idx_batch_jobs_logs_metrics
+    ON batch_jobs_logs (job_id, pipeline_name, tags, event_timestamp, ec2_cost_per_hour, cpu_usage, mem_used, processed_dataset);
+
+ANALYZE batch_jobs_logs;
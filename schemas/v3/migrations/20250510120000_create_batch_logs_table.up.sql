@@ -0,0 +1,22 @@
+-- Add up migration script here
+-- Same table and index as v1
+CREATE TABLE IF NOT EXISTS batch_jobs_logs (
+    id SERIAL PRIMARY KEY,
+    data JSONB NOT NULL,
+    job_id TEXT NULL,
+    creation_date TIMESTAMP DEFAULT NOW(),
+    run_name TEXT NULL,
+    run_id TEXT NULL,
+    pipeline_name TEXT NULL,
+    nextflow_session_uuid TEXT NULL,
+    job_ids TEXT[] NULL,
+    tags JSONB,
+    event_timestamp TIMESTAMP,
+    ec2_cost_per_hour FLOAT,
+    cpu_usage FLOAT,
+    mem_used FLOAT,
+    processed_dataset INT
+);
+
+CREATE INDEX IF NOT EXISTS idx_batch_jobs_logs_metrics
+    ON batch_jobs_logs (job_id, pipeline_name, tags, event_timestamp, ec2_cost_per_hour, cpu_usage, mem_used, processed_dataset);
@@ -0,0 +1,5 @@
+-- Add down migration script here
+DROP FUNCTION IF EXISTS rebuild_run_summary();
+DROP TRIGGER IF EXISTS batch_jobs_logs_summarize ON batch_jobs_logs;
+DROP FUNCTION IF EXISTS batch_jobs_logs_summarize();
+DROP TABLE IF EXISTS run_summary;
@@ -0,0 +1,91 @@
+-- Add up migration script here
+-- One row per run, pipeline, tags and month of events, so the monthly queries can
+-- still weight runs by their events. NULL run ids, pipelines and tags are kept apart
+-- from empty ones by hashing the row text instead of coalescing (no NULLS NOT DISTINCT on 13).
+CREATE TABLE IF NOT EXISTS run_summary (
+    summary_key UUID NOT NULL,
+    month TIMESTAMP NOT NULL,
+    run_id TEXT NULL,
+    pipeline_name TEXT NULL,
+    tags JSONB NULL,
+    first_ts TIMESTAMP NULL,
+    last_ts TIMESTAMP NULL,
+    max_cost_per_hour FLOAT NULL,
+    max_cpu_usage FLOAT NULL,
+    max_mem_used FLOAT NULL,
+    event_count BIGINT NOT NULL,
+    PRIMARY KEY (summary_key, month)
+);
+
+CREATE INDEX IF NOT EXISTS idx_run_summary_run_id ON run_summary (run_id);
+CREATE INDEX IF NOT EXISTS idx_run_summary_month ON run_summary (month);
+
+-- Folds every inserted statement into run_summary, once per statement so a COPY
+-- of a whole chunk costs a single aggregate and upsert.
+CREATE OR REPLACE FUNCTION batch_jobs_logs_summarize()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO run_summary AS s (
+        summary_key, month, run_id, pipeline_name, tags, first_ts, last_ts,
+        max_cost_per_hour, max_cpu_usage, max_mem_used, event_count
+    )
+    SELECT
+        md5(ROW(run_id, pipeline_name, tags)::text)::uuid,
+        COALESCE(DATE_TRUNC('month', event_timestamp), '-infinity'),
+        run_id,
+        pipeline_name,
+        tags,
+        MIN(event_timestamp),
+        MAX(event_timestamp),
+        MAX(ec2_cost_per_hour),
+        MAX(cpu_usage),
+        MAX(mem_used),
+        COUNT(*)
+    FROM new_rows
+    GROUP BY 1, 2, run_id, pipeline_name, tags
+    -- same lock order in every transaction, so concurrent loaders do not deadlock
+    ORDER BY 1, 2
+    ON CONFLICT (summary_key, month) DO UPDATE SET
+        first_ts = LEAST(s.first_ts, EXCLUDED.first_ts),
+        last_ts = GREATEST(s.last_ts, EXCLUDED.last_ts),
+        max_cost_per_hour = GREATEST(s.max_cost_per_hour, EXCLUDED.max_cost_per_hour),
+        max_cpu_usage = GREATEST(s.max_cpu_usage, EXCLUDED.max_cpu_usage),
+        max_mem_used = GREATEST(s.max_mem_used, EXCLUDED.max_mem_used),
+        event_count = s.event_count + EXCLUDED.event_count;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER batch_jobs_logs_summarize
+    AFTER INSERT ON batch_jobs_logs
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION batch_jobs_logs_summarize();
+
+-- Recomputes the summary from scratch, e.g. after events were deleted
+CREATE OR REPLACE FUNCTION rebuild_run_summary()
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    TRUNCATE run_summary;
+    INSERT INTO run_summary (
+        summary_key, month, run_id, pipeline_name, tags, first_ts, last_ts,
+        max_cost_per_hour, max_cpu_usage, max_mem_used, event_count
+    )
+    SELECT
+        md5(ROW(run_id, pipeline_name, tags)::text)::uuid,
+        COALESCE(DATE_TRUNC('month', event_timestamp), '-infinity'),
+        run_id,
+        pipeline_name,
+        tags,
+        MIN(event_timestamp),
+        MAX(event_timestamp),
+        MAX(ec2_cost_per_hour),
+        MAX(cpu_usage),
+        MAX(mem_used),
+        COUNT(*)
+    FROM batch_jobs_logs
+    GROUP BY 1, 2, run_id, pipeline_name, tags;
+$$;
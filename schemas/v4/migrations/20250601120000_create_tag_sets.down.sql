@@ -0,0 +1,3 @@
+-- Add down migration script here
+DROP FUNCTION IF EXISTS tag_set_hash(JSONB);
+DROP TABLE IF EXISTS tag_sets;
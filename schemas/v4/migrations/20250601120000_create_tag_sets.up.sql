@@ -0,0 +1,19 @@
+-- Add up migration script here
+-- Every distinct tags document once. Ids are the first 64 bits of md5(tags::text),
+-- computed by the loader as it encodes events (or by the server as it synthesizes
+-- them), so interning a tag set never waits on a round trip for its id.
+CREATE TABLE IF NOT EXISTS tag_sets (
+    tag_set_id BIGINT PRIMARY KEY,
+    tags JSONB NOT NULL
+);
+
+-- The id of a tags document, NULL for missing or null tags like the loader
+CREATE OR REPLACE FUNCTION tag_set_hash(tags JSONB)
+RETURNS BIGINT
+LANGUAGE sql
+IMMUTABLE STRICT
+AS $$
+    SELECT CASE WHEN jsonb_typeof(tags) <> 'null'
+        THEN ('x' || left(md5(tags::text), 16))::bit(64)::bigint
+    END
+$$;
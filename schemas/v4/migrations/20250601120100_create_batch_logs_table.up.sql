@@ -0,0 +1,24 @@
+-- Add up migration script here
+-- The v1 table and index with the tags interned: `tag_set_id` replaces the `tags`
+-- document. It is not a foreign key, the loader writes a tag set before the first
+-- chunk referencing it and a per row check would be paid by every COPY.
+CREATE TABLE IF NOT EXISTS batch_jobs_logs (
+    id SERIAL PRIMARY KEY,
+    data JSONB NOT NULL,
+    job_id TEXT NULL,
+    creation_date TIMESTAMP DEFAULT NOW(),
+    run_name TEXT NULL,
+    run_id TEXT NULL,
+    pipeline_name TEXT NULL,
+    nextflow_session_uuid TEXT NULL,
+    job_ids TEXT[] NULL,
+    tag_set_id BIGINT NULL,
+    event_timestamp TIMESTAMP,
+    ec2_cost_per_hour FLOAT,
+    cpu_usage FLOAT,
+    mem_used FLOAT,
+    processed_dataset INT
+);
+
+CREATE INDEX IF NOT EXISTS idx_batch_jobs_logs_metrics
+    ON batch_jobs_logs (job_id, pipeline_name, tag_set_id, event_timestamp, ec2_cost_per_hour, cpu_usage, mem_used, processed_dataset);
@@ -0,0 +1,63 @@
+import unittest
+from dataclasses import replace
+from datetime import datetime
+
+from db_perf.cache import dataset_key
+from db_perf.db_versions.v1.client import BATCH_JOBS_LOGS
+from db_perf.models.load import EventSource, IngestStrategy, LoadOptions
+from db_perf.models.table import Column
+from db_perf.models.workload import WorkloadShape
+
+ANCHOR = datetime(2024, 6, 1)
+
+
+def options(**kwargs) -> LoadOptions:
+    return LoadOptions(
+        strategy=IngestStrategy.COPY_BINARY,
+        source=EventSource.COLUMNAR,
+        anchor=ANCHOR,
+        **kwargs,
+    )
+
+
+class DatasetKeyTest(unittest.TestCase):
+    def test_stable(self):
+        self.assertEqual(
+            dataset_key(BATCH_JOBS_LOGS, options()),
+            dataset_key(BATCH_JOBS_LOGS, options()),
+        )
+
+    def test_depends_on_rows(self):
+        base = dataset_key(BATCH_JOBS_LOGS, options())
+        for changed in (
+            options(seed=1),
+            options(shape=WorkloadShape()),
+            replace(options(), anchor=datetime(2024, 6, 2)),
+            replace(options(), source=EventSource.FACTORY),
+            replace(options(), strategy=IngestStrategy.COPY_TEXT),
+        ):
+            with self.subTest(changed=changed):
+                self.assertNotEqual(dataset_key(BATCH_JOBS_LOGS, changed), base)
+
+    def test_depends_on_column_types(self):
+        table = replace(
+            BATCH_JOBS_LOGS,
+            columns=BATCH_JOBS_LOGS.columns[:-1] + (Column("extra", "int8"),),
+        )
+        self.assertNotEqual(
+            dataset_key(table, options()), dataset_key(BATCH_JOBS_LOGS, options())
+        )
+
+    def test_ignores_loading_options(self):
+        self.assertEqual(
+            dataset_key(replace(BATCH_JOBS_LOGS, name="other"), options()),
+            dataset_key(
+                BATCH_JOBS_LOGS, options(chunk_size=5, workers=4, page_size=10)
+            ),
+        )
+
+    def test_default_anchor_is_midnight(self):
+        anchor = LoadOptions().anchor
+        self.assertEqual(
+            anchor, anchor.replace(hour=0, minute=0, second=0, microsecond=0)
+        )
@@ -0,0 +1,43 @@
+import unittest
+from datetime import datetime
+
+from db_perf.factories.columnar import BLOCK_SIZE, ColumnarEventFactory
+from db_perf.factories.shape import WorkloadShaper
+from db_perf.models.workload import WorkloadShape
+
+ANCHOR = datetime(2025, 6, 1)
+ROWS = 2 * BLOCK_SIZE + 500
+# uneven chunks, one of a single row and several crossing a block boundary
+BOUNDS = [0, 1, 700, BLOCK_SIZE - 3, BLOCK_SIZE + 5, 2 * BLOCK_SIZE + 1, ROWS]
+
+
+class ChunkIndependenceTest(unittest.TestCase):
+    """Row `i` is the same whichever chunk generates it"""
+
+    def assert_chunk_independent(self, factory: ColumnarEventFactory):
+        whole = list(factory.generate(0, ROWS).rows())
+        self.assertEqual(len(whole), ROWS)
+        chunked = []
+        for start, end in zip(BOUNDS, BOUNDS[1:]):
+            chunked += factory.generate(start, end - start).rows()
+        self.assertEqual(chunked, whole)
+
+    def test_independent_rows(self):
+        self.assert_chunk_independent(ColumnarEventFactory(seed=3, anchor=ANCHOR))
+
+    def test_shaped_rows(self):
+        shape = WorkloadShape(
+            pipelines=5, runs_per_pipeline=4, events_per_run=300, anchor=ANCHOR
+        )
+        self.assert_chunk_independent(
+            ColumnarEventFactory(
+                seed=3, anchor=ANCHOR, shaper=WorkloadShaper(shape, seed=3)
+            )
+        )
+
+    def test_seed_changes_rows(self):
+        first = list(ColumnarEventFactory(seed=1, anchor=ANCHOR).generate(0, 10).rows())
+        second = list(
+            ColumnarEventFactory(seed=2, anchor=ANCHOR).generate(0, 10).rows()
+        )
+        self.assertNotEqual(first, second)
@@ -0,0 +1,45 @@
+import threading
+import unittest
+from contextlib import contextmanager
+from unittest import mock
+
+from db_perf.concurrency import ConcurrencyOptions, run_concurrency_level
+from db_perf.models.query import Query
+
+
+class ConcurrencyOptionsTest(unittest.TestCase):
+    def test_needs_a_limit(self):
+        with self.assertRaises(ValueError):
+            ConcurrencyOptions(duration_s=None, requests_per_session=None)
+
+    def test_either_limit(self):
+        ConcurrencyOptions(duration_s=None, requests_per_session=10)
+        ConcurrencyOptions(duration_s=1.0, requests_per_session=None)
+        ConcurrencyOptions(duration_s=1.0, requests_per_session=10)
+
+
+class FailingPool:
+    """Hands out idle connections, except to the second borrower"""
+
+    def __init__(self):
+        self.borrowed = 0
+        self.lock = threading.Lock()
+
+    def ensure_capacity(self, size):
+        pass
+
+    @contextmanager
+    def connection(self):
+        with self.lock:
+            self.borrowed += 1
+            borrowed = self.borrowed
+        if borrowed == 2:
+            raise RuntimeError("no connection for you")
+        yield mock.MagicMock()
+
+
+class SessionErrorTest(unittest.TestCase):
+    def test_raises_the_failing_session_error(self):
+        options = ConcurrencyOptions(sessions=[3], duration_s=1.0)
+        with self.assertRaisesRegex(RuntimeError, "no connection for you"):
+            run_concurrency_level(FailingPool(), [Query("q", "SELECT 1")], 3, options)
@@ -0,0 +1,112 @@
+import json
+import re
+import struct
+import unittest
+from typing import Any, List
+
+from factory.random import reseed_random
+
+from db_perf.db_versions.v1 import DbClient as DbClientV1
+from db_perf.db_versions.v4 import DbClient as DbClientV4
+from db_perf.factories.event import EventFactory
+from db_perf.ingest import COPY_BINARY_HEADER, COPY_TEXT_NULL, prepare_rows
+from db_perf.models.load import IngestStrategy, LoadOptions
+from db_perf.models.table import Table
+
+_UNESCAPES = {"\\": "\\", "t": "\t", "n": "\n", "r": "\r"}
+
+
+def _copy_text_rows(table: Table, payload: bytes) -> List[tuple]:
+    rows = []
+    for line in payload.decode("utf-8").split("\n")[:-1]:
+        row = []
+        for column, field in zip(table.columns, line.split("\t"), strict=True):
+            if field == COPY_TEXT_NULL:
+                row.append(None)
+                continue
+            field = re.sub(r"\\(.)", lambda m: _UNESCAPES[m.group(1)], field)
+            row.append(json.loads(field) if column.pg_type == "jsonb" else field)
+        rows.append(tuple(row))
+    return rows
+
+
+def _copy_binary_rows(table: Table, payload: bytes) -> List[tuple]:
+    assert payload.startswith(COPY_BINARY_HEADER)
+    offset, rows = len(COPY_BINARY_HEADER), []
+    while True:
+        (fields,) = struct.unpack_from("!h", payload, offset)
+        offset += 2
+        if fields == -1:
+            break
+        assert fields == len(table.columns)
+        row = []
+        for column in table.columns:
+            (length,) = struct.unpack_from("!i", payload, offset)
+            offset += 4
+            if length == -1:
+                row.append(None)
+                continue
+            value = payload[offset : offset + length]
+            offset += length
+            if column.pg_type == "jsonb":
+                assert value[0] == 1  # jsonb binary format version
+                row.append(json.loads(value[1:]))
+            else:
+                row.append(value)
+        rows.append(tuple(row))
+    assert offset == len(payload)
+    return rows
+
+
+def _parameter_rows(table: Table, payload: List[tuple]) -> List[tuple]:
+    def value(column, value: Any) -> Any:
+        value = getattr(value, "adapted", value)  # psycopg2 Json
+        if column.pg_type == "jsonb" and isinstance(value, str):
+            return json.loads(value)
+        return value
+
+    return [
+        tuple(value(column, v) for column, v in zip(table.columns, row))
+        for row in payload
+    ]
+
+
+DECODERS = {
+    IngestStrategy.EXECUTEMANY: _parameter_rows,
+    IngestStrategy.EXECUTE_VALUES: _parameter_rows,
+    IngestStrategy.COPY_TEXT: _copy_text_rows,
+    IngestStrategy.COPY_BINARY: _copy_binary_rows,
+}
+
+
+class CompiledEncoderTest(unittest.TestCase):
+    """The compiled encoder sends the rows `event_to_row` and `prepare_rows` would"""
+
+    @classmethod
+    def setUpClass(cls):
+        reseed_random(0)
+        cls.events = [EventFactory() for _ in range(200)]
+
+    def assert_same_rows(self, client):
+        table = client._get_table()
+        encoder = client._get_encoder()
+        self.assertIsNotNone(encoder)
+        for strategy, decode in DECODERS.items():
+            with self.subTest(client=client.name(), strategy=strategy.value):
+                generic = prepare_rows(
+                    table, [client._event_to_row(e) for e in self.events], strategy
+                )
+                compiled = encoder.encode(self.events, strategy)
+                self.assertEqual(
+                    decode(table, compiled), decode(table, generic), strategy
+                )
+
+    def test_v1(self):
+        self.assert_same_rows(
+            DbClientV1("postgres://localhost/encoder_test", LoadOptions())
+        )
+
+    def test_v4_interned_tags(self):
+        self.assert_same_rows(
+            DbClientV4("postgres://localhost/encoder_test", LoadOptions())
+        )
@@ -0,0 +1,148 @@
+import struct
+import unittest
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from db_perf.ingest import (
+    COPY_BINARY_HEADER,
+    COPY_BINARY_TRAILER,
+    TEXT_OID,
+    encode_copy_binary,
+    encode_copy_text,
+)
+from db_perf.models.table import Column, Table
+
+TABLE = Table(
+    name="copy_test",
+    columns=(
+        Column("run_id", "text"),
+        Column("tags", "text[]"),
+        Column("data", "jsonb"),
+        Column("event_timestamp", "timestamp"),
+        Column("cost", "float8"),
+        Column("attempt", "int4"),
+        Column("id", "int8"),
+        Column("note", "text"),
+    ),
+)
+
+TIMESTAMP = datetime(2024, 3, 1, 12, 30, 15, 250)
+ROW = (
+    "run-1",
+    ["a", None, "é"],
+    {"k": [1, "v"]},
+    TIMESTAMP,
+    0.25,
+    7,
+    2**40,
+    None,
+)
+
+
+class CopyBinaryTest(unittest.TestCase):
+    def setUp(self):
+        self.payload = b"".join(encode_copy_binary(TABLE, [ROW]))
+        self.offset = 0
+
+    def take(self, size: int) -> bytes:
+        value = self.payload[self.offset : self.offset + size]
+        self.offset += size
+        return value
+
+    def unpack(self, fmt: str):
+        values = struct.unpack(fmt, self.take(struct.calcsize(fmt)))
+        return values[0] if len(values) == 1 else values
+
+    def field(self) -> Optional[bytes]:
+        length = self.unpack("!i")
+        return None if length == -1 else self.take(length)
+
+    def test_row(self):
+        self.assertEqual(self.take(len(COPY_BINARY_HEADER)), COPY_BINARY_HEADER)
+        self.assertEqual(self.unpack("!h"), len(TABLE.columns))
+
+        self.assertEqual(self.field(), b"run-1")
+
+        array = self.field()
+        # dimensions, has nulls, element type, then length and lower bound
+        self.assertEqual(struct.unpack_from("!iiiii", array), (1, 1, TEXT_OID, 3, 1))
+        elements, position = [], 20
+        for _ in range(3):
+            (length,) = struct.unpack_from("!i", array, position)
+            position += 4
+            if length == -1:
+                elements.append(None)
+                continue
+            elements.append(array[position : position + length].decode("utf-8"))
+            position += length
+        self.assertEqual(elements, ["a", None, "é"])
+        self.assertEqual(position, len(array))
+
+        jsonb = self.field()
+        self.assertEqual(jsonb[:1], b"\x01")  # jsonb binary format version
+        self.assertEqual(jsonb[1:], b'{"k": [1, "v"]}')
+
+        timestamp = self.field()
+        micros = (TIMESTAMP - datetime(2000, 1, 1)) // timedelta(microseconds=1)
+        self.assertEqual(struct.unpack("!q", timestamp), (micros,))
+
+        self.assertEqual(struct.unpack("!d", self.field()), (0.25,))
+        self.assertEqual(struct.unpack("!i", self.field()), (7,))
+        self.assertEqual(struct.unpack("!q", self.field()), (2**40,))
+        self.assertIsNone(self.field())
+
+        self.assertEqual(self.take(len(COPY_BINARY_TRAILER)), COPY_BINARY_TRAILER)
+        self.assertEqual(self.offset, len(self.payload))
+
+    def test_aware_timestamps_are_utc_micros_since_2000(self):
+        aware = datetime(2000, 1, 1, 2, 0, 0, 1, tzinfo=timezone(timedelta(hours=1)))
+        payload = b"".join(
+            encode_copy_binary(
+                Table("t", (Column("ts", "timestamp"),)), [(aware,)], False, False
+            )
+        )
+        self.assertEqual(struct.unpack("!hiq", payload), (1, 8, 3_600_000_001))
+
+    def test_empty_array(self):
+        payload = b"".join(
+            encode_copy_binary(
+                Table("t", (Column("tags", "text[]"),)), [([],)], False, False
+            )
+        )
+        self.assertEqual(struct.unpack("!hiiii", payload), (1, 12, 0, 0, TEXT_OID))
+
+
+class CopyTextTest(unittest.TestCase):
+    def test_row(self):
+        (line,) = encode_copy_text(TABLE, [ROW])
+        self.assertEqual(
+            line.decode("utf-8").split("\t"),
+            [
+                "run-1",
+                '{"a",NULL,"é"}',
+                '{"k": [1, "v"]}',
+                "2024-03-01 12:30:15.000250",
+                "0.25",
+                "7",
+                str(2**40),
+                "\\N\n",
+            ],
+        )
+
+    def test_escaping(self):
+        table = Table("t", (Column("a", "text"), Column("b", "jsonb")))
+        (line,) = encode_copy_text(
+            table, [("tab\tnew\nline\\back\rslash", {"k": "x\\y\tz"})]
+        )
+        self.assertEqual(
+            line,
+            b"tab\\tnew\\nline\\\\back\\rslash\t"
+            # json escapes first, COPY escapes the backslashes json wrote
+            + b'{"k": "x\\\\\\\\y\\\\tz"}\n',
+        )
+
+    def test_null_and_array_quoting(self):
+        table = Table("t", (Column("a", "text"), Column("tags", "text[]")))
+        (line,) = encode_copy_text(table, [(None, ['say "hi"', "back\\slash"])])
+        # array quoting escapes, then COPY escapes every backslash again
+        self.assertEqual(line, b'\\N\t{"say \\\\"hi\\\\"","back\\\\\\\\slash"}\n')
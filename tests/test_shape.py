@@ -0,0 +1,62 @@
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from db_perf.factories.shape import WorkloadShaper
+from db_perf.models.workload import WorkloadShape
+
+ANCHOR = datetime(2025, 6, 1)
+
+
+def pipeline_counts(shape: WorkloadShape) -> np.ndarray:
+    allocation = WorkloadShaper(shape, seed=0).allocation
+    return np.bincount(allocation, minlength=shape.pipelines)
+
+
+class AllocationTest(unittest.TestCase):
+    """Runs are split between pipelines by largest remainder of their Zipf weight"""
+
+    def test_counts_sum_to_runs(self):
+        for pipelines, runs_per_pipeline in ((1, 1), (7, 3), (40, 50), (13, 1)):
+            shape = WorkloadShape(
+                pipelines=pipelines, runs_per_pipeline=runs_per_pipeline
+            )
+            with self.subTest(shape=shape):
+                self.assertEqual(pipeline_counts(shape).sum(), shape.runs)
+
+    def test_every_pipeline_runs(self):
+        # steep enough that the quotas of the tail round to nothing
+        shape = WorkloadShape(pipelines=50, runs_per_pipeline=2, zipf_exponent=3.0)
+        self.assertGreaterEqual(pipeline_counts(shape).min(), 1)
+
+    def test_skew_grows_with_exponent(self):
+        counts = [
+            pipeline_counts(WorkloadShape(pipelines=20, zipf_exponent=exponent))
+            for exponent in (0.0, 0.5, 1.1, 2.0)
+        ]
+        self.assertTrue((counts[0] == 50).all())
+        top = [c[0] for c in counts]
+        self.assertEqual(top, sorted(top))
+        self.assertEqual(len(set(top)), len(top))
+        for c in counts:
+            # most popular first
+            self.assertTrue((np.diff(c) <= 0).all())
+
+
+class TimestampTest(unittest.TestCase):
+    def test_runs_stay_inside_the_window(self):
+        shape = WorkloadShape(
+            pipelines=10,
+            runs_per_pipeline=20,
+            events_per_run=25,
+            run_duration=timedelta(days=20),
+            months=2,
+            anchor=ANCHOR,
+        )
+        shaper = WorkloadShaper(shape, seed=5)
+        timestamps = shaper.columns(0, 2 * shape.records).event_timestamp
+        self.assertEqual(shaper.window_end, np.datetime64(ANCHOR, "us"))
+        window_start = shaper.window_end - np.timedelta64(shaper.window_us, "us")
+        self.assertGreaterEqual(timestamps.min(), window_start)
+        self.assertLessEqual(timestamps.max(), shaper.window_end)
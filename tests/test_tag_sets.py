@@ -0,0 +1,88 @@
+import os
+import re
+import unittest
+from pathlib import Path
+
+from db_perf.db_versions.v4.client import TagSetInterner, tag_set_id, tag_set_text
+from db_perf.models.events import PipelineTags
+
+MIGRATION = (
+    Path(__file__).resolve().parent.parent
+    / "schemas/v4/migrations/20250601120000_create_tag_sets.up.sql"
+)
+
+TAG_SETS = [
+    {},
+    {"env": "prod"},
+    {"team": "a", "env": "prod", "b": [1, {"zz": 1, "a": 2}]},
+    {"é": "ü", "quote": 'say "hi"\n', "nested": {"x": None, "yy": True, "z": 1.5}},
+    [1, "two", None],
+]
+
+
+class TagSetTextTest(unittest.TestCase):
+    def test_jsonb_key_order(self):
+        self.assertEqual(
+            tag_set_text({"team": "a", "env": "prod", "b": [1, {"zz": 1, "a": 2}]}),
+            '{"b": [1, {"a": 2, "zz": 1}], "env": "prod", "team": "a"}',
+        )
+
+    def test_same_text_whatever_the_form(self):
+        text = tag_set_text({"env": "prod", "owner": "a"})
+        self.assertEqual(tag_set_text('{"owner":"a","env":"prod"}'), text)
+        self.assertEqual(tag_set_text(PipelineTags(env="prod", owner="a")), text)
+
+    def test_id_is_signed_64_bits_of_md5(self):
+        # ('x' || left(md5('{}'), 16))::bit(64)::bigint
+        self.assertEqual(tag_set_id("{}"), -7381035218815976880)
+
+
+class TagSetInternerTest(unittest.TestCase):
+    def test_pending_until_written(self):
+        interner = TagSetInterner()
+        tags = PipelineTags(env="prod", owner="a")
+        first = interner.intern(tags)
+        self.assertEqual(interner.intern(tags), first)
+        self.assertIsNone(interner.intern(None))
+        self.assertEqual(list(interner.pending), [first])
+
+        interner.mark_written(dict(interner.pending))
+        self.assertEqual(interner.pending, {})
+        self.assertEqual(
+            interner.intern({"other": "tags"}), interner.intern('{"other": "tags"}')
+        )
+        self.assertEqual(len(interner.pending), 1)
+
+        interner.reset()
+        self.assertEqual(interner.pending, interner.texts)
+        self.assertEqual(len(interner.texts), 2)
+
+
+@unittest.skipUnless(os.getenv("TEST_DATABASE_URL"), "TEST_DATABASE_URL not set")
+class TagSetHashTest(unittest.TestCase):
+    """`tag_set_id` of `tag_set_text` is the migration's `tag_set_hash` in SQL"""
+
+    def test_matches_sql(self):
+        import psycopg2
+
+        function = re.search(
+            r"CREATE OR REPLACE FUNCTION tag_set_hash.*?\$\$;",
+            MIGRATION.read_text(),
+            re.DOTALL,
+        ).group(0)
+        conn = psycopg2.connect(os.environ["TEST_DATABASE_URL"], client_encoding="utf8")
+        try:
+            cur = conn.cursor()
+            # a temporary copy, rolled back, so any database will do
+            cur.execute(function.replace("tag_set_hash", "pg_temp.tag_set_hash", 1))
+            for tags in TAG_SETS:
+                with self.subTest(tags=tags):
+                    text = tag_set_text(tags)
+                    cur.execute(
+                        "SELECT %s::jsonb::text, pg_temp.tag_set_hash(%s::jsonb)",
+                        (text, text),
+                    )
+                    self.assertEqual(cur.fetchone(), (text, tag_set_id(text)))
+        finally:
+            conn.rollback()
+            conn.close()
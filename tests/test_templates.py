@@ -0,0 +1,44 @@
+import tempfile
+import unittest
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+
+from db_perf.db_versions.v1.client import DbClient
+from db_perf.models.load import LoadOptions
+
+
+class MigrationsClient(DbClient):
+    def __init__(self, migrations: Path, load_options: LoadOptions):
+        self.migrations = migrations
+        super().__init__("postgres://localhost/template_test", load_options)
+
+    def _get_correct_schema_path(self) -> Path:
+        return self.migrations
+
+
+class TemplateTagTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.migrations = Path(directory.name)
+        self.migration = self.migrations / "0001_init.sql"
+        self.migration.write_text("CREATE TABLE t (id int);")
+        self.options = LoadOptions(anchor=datetime(2024, 6, 1))
+
+    def client(self, **kwargs) -> DbClient:
+        return MigrationsClient(self.migrations, replace(self.options, **kwargs))
+
+    def test_schema_tag_hashes_migration_contents(self):
+        tag = self.client().template_tag()
+        self.assertEqual(self.client().template_tag(), tag)
+        self.migration.write_text("CREATE TABLE t (id bigint);")
+        self.assertNotEqual(self.client().template_tag(), tag)
+
+    def test_dataset_tag_includes_anchor(self):
+        tag = self.client().template_tag(100)
+        self.assertNotEqual(self.client().template_tag(1000), tag)
+        self.assertNotEqual(
+            self.client(anchor=datetime(2024, 6, 2)).template_tag(100), tag
+        )
+        self.assertTrue(tag.startswith(self.client().template_tag()))